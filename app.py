@@ -2,68 +2,116 @@
 import os
 import sys
 from flask import Flask, render_template, redirect, request
-from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
 
-# 🔐 Carrega variáveis de ambiente
-load_dotenv()
-
 # 🔧 Ajusta o path do projeto
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
-# 🚀 Inicializa o app Flask
-app = Flask(__name__, static_folder="static", template_folder="templates")
-
-# ⚙️ Configurações do Flask a partir do .env
-app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
-app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("SQLALCHEMY_DATABASE_URI", "sqlite:///meubanco.db")
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["DEBUG"] = os.getenv("FLASK_ENV") == "development"
-
-# 🔌 Inicializa extensões
-from extensions import db
-db.init_app(app)
-migrate = Migrate(app, db)
-jwt = JWTManager(app)
-
-# 📦 Registra os blueprints
-from routes.ofertas import ofertas_bp
-from routes.usuarios import usuarios_bp
-from routes.admin import admin_bp
-from routes.produto import produto_bp
-
-app.register_blueprint(usuarios_bp, url_prefix="/usuarios")
-app.register_blueprint(ofertas_bp, url_prefix="/ofertas")
-app.register_blueprint(admin_bp, url_prefix="/admin")
-app.register_blueprint(produto_bp, url_prefix="/produto")
-
-# 📤 Serviço de envio ao Telegram
-from services.telegram import enviar_mensagem, enviar_foto
-
-# 🧪 Rotas de teste do bot
-@app.route("/bot/enviar")
-def bot_enviar():
-    enviar_mensagem("Mensagem enviada pelo Flask ✅")
-    return "Mensagem enviada ao Telegram!"
-
-@app.route("/bot/enviar-dinamico")
-def bot_enviar_dinamico():
-    msg = request.args.get("msg", "Mensagem padrão ✅")
-    enviar_mensagem(msg)
-    return f"Mensagem enviada: {msg}"
-
-# 🖼️ Rota para o painel HTML
-@app.route("/painel")
-def painel():
-    return render_template("painel.html")
-
-# 🌍 Rota raiz
-@app.route("/")
-def home():
-    return redirect("/painel")
+jwt = JWTManager()
+
+
+def create_app(config=None):
+    # 🏭 Fábrica do app: importar este módulo não faz nada além das definições.
+    # gunicorn --preload "app:create_app()" monta o app uma vez no master e os
+    # workers herdam tudo pelo fork; o flask CLI encontra a fábrica sozinho.
+
+    # 🔐 Carrega variáveis de ambiente (antes dos módulos que as leem)
+    load_dotenv()
+
+    # 🚀 Inicializa o app Flask
+    app = Flask(__name__, static_folder="static", template_folder="templates")
+
+    # ⚙️ Configurações do Flask a partir do .env
+    app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("SQLALCHEMY_DATABASE_URI", "sqlite:///meubanco.db")
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["DEBUG"] = os.getenv("FLASK_ENV") == "development"
+    app.config.update(config or {})
+    # 🗄️ Pool e PRAGMAs do banco (WAL no SQLite, pool/timeouts no Postgres)
+    from utils.banco import configurar_engine, opcoes_engine
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", opcoes_engine(app.config["SQLALCHEMY_DATABASE_URI"]))
+
+    # 🔌 Inicializa extensões
+    from extensions import db
+    from flask_migrate import Migrate
+    from services.busca import ignorar_tabelas_busca
+    from utils.instrumentacao import instalar_instrumentacao
+    db.init_app(app)
+    with app.app_context():
+        configurar_engine(db.engine)
+        # 🔎 Consultas e tempo de SQL por request, SQL lenta e aviso de N+1
+        instalar_instrumentacao(app, db.engine)
+    Migrate(app, db, include_object=ignorar_tabelas_busca)
+    jwt.init_app(app)
+
+    # ⚡ JSON com orjson quando instalado (listagens grandes serializam bem mais rápido)
+    from utils.serializacao import OrjsonProvider, orjson
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+    # 🗜️ Compressão gzip/brotli das respostas grandes
+    from utils.http import comprimir_resposta
+    app.after_request(comprimir_resposta)
+
+    # 🧰 Comandos de linha de comando (flask <comando>)
+    from comandos import registrar_comandos
+    registrar_comandos(app)
+
+    # 📦 Registra os blueprints
+    from routes.ofertas import ofertas_bp
+    from routes.usuarios import usuarios_bp
+    from routes.admin import admin_bp
+    from routes.produto import produto_bp
+
+    app.register_blueprint(usuarios_bp, url_prefix="/usuarios")
+    app.register_blueprint(ofertas_bp, url_prefix="/ofertas")
+    app.register_blueprint(admin_bp, url_prefix="/admin")
+    app.register_blueprint(produto_bp, url_prefix="/produto")
+
+    # ❤️ Buffer de curtidas com gravação em lote (a thread nasce no primeiro uso de cada worker)
+    from services.curtidas import buffer_curtidas
+    buffer_curtidas.iniciar(app)
+
+    # 📬 Despachante da outbox do Telegram dentro do processo web (opcional);
+    # em produção prefira o processo separado: flask --app app telegram-worker
+    if os.getenv("TELEGRAM_DESPACHANTE") == "thread":
+        from services.notificacoes import processar as processar_notificacoes
+        from services.outbox import garantir_thread_despachante
+        app.before_request(lambda: garantir_thread_despachante(app, tarefas=[processar_notificacoes]))
+
+    registrar_rotas(app)
+    return app
+
+
+def registrar_rotas(app):
+
+    # 🧪 Rotas de teste do bot (o cliente do Telegram só é importado no uso)
+    @app.route("/bot/enviar")
+    def bot_enviar():
+        from services.telegram import enviar_mensagem
+        enviar_mensagem("Mensagem enviada pelo Flask ✅")
+        return "Mensagem enviada ao Telegram!"
+
+    @app.route("/bot/enviar-dinamico")
+    def bot_enviar_dinamico():
+        from services.telegram import enviar_mensagem
+        msg = request.args.get("msg", "Mensagem padrão ✅")
+        enviar_mensagem(msg)
+        return f"Mensagem enviada: {msg}"
+
+    # 🖼️ Rota para o painel HTML
+    @app.route("/painel")
+    def painel():
+        return render_template("painel.html")
+
+    # 🌍 Rota raiz
+    @app.route("/")
+    def home():
+        return redirect("/painel")
+
 
 # 🏁 Executa o app (Railway/Render/Heroku usam PORT do ambiente)
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port)
+    create_app().run(host="0.0.0.0", port=port)
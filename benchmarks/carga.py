@@ -0,0 +1,319 @@
+"""Benchmark de carga dos endpoints quentes: latência p50/p90/p99 e vazão, em JSON.
+
+Roda pelo test client do Flask (no processo) ou por HTTP contra um servidor local,
+opcionalmente subindo um gunicorn --preload. Use depois de `flask perf-seed`:
+
+    flask --app app perf-seed --ofertas 1000000 --favoritos 10000000
+    python benchmarks/carga.py --saida resultados/atual.json
+    python benchmarks/carga.py --gunicorn --workers 4 --concorrencia 16
+    python benchmarks/carga.py --saida novo.json --comparar resultados/atual.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, RAIZ)
+
+EMAIL_BENCHMARK = "perf-benchmark@exemplo.com"
+
+
+class ClienteTeste:
+    # Test client do Flask: uma instância por thread
+    def __init__(self, app):
+        self.cliente = app.test_client()
+
+    def requisitar(self, metodo, caminho, headers):
+        resposta = self.cliente.open(caminho, method=metodo, headers=headers)
+        resposta.get_data()  # consome respostas em streaming (exportação)
+        return resposta.status_code
+
+
+class ClienteHTTP:
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip("/")
+        self.sessao = requests.Session()
+
+    def requisitar(self, metodo, caminho, headers):
+        resposta = self.sessao.request(metodo, self.base_url + caminho, headers=headers)
+        resposta.content
+        return resposta.status_code
+
+
+def preparar(app):
+    # Tokens, usuário de benchmark e ids usados nos cenários
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import func, select
+    from extensions import db
+    from models import Favorito, Oferta, Usuario
+
+    with app.app_context():
+        usuario = Usuario.query.filter_by(email=EMAIL_BENCHMARK).first()
+        if usuario is None:
+            usuario = Usuario(nome="Benchmark", email=EMAIL_BENCHMARK, senha="perf123")
+            db.session.add(usuario)
+            db.session.commit()
+        usuario_id = usuario.id
+    # Começa sem favoritos para o cenário favoritar não esbarrar em duplicados (e desfaz
+    # os contadores de uma execução anterior interrompida)
+    limpar_favoritos(app, usuario_id)
+
+    with app.app_context():
+        # Leitor de favoritos: o usuário com mais favoritos entre os primeiros
+        leitor = db.session.execute(
+            select(Favorito.usuario_id, func.count(Favorito.id).label("total"))
+            .group_by(Favorito.usuario_id).order_by(func.count(Favorito.id).desc()).limit(1)
+        ).first()
+        ofertas = db.session.execute(
+            select(Oferta.id, Oferta.destaque).order_by(Oferta.likes.desc(), Oferta.id).limit(5000)
+        ).all()
+        dados = {
+            "usuarios": db.session.scalar(select(func.count(Usuario.id))),
+            "ofertas": db.session.scalar(select(func.count(Oferta.id))),
+            "favoritos": db.session.scalar(select(func.count(Favorito.id))),
+        }
+        return {
+            "usuario": {"Authorization": "Bearer " + create_access_token(identity=str(usuario_id))},
+            "leitor": {"Authorization": "Bearer " + create_access_token(identity=str(leitor[0] if leitor else usuario_id))},
+            "admin": {"Authorization": "Bearer " + create_access_token(identity=str(usuario_id),
+                                                                        additional_claims={"admin": True})},
+            "usuario_id": usuario_id,
+            "ofertas": [oferta_id for oferta_id, _ in ofertas],
+            "destaques": dict(ofertas),
+            "dados": dados,
+        }
+
+
+def cenarios(contexto):
+    # nome -> (requisições padrão, função(i) -> (método, caminho, headers))
+    ofertas = contexto["ofertas"]
+    categorias = ["Eletrônicos", "Moda", "Casa", "Games", None]
+    csv = {**contexto["admin"], "Accept": "text/csv"}
+
+    def listar(i):
+        categoria = categorias[i % len(categorias)]
+        return "GET", "/ofertas/?limit=20" + (f"&categoria={categoria}" if categoria else ""), {}
+
+    return {
+        "listar_ofertas": (200, listar),
+        "ofertas_todas": (20, lambda i: ("GET", "/ofertas/todas", {})),
+        "favoritos": (200, lambda i: ("GET", f"/usuarios/favoritos?page={i % 5 + 1}&per_page=20", contexto["leitor"])),
+        "estatisticas": (200, lambda i: ("GET", "/usuarios/estatisticas", contexto["usuario"])),
+        "exportar_csv": (3, lambda i: ("GET", "/admin/exportar-ofertas", csv)),
+        "favoritar": (min(200, len(ofertas)),
+                      lambda i: ("POST", f"/usuarios/favoritos/{ofertas[i]}", contexto["usuario"])),
+    }
+
+
+def percentil(ordenados, fracao):
+    if not ordenados:
+        return None
+    return ordenados[min(len(ordenados) - 1, int(round(fracao * (len(ordenados) - 1))))]
+
+
+def medir(fabrica_cliente, gerar, total, concorrencia, aquecimento):
+    latencias, erros = [], []
+    contador = itertools.count()
+    lock = threading.Lock()
+
+    def trabalhar():
+        cliente = fabrica_cliente()
+        while True:
+            i = next(contador)
+            if i >= total:
+                return
+            metodo, caminho, headers = gerar(i)
+            inicio = time.perf_counter()
+            try:
+                status = cliente.requisitar(metodo, caminho, headers)
+            except Exception as e:
+                status = repr(e)
+            duracao = time.perf_counter() - inicio
+            with lock:
+                latencias.append(duracao)
+                if not isinstance(status, int) or status >= 400:
+                    erros.append(status)
+
+    # Aquecimento (caches, conexões) fora da medição
+    aquecer = fabrica_cliente()
+    for i in range(aquecimento):
+        aquecer.requisitar(*gerar(total + i))
+
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabalhar) for _ in range(concorrencia)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    parede = time.perf_counter() - inicio
+
+    ordenados = sorted(latencias)
+    ms = lambda valor: round(valor * 1000, 2) if valor is not None else None
+    return {
+        "requisicoes": len(ordenados),
+        "erros": len(erros),
+        "exemplos_erro": [str(e) for e in erros[:3]],
+        "p50_ms": ms(percentil(ordenados, 0.50)),
+        "p90_ms": ms(percentil(ordenados, 0.90)),
+        "p99_ms": ms(percentil(ordenados, 0.99)),
+        "media_ms": ms(sum(ordenados) / len(ordenados)) if ordenados else None,
+        "max_ms": ms(ordenados[-1]) if ordenados else None,
+        "rps": round(len(ordenados) / parede, 1) if parede else None,
+    }
+
+
+def limpar_favoritos(app, usuario_id, destaques=None):
+    # Desfaz o cenário favoritar: além das linhas de Favorito, o favoritar somou 1 em
+    # likes, nos contadores de engajamento e nos eventos do rollup (e pode ter marcado
+    # destaque). Sem isso cada execução mede um banco diferente da anterior.
+    # destaques: {oferta_id: destaque} de antes da execução
+    from sqlalchemy import delete, select, update
+    from extensions import db
+    from models import Favorito, Oferta
+    from services import engajamento, estatisticas, rollup
+    from services.cache import invalidar_curtidas
+    with app.app_context():
+        ofertas = db.session.scalars(select(Favorito.oferta_id).where(Favorito.usuario_id == usuario_id)).all()
+        if ofertas:
+            db.session.execute(delete(Favorito).where(Favorito.usuario_id == usuario_id))
+            db.session.execute(
+                update(Oferta).where(Oferta.id.in_(ofertas), Oferta.likes > 0).values(likes=Oferta.likes - 1)
+            )
+            rollup.registrar_curtidas({oferta_id: -1 for oferta_id in ofertas})
+        for valor in (True, False):
+            ids = [oferta_id for oferta_id, destaque in (destaques or {}).items() if bool(destaque) is valor]
+            if ids:
+                db.session.execute(update(Oferta).where(Oferta.id.in_(ids)).values(destaque=valor))
+        invalidar_curtidas()
+        db.session.commit()
+        engajamento.recalcular()
+        estatisticas.recalcular()
+
+
+def subir_gunicorn(porta, workers):
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--preload", "-w", str(workers), "-b", f"127.0.0.1:{porta}",
+         "app:create_app()"],
+        cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    import requests
+    limite = time.monotonic() + 60
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise SystemExit("gunicorn encerrou na inicialização (está instalado?)")
+        try:
+            requests.get(f"http://127.0.0.1:{porta}/painel", timeout=1)
+            return processo
+        except requests.RequestException:
+            time.sleep(0.3)
+    processo.terminate()
+    raise SystemExit("gunicorn não respondeu em 60s")
+
+
+def versao_git():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual, anterior, limiar):
+    # Regressão: p50/p99 acima ou vazão abaixo do limiar (%) em relação ao arquivo anterior
+    regressoes = []
+    print(f"\n== comparação com {anterior['meta'].get('commit')} (limiar {limiar}%)")
+    for nome, novo in atual["cenarios"].items():
+        velho = anterior["cenarios"].get(nome)
+        if not velho:
+            continue
+        linha = []
+        for chave, pior_se_maior in (("p50_ms", True), ("p99_ms", True), ("rps", False)):
+            if not velho.get(chave) or novo.get(chave) is None:
+                continue
+            variacao = (novo[chave] - velho[chave]) / velho[chave] * 100
+            linha.append(f"{chave} {velho[chave]} -> {novo[chave]} ({variacao:+.1f}%)")
+            if (variacao > limiar) if pior_se_maior else (variacao < -limiar):
+                regressoes.append(f"{nome}.{chave}")
+        print(f"   {nome:<16} " + "  ".join(linha))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--alvo", default=None, help="URL base (ex.: http://127.0.0.1:8000); padrão: test client.")
+    parser.add_argument("--gunicorn", action="store_true", help="Sobe um gunicorn --preload local e mede por HTTP.")
+    parser.add_argument("--workers", type=int, default=4, help="Workers do gunicorn.")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--concorrencia", type=int, default=4, help="Threads clientes.")
+    parser.add_argument("--requisicoes", type=int, default=None, help="Sobrescreve o total de cada cenário.")
+    parser.add_argument("--aquecimento", type=int, default=3)
+    parser.add_argument("--cenarios", default=None, help="Lista separada por vírgula (padrão: todos).")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON de resultados.")
+    parser.add_argument("--comparar", default=None, help="JSON de uma execução anterior.")
+    parser.add_argument("--limiar", type=float, default=10.0, help="Variação (%%) considerada regressão.")
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app()
+    contexto = preparar(app)
+
+    gunicorn = None
+    if args.gunicorn:
+        gunicorn = subir_gunicorn(args.porta, args.workers)
+        args.alvo = f"http://127.0.0.1:{args.porta}"
+    fabrica_cliente = (lambda: ClienteHTTP(args.alvo)) if args.alvo else (lambda: ClienteTeste(app))
+
+    selecionados = args.cenarios.split(",") if args.cenarios else None
+    resultado = {
+        "meta": {
+            "commit": versao_git(),
+            "data": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "alvo": args.alvo or "test-client",
+            "workers": args.workers if args.gunicorn else None,
+            "concorrencia": args.concorrencia,
+            "banco": app.config["SQLALCHEMY_DATABASE_URI"].split("://")[0],
+            "dados": contexto["dados"],
+        },
+        "cenarios": {},
+    }
+    try:
+        for nome, (padrao, gerar) in cenarios(contexto).items():
+            if selecionados and nome not in selecionados:
+                continue
+            aquecimento = 0 if nome == "favoritar" else args.aquecimento
+            total = args.requisicoes or padrao
+            if nome == "favoritar":
+                total = min(total, len(contexto["ofertas"]))
+            resultado["cenarios"][nome] = medir(fabrica_cliente, gerar, total, args.concorrencia, aquecimento)
+            r = resultado["cenarios"][nome]
+            print(f"{nome:<16} n={r['requisicoes']:<5} erros={r['erros']:<3} p50={r['p50_ms']}ms "
+                  f"p90={r['p90_ms']}ms p99={r['p99_ms']}ms {r['rps']} req/s", flush=True)
+    finally:
+        if gunicorn is not None:
+            gunicorn.terminate()
+            gunicorn.wait()
+        limpar_favoritos(app, contexto["usuario_id"], contexto["destaques"])
+
+    if args.saida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            regressoes = comparar(resultado, json.load(arquivo), args.limiar)
+        if regressoes:
+            print("regressões: " + ", ".join(regressoes))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select, update
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from models import Comentario, Favorito, MarcaRollup, Oferta, Usuario
+from utils.upsert import insert_com_conflito
+
+# Vocabulário dos dados sintéticos: títulos, lojas e categorias parecidos com os reais
+LOJAS = ['Amazon', 'Mercado Livre', 'Magalu', 'Americanas', 'Casas Bahia', 'Shopee', 'KaBuM!', 'Netshoes']
+CATEGORIAS = ['Eletrônicos', 'Informática', 'Casa', 'Moda', 'Esportes', 'Beleza', 'Games', 'Livros', 'Brinquedos',
+              'Celulares', 'Eletrodomésticos', 'Ferramentas']
+PRODUTOS = ['Fone Bluetooth', 'Smartphone', 'Notebook', 'Smart TV', 'Air Fryer', 'Tênis de Corrida', 'Mochila',
+            'Cafeteira', 'Monitor', 'Teclado Mecânico', 'Mouse Gamer', 'Liquidificador', 'Aspirador Robô',
+            'Relógio', 'Caixa de Som', 'Cadeira Gamer', 'Kindle', 'Panela Elétrica', 'Furadeira', 'Perfume']
+MARCAS = ['Samsung', 'Xiaomi', 'Apple', 'LG', 'Philips', 'JBL', 'Nike', 'Adidas', 'Mondial', 'Electrolux',
+          'Lenovo', 'Dell', 'Logitech', 'Multilaser', 'Britânia', 'Bosch']
+ADJETIVOS = ['Pro', 'Max', 'Lite', 'Plus', 'Ultra', 'Slim', 'Turbo', 'Mini', 'Premium', 'Essential']
+FRASES = ['Ótimo preço!', 'Comprei e chegou rápido.', 'Vale muito a pena.', 'Já teve mais barato.',
+          'Alguém sabe se tem garantia?', 'Cupom funcionou aqui.', 'Produto excelente.', 'Esgotou :(']
+
+
+def _em_lotes(gerador, tamanho):
+    lote = []
+    for item in gerador:
+        lote.append(item)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _popular(aleatorio, ids):
+    # Distribuição concentrada: poucas ofertas recebem a maior parte dos favoritos/comentários
+    return ids[int(len(ids) * aleatorio.random() ** 3)]
+
+
+def _usuarios(quantidade, inicio, senha_hash):
+    for n in range(inicio, inicio + quantidade):
+        yield {'nome': f'Usuário {n}', 'email': f'perf{n}@exemplo.com', 'senha_hash': senha_hash}
+
+
+def _ofertas(aleatorio, quantidade, agora):
+    for _ in range(quantidade):
+        produto = aleatorio.choice(PRODUTOS)
+        marca = aleatorio.choice(MARCAS)
+        titulo = f'{produto} {marca} {aleatorio.choice(ADJETIVOS)} {aleatorio.randint(1, 999)}'
+        yield {
+            'titulo': titulo,
+            'descricao': f'{produto} {marca} com desconto. {aleatorio.choice(FRASES)}',
+            'preco': round(aleatorio.lognormvariate(5, 1), 2),
+            'imagem': f'https://picsum.photos/seed/{aleatorio.randint(1, 10 ** 6)}/400',
+            'loja': aleatorio.choice(LOJAS),
+            'link_afiliado': f'https://exemplo.com/p/{aleatorio.randint(1, 10 ** 9)}',
+            'categoria': aleatorio.choice(CATEGORIAS),
+            'destaque': aleatorio.random() < 0.02,
+            'likes': min(int(aleatorio.paretovariate(1.2)) - 1, 50000),
+            'data_criacao': agora - timedelta(seconds=aleatorio.randint(0, 365 * 86400)),
+        }
+
+
+def _favoritos(aleatorio, quantidade, usuarios, ofertas, agora):
+    # Pares (usuário, oferta) únicos: cada usuário recebe uma fatia do total
+    por_usuario, resto = divmod(quantidade, len(usuarios))
+    for posicao, usuario_id in enumerate(usuarios):
+        alvo = min(por_usuario + (1 if posicao < resto else 0), len(ofertas))
+        escolhidas = set()
+        while len(escolhidas) < alvo:
+            escolhidas.add(_popular(aleatorio, ofertas) if len(escolhidas) < alvo // 2 else aleatorio.choice(ofertas))
+        for oferta_id in escolhidas:
+            yield {
+                'usuario_id': usuario_id,
+                'oferta_id': oferta_id,
+                'data_favorito': agora - timedelta(seconds=aleatorio.randint(0, 365 * 86400)),
+            }
+
+
+def _comentarios(aleatorio, quantidade, usuarios, ofertas, agora):
+    for _ in range(quantidade):
+        yield {
+            'texto': aleatorio.choice(FRASES),
+            'autor_id': aleatorio.choice(usuarios),
+            'oferta_id': _popular(aleatorio, ofertas),
+            'data_criacao': agora - timedelta(seconds=aleatorio.randint(0, 365 * 86400)),
+        }
+
+
+def semear(usuarios=10000, ofertas=100000, favoritos=1000000, comentarios=100000, lote=20000, semente=42,
+           progresso=None):
+    # Insere os volumes pedidos (somando aos dados existentes) com INSERTs executemany
+    # em lotes, um commit por lote; no fim reconstrói os contadores derivados.
+    # Mesma semente + mesmo banco inicial = mesmos dados.
+    from services import engajamento, estatisticas
+    from services.cache import invalidar_catalogo
+    from services.notificacoes import MARCA as MARCA_NOTIFICACAO
+
+    aleatorio = random.Random(semente)
+    agora = datetime.utcnow().replace(microsecond=0)
+    progresso = progresso or (lambda mensagem: None)
+    tempos = {}
+
+    def inserir(nome, tabela, linhas, stmt=None):
+        inicio = time.perf_counter()
+        total = 0
+        for parte in _em_lotes(linhas, lote):
+            db.session.execute(stmt if stmt is not None else insert(tabela), parte)
+            db.session.commit()
+            total += len(parte)
+            progresso(f'{nome}: {total}')
+        tempos[nome] = {'linhas': total, 'segundos': round(time.perf_counter() - inicio, 2)}
+
+    inicio_usuarios = (db.session.scalar(select(func.max(Usuario.id))) or 0) + 1
+    # Um hash só para todos: gerar um por usuário dominaria o tempo da carga
+    senha_hash = generate_password_hash('perf123')
+    inserir('usuarios', Usuario.__table__, _usuarios(usuarios, inicio_usuarios, senha_hash))
+    inserir('ofertas', Oferta.__table__, _ofertas(aleatorio, ofertas, agora))
+
+    ids_usuarios = db.session.scalars(select(Usuario.id).order_by(Usuario.id)).all()
+    ids_ofertas = db.session.scalars(select(Oferta.id).order_by(Oferta.id)).all()
+    if ids_usuarios and ids_ofertas:
+        # Favoritos vão para os usuários novos; sem eles, um par já existente é ignorado
+        novos = [u for u in ids_usuarios if u >= inicio_usuarios] or ids_usuarios
+        inserir('favoritos', Favorito.__table__, _favoritos(aleatorio, favoritos, novos, ids_ofertas, agora),
+                insert_com_conflito(Favorito.__table__).on_conflict_do_nothing())
+        inserir('comentarios', Comentario.__table__,
+                _comentarios(aleatorio, comentarios, ids_usuarios, ids_ofertas, agora))
+
+    # Derivados: contadores, resumo, versão do catálogo; as ofertas sintéticas não
+    # disparam notificações de alerta
+    inicio = time.perf_counter()
+    engajamento.recalcular()
+    estatisticas.recalcular()
+    invalidar_catalogo()
+    if ids_ofertas:
+        db.session.execute(
+            update(MarcaRollup).where(MarcaRollup.fonte == MARCA_NOTIFICACAO, MarcaRollup.ultimo_id < ids_ofertas[-1])
+            .values(ultimo_id=ids_ofertas[-1], atualizado_em=datetime.utcnow())
+        )
+    db.session.commit()
+    tempos['derivados'] = {'segundos': round(time.perf_counter() - inicio, 2)}
+    return tempos
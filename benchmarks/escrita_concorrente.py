@@ -0,0 +1,112 @@
+"""Vazão de escrita concorrente no SQLite: configuração padrão x utils/banco.py.
+
+Simula workers do gunicorn (processos) gravando curtidas ao mesmo tempo (likes da
+oferta + evento do rollup, como o flush do buffer), com uma leitura antes de cada
+escrita, e mede transações/s e erros de lock.
+
+    python benchmarks/escrita_concorrente.py --processos 8 --transacoes 300
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, insert, select, text, update  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from models import CurtidaEvento, Oferta  # noqa: E402
+from extensions import db  # noqa: E402
+from utils.banco import configurar_engine, opcoes_engine  # noqa: E402
+
+OFERTAS = 500
+
+
+def criar_engine(uri, modo):
+    if modo == "padrao":
+        # Como o app era antes: driver com timeout de 5s e journal em rollback
+        return create_engine(uri)
+    return configurar_engine(create_engine(uri, **opcoes_engine(uri)))
+
+
+def preparar(caminho):
+    engine = create_engine(f"sqlite:///{caminho}")
+    db.metadata.create_all(engine, tables=[Oferta.__table__, CurtidaEvento.__table__])
+    with engine.begin() as conexao:
+        conexao.execute(insert(Oferta), [
+            {"titulo": f"Oferta {i}", "preco": 10.0 + i, "loja": "Loja", "categoria": "Geral", "likes": 0}
+            for i in range(OFERTAS)
+        ])
+    engine.dispose()
+
+
+def trabalhar(argumentos):
+    caminho, modo, transacoes, semente = argumentos
+    engine = criar_engine(f"sqlite:///{caminho}", modo)
+    aleatorio = random.Random(semente)
+    ok = erros = 0
+    for _ in range(transacoes):
+        oferta_id = aleatorio.randint(1, OFERTAS)
+        try:
+            with engine.begin() as conexao:
+                conexao.execute(select(Oferta.likes).where(Oferta.id == oferta_id)).scalar()
+                conexao.execute(update(Oferta).where(Oferta.id == oferta_id).values(likes=Oferta.likes + 1))
+                conexao.execute(insert(CurtidaEvento).values(oferta_id=oferta_id, delta=1))
+            ok += 1
+        except OperationalError:
+            erros += 1
+    engine.dispose()
+    return ok, erros
+
+
+def medir(modo, processos, transacoes):
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "bench.db")
+        preparar(caminho)
+        if modo != "padrao":
+            # WAL é persistente no arquivo; liga antes de os workers abrirem conexões
+            criar_engine(f"sqlite:///{caminho}", modo).connect().close()
+        inicio = time.perf_counter()
+        with Pool(processos) as pool:
+            resultados = pool.map(trabalhar, [(caminho, modo, transacoes, i) for i in range(processos)])
+        duracao = time.perf_counter() - inicio
+        engine = create_engine(f"sqlite:///{caminho}")
+        with engine.connect() as conexao:
+            modo_journal = conexao.execute(text("PRAGMA journal_mode")).scalar()
+        engine.dispose()
+    ok = sum(r[0] for r in resultados)
+    erros = sum(r[1] for r in resultados)
+    return {
+        "modo": modo,
+        "journal_mode": modo_journal,
+        "processos": processos,
+        "transacoes_ok": ok,
+        "erros_lock": erros,
+        "segundos": round(duracao, 3),
+        "transacoes_por_segundo": round(ok / duracao, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processos", type=int, default=8)
+    parser.add_argument("--transacoes", type=int, default=300, help="Transações por processo.")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON.")
+    args = parser.parse_args()
+
+    resultados = [medir(modo, args.processos, args.transacoes) for modo in ("padrao", "configurado")]
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return
+    for r in resultados:
+        print(f"{r['modo']:<12} journal={r['journal_mode']:<8} {r['transacoes_ok']:>6} ok "
+              f"{r['erros_lock']:>4} erros  {r['segundos']:>7.2f}s  {r['transacoes_por_segundo']:>8.1f} tx/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Relatório de importação e boot dos workers (python -X importtime + fork).
+
+Mostra o que custa importar o projeto e compara um worker que monta o app
+sozinho (gunicorn sem --preload) com um worker criado por fork depois de o
+master montar o app (gunicorn --preload "app:create_app()"): tempo até ficar
+pronto e memória privada (Linux, /proc/self/smaps_rollup) após um request.
+
+    python benchmarks/tempo_importacao.py [--top 15] [--workers 4] [--json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Código rodado nos subprocessos: mede o boot e a memória privada de cada worker
+_MEDIR = r"""
+import json, os, sys, time
+sys.path.insert(0, {raiz!r})
+
+def privado_kb():
+    try:
+        with open('/proc/self/smaps_rollup') as arquivo:
+            campos = dict(l.split(':', 1) for l in arquivo if ':' in l)
+        return sum(int(campos[c].split()[0]) for c in ('Private_Clean', 'Private_Dirty'))
+    except OSError:
+        return None
+
+def servir(app):
+    app.test_client().get('/painel')
+
+def worker_sem_preload():
+    inicio = time.perf_counter()
+    from app import create_app
+    app = create_app()
+    pronto = time.perf_counter() - inicio
+    servir(app)
+    return {{'pronto_ms': round(pronto * 1000, 1), 'privado_kb': privado_kb()}}
+
+modo, workers = sys.argv[1], int(sys.argv[2])
+resultados = []
+if modo == 'sem_preload':
+    for _ in range(workers):
+        leitura, escrita = os.pipe()
+        if os.fork() == 0:
+            os.write(escrita, json.dumps(worker_sem_preload()).encode())
+            os._exit(0)
+        os.close(escrita)
+        resultados.append(json.loads(os.read(leitura, 4096)))
+        os.wait()
+else:
+    from app import create_app
+    app = create_app()
+    for _ in range(workers):
+        leitura, escrita = os.pipe()
+        inicio = time.perf_counter()
+        if os.fork() == 0:
+            pronto = time.perf_counter() - inicio
+            servir(app)
+            os.write(escrita, json.dumps({{'pronto_ms': round(pronto * 1000, 1), 'privado_kb': privado_kb()}}).encode())
+            os._exit(0)
+        os.close(escrita)
+        resultados.append(json.loads(os.read(leitura, 4096)))
+        os.wait()
+print(json.dumps(resultados))
+"""
+
+
+def importtime(codigo):
+    # Devolve [(modulo, proprio_us, acumulado_us, nivel)] na ordem do -X importtime
+    saida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    ).stderr
+    modulos = []
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        nivel = (len(nome) - len(nome.lstrip())) // 2
+        modulos.append((nome.strip(), int(proprio), int(acumulado), nivel))
+    return modulos
+
+
+def resumo_importacao(codigo, top):
+    # Total = módulos de nível 0; a lista mostra também os importados diretamente por eles
+    modulos = importtime(codigo)
+    raiz = [m for m in modulos if m[3] <= 1]
+    return {
+        "codigo": codigo,
+        "total_ms": round(sum(m[2] for m in modulos if m[3] == 0) / 1000, 1),
+        "modulos": len(modulos),
+        "mais_lentos": [
+            {"modulo": nome, "acumulado_ms": round(acumulado / 1000, 1), "proprio_ms": round(proprio / 1000, 1)}
+            for nome, proprio, acumulado, _ in sorted(raiz, key=lambda m: -m[2])[:top]
+        ],
+    }
+
+
+def medir_workers(modo, workers):
+    saida = subprocess.run(
+        [sys.executable, "-c", _MEDIR.format(raiz=RAIZ), modo, str(workers)],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    ).stdout
+    resultados = json.loads(saida.strip().splitlines()[-1])
+    privados = [r["privado_kb"] for r in resultados if r["privado_kb"] is not None]
+    return {
+        "modo": modo,
+        "workers": workers,
+        "pronto_ms_medio": round(sum(r["pronto_ms"] for r in resultados) / len(resultados), 1),
+        "privado_kb_medio": round(sum(privados) / len(privados)) if privados else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=15, help="Módulos mais lentos listados.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--json", action="store_true", help="Saída em JSON.")
+    args = parser.parse_args()
+
+    relatorio = {
+        "importacao": [
+            resumo_importacao("import app", args.top),
+            resumo_importacao("from app import create_app; create_app()", args.top),
+        ],
+        "workers": [medir_workers(modo, args.workers) for modo in ("sem_preload", "com_preload")]
+        if hasattr(os, "fork") else [],
+    }
+    if args.json:
+        print(json.dumps(relatorio, indent=2))
+        return
+
+    for item in relatorio["importacao"]:
+        print(f"== {item['codigo']}: {item['total_ms']} ms, {item['modulos']} módulos")
+        for modulo in item["mais_lentos"]:
+            print(f"   {modulo['acumulado_ms']:>8.1f} ms  {modulo['modulo']}")
+    for item in relatorio["workers"]:
+        print(f"== worker {item['modo']:<12} pronto em {item['pronto_ms_medio']:>8.1f} ms, "
+              f"memória privada {item['privado_kb_medio']} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import os
+
+import click
+from sqlalchemy import select
+from extensions import db
+from models import Oferta, Favorito, Comentario
+
+
+def consultas_quentes():
+    # Consultas representativas dos endpoints mais acessados (valores de exemplo)
+    return {
+        'listar_ofertas': select(Oferta).order_by(Oferta.data_criacao.desc(), Oferta.id.desc()).limit(21),
+        'listar_ofertas_categoria': select(Oferta).filter_by(categoria='Moda')
+            .order_by(Oferta.data_criacao.desc(), Oferta.id.desc()).limit(21),
+        'mais_curtidas': select(Oferta).order_by(Oferta.likes.desc()).limit(5),
+        'ofertas_destaque': select(Oferta).filter_by(destaque=True).order_by(Oferta.likes.desc()),
+        'favoritos_usuario': select(Favorito).filter_by(usuario_id=1)
+            .order_by(Favorito.data_favorito.desc()).limit(10),
+        'favorito_par': select(Favorito).filter_by(usuario_id=1, oferta_id=1),
+        'comentarios_oferta': select(Comentario).filter_by(oferta_id=1)
+            .order_by(Comentario.data_criacao.desc()),
+    }
+
+
+def registrar_comandos(app):
+
+    @app.cli.command('plano-consultas')
+    def plano_consultas():
+        """Mostra o plano de execução das consultas quentes."""
+        dialeto = db.engine.dialect
+        prefixo = 'EXPLAIN QUERY PLAN' if dialeto.name == 'sqlite' else 'EXPLAIN'
+        for nome, consulta in consultas_quentes().items():
+            sql = str(consulta.compile(dialect=dialeto, compile_kwargs={'literal_binds': True}))
+            click.echo(f'== {nome}')
+            for linha in db.session.execute(db.text(f'{prefixo} {sql}')):
+                click.echo('   ' + ' | '.join(str(c) for c in linha))
+
+    @app.cli.command('telegram-worker')
+    @click.option('--intervalo', default=2.0, show_default=True, help='Segundos entre varreduras da fila vazia.')
+    @click.option('--uma-vez', is_flag=True, help='Esvazia a fila uma vez e sai.')
+    def telegram_worker(intervalo, uma_vez):
+        """Despacha as mensagens pendentes da outbox do Telegram (e as notificações dos alertas)."""
+        from services.notificacoes import processar
+        from services.outbox import despachar_pendentes, executar_despachante
+        if uma_vez:
+            geradas = processar()
+            enviadas, falhas = despachar_pendentes()
+            click.echo(f'{geradas} notificações geradas, {enviadas} enviadas, {falhas} falhas')
+            return
+        executar_despachante(app, intervalo, tarefas=[processar])
+
+    @app.cli.command('recalcular-engajamento')
+    def recalcular_engajamento():
+        """Reconstrói os contadores de engajamento a partir de favoritos e likes."""
+        from services.engajamento import recalcular
+        recalcular()
+        click.echo('Contadores de engajamento recalculados.')
+
+    @app.cli.command('recalcular-estatisticas')
+    def recalcular_estatisticas():
+        """Reconstrói o resumo de estatísticas (totais e listas) a partir das tabelas."""
+        from services.estatisticas import recalcular
+        recalcular()
+        click.echo('Estatísticas recalculadas.')
+
+    @app.cli.command('rollup')
+    @click.option('--lote', default=50000, show_default=True, help='Linhas por transação (faixa de ids).')
+    def rollup(lote):
+        """Agrega no rollup diário as ofertas, favoritos, comentários e likes novos."""
+        from services.rollup import executar
+        processadas = executar(lote)
+        for fonte, total in processadas.items():
+            click.echo(f'{fonte}: {total} ids processados')
+
+    @app.cli.command('perf-seed')
+    @click.option('--usuarios', default=10000, show_default=True)
+    @click.option('--ofertas', default=100000, show_default=True)
+    @click.option('--favoritos', default=1000000, show_default=True)
+    @click.option('--comentarios', default=100000, show_default=True)
+    @click.option('--lote', default=20000, show_default=True, help='Linhas por INSERT/commit.')
+    @click.option('--semente', default=42, show_default=True, help='Semente do gerador (dados reproduzíveis).')
+    def perf_seed(usuarios, ofertas, favoritos, comentarios, lote, semente):
+        """Gera usuários, ofertas, favoritos e comentários sintéticos para os benchmarks."""
+        from benchmarks.dados import semear
+        tempos = semear(usuarios, ofertas, favoritos, comentarios, lote, semente,
+                        progresso=lambda mensagem: click.echo(mensagem, err=True))
+        for nome, valores in tempos.items():
+            linhas = f"{valores['linhas']} linhas em " if 'linhas' in valores else ''
+            click.echo(f"{nome}: {linhas}{valores['segundos']}s")
+
+    @app.cli.command('amazon-sync')
+    @click.argument('asins', nargs=-1)
+    @click.option('--todos', is_flag=True, help='Atualiza todos os produtos já cadastrados.')
+    @click.option('--forcar', is_flag=True, help='Ignora o cache e consulta a PA-API.')
+    def amazon_sync(asins, todos, forcar):
+        """Busca produtos na PA-API pelo ASIN e grava/atualiza em produtos."""
+        from models import Produto
+        from services.amazon import ErroAmazon, sincronizar
+        asins = list(asins)
+        if todos:
+            asins += db.session.scalars(select(Produto.asin)).all()
+        if not asins:
+            raise click.UsageError('Informe ASINs ou use --todos.')
+        try:
+            relatorio = sincronizar(asins, forcar=forcar)
+        except ErroAmazon as e:
+            raise click.ClickException(str(e))
+        click.echo(f"{relatorio['inseridos']} inseridos, {relatorio['atualizados']} atualizados, "
+                   f"{relatorio['inalterados']} inalterados, {relatorio['do_cache']} do cache, "
+                   f"{relatorio['requisicoes']} requisições")
+        if relatorio['nao_encontrados']:
+            click.echo('Não encontrados: ' + ', '.join(relatorio['nao_encontrados']))
+        for erro in relatorio['erros']:
+            click.echo(f"Erro em {', '.join(erro['asins'])}: {erro['erro']}", err=True)
+
+    @app.cli.command('produtos-upsert')
+    @click.argument('arquivo', type=click.File('r', encoding='utf-8'))
+    @click.option('--formato', type=click.Choice(['json', 'ndjson', 'csv']),
+                  help='Padrão: deduzido pela extensão do arquivo.')
+    def produtos_upsert(arquivo, formato):
+        """Insere/atualiza produtos por ASIN a partir de um arquivo JSON, NDJSON ou CSV."""
+        import csv
+        import json
+        from services.importacao import ler_lista, ler_ndjson
+        from services.produtos import importar_produtos
+
+        formato = formato or {'.ndjson': 'ndjson', '.jsonl': 'ndjson', '.csv': 'csv'}.get(
+            os.path.splitext(arquivo.name)[1].lower(), 'json')
+        if formato == 'ndjson':
+            registros = ler_ndjson(arquivo)
+        elif formato == 'csv':
+            # Células vazias viram None para os campos opcionais
+            registros = ler_lista({k: (v or None) for k, v in linha.items()} for linha in csv.DictReader(arquivo))
+        else:
+            registros = ler_lista(json.load(arquivo))
+
+        relatorio = importar_produtos(registros)
+        click.echo(f"{relatorio['recebidos']} recebidos: {relatorio['inseridos']} inseridos, "
+                   f"{relatorio['atualizados']} atualizados, {relatorio['inalterados']} inalterados")
+        for erro in relatorio['erros']:
+            detalhes = '; '.join(f"{e['campo'] or '-'}: {e['mensagem']}" for e in erro['erros'])
+            click.echo(f"Linha {erro['linha']}: {detalhes}", err=True)
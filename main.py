@@ -1,41 +1,10 @@
-from flask import Flask, request, jsonify
-from amazon_paapi import AmazonApi
-from dotenv import load_dotenv
+# Alternativa de inicialização: o mesmo app da fábrica em app.py. A consulta de
+# produtos (/produto/?asin=) usa o cliente da PA-API criado só no primeiro uso.
 import os
-from pathlib import Path
 
-env_path = Path(__file__).parent / '.env'
-load_dotenv(dotenv_path=env_path)
+from app import create_app
 
-print("ACCESS_KEY:", os.getenv("ACCESS_KEY"))
-print("SECRET_KEY:", os.getenv("SECRET_KEY"))
-print("PARTNER_TAG:", os.getenv("PARTNER_TAG"))
-
-app = Flask(__name__)
-
-amazon = AmazonApi(
-    key=os.getenv("ACCESS_KEY"),
-    secret=os.getenv("SECRET_KEY"),
-    tag=os.getenv("PARTNER_TAG"),
-    country="BR"
-)
-
-@app.route('/produto', methods=['GET'])
-def produto():
-    asin = request.args.get('asin')
-    if not asin:
-        return jsonify({'erro': 'ASIN não fornecido'}), 400
-
-    # Exemplo de resposta simulada
-    return jsonify({'asin': asin, 'produto': 'Nome do produto fictício'})
-
-    item = result.items[0]
-    return jsonify({
-        'titulo': item.title,
-        'imagem': item.image_url,
-        'preco': item.list_price,
-        'link': item.detail_page_url
-    })
+app = create_app()
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    app.run(debug=True, port=int(os.environ.get("PORT", 5000)))
@@ -0,0 +1,41 @@
+"""cria tabela telegram_outbox
+
+Revision ID: 1f9a6c3e8d27
+Revises: 7c41d2a9e3b0
+Create Date: 2026-10-18 11:02:37.540921
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1f9a6c3e8d27'
+down_revision = '7c41d2a9e3b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('telegram_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('metodo', sa.String(length=30), nullable=False),
+    sa.Column('chat_id', sa.String(length=64), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('tentativas', sa.Integer(), nullable=False),
+    sa.Column('proxima_tentativa', sa.DateTime(), nullable=False),
+    sa.Column('ultimo_erro', sa.Text(), nullable=True),
+    sa.Column('data_criacao', sa.DateTime(), nullable=True),
+    sa.Column('data_envio', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('telegram_outbox', schema=None) as batch_op:
+        batch_op.create_index('ix_telegram_outbox_status_proxima', ['status', 'proxima_tentativa'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('telegram_outbox', schema=None) as batch_op:
+        batch_op.drop_index('ix_telegram_outbox_status_proxima')
+
+    op.drop_table('telegram_outbox')
@@ -0,0 +1,71 @@
+"""cria indice de busca textual em ofertas
+
+Revision ID: 4b7e1d9f2a63
+Revises: c6a8f0e2b914
+Create Date: 2026-10-18 14:31:48.902215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b7e1d9f2a63'
+down_revision = 'c6a8f0e2b914'
+branch_labels = None
+depends_on = None
+
+# Deve ser a mesma expressão usada em services/busca.py
+VETOR_POSTGRES = (
+    "setweight(to_tsvector('portuguese', coalesce(titulo, '')), 'A') || "
+    "setweight(to_tsvector('portuguese', coalesce(loja, '')), 'B') || "
+    "setweight(to_tsvector('portuguese', coalesce(categoria, '')), 'B') || "
+    "setweight(to_tsvector('portuguese', coalesce(descricao, '')), 'C')"
+)
+
+
+def upgrade():
+    dialeto = op.get_bind().dialect.name
+
+    if dialeto == 'sqlite':
+        # FTS5 com conteúdo externo: o texto fica só em "oferta"; gatilhos mantêm o índice
+        op.execute(
+            "CREATE VIRTUAL TABLE oferta_fts USING fts5("
+            "titulo, descricao, loja, categoria, "
+            "content='oferta', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "CREATE TRIGGER oferta_fts_ai AFTER INSERT ON oferta BEGIN "
+            "INSERT INTO oferta_fts(rowid, titulo, descricao, loja, categoria) "
+            "VALUES (new.id, new.titulo, new.descricao, new.loja, new.categoria); END"
+        )
+        op.execute(
+            "CREATE TRIGGER oferta_fts_ad AFTER DELETE ON oferta BEGIN "
+            "INSERT INTO oferta_fts(oferta_fts, rowid, titulo, descricao, loja, categoria) "
+            "VALUES ('delete', old.id, old.titulo, old.descricao, old.loja, old.categoria); END"
+        )
+        op.execute(
+            "CREATE TRIGGER oferta_fts_au AFTER UPDATE OF titulo, descricao, loja, categoria ON oferta BEGIN "
+            "INSERT INTO oferta_fts(oferta_fts, rowid, titulo, descricao, loja, categoria) "
+            "VALUES ('delete', old.id, old.titulo, old.descricao, old.loja, old.categoria); "
+            "INSERT INTO oferta_fts(rowid, titulo, descricao, loja, categoria) "
+            "VALUES (new.id, new.titulo, new.descricao, new.loja, new.categoria); END"
+        )
+        op.execute("INSERT INTO oferta_fts(oferta_fts) VALUES ('rebuild')")
+
+    elif dialeto == 'postgresql':
+        # Índice GIN de expressão: sincronizado pelo próprio Postgres em INSERT/UPDATE/DELETE
+        op.execute(f"CREATE INDEX ix_oferta_busca ON oferta USING GIN (({VETOR_POSTGRES}))")
+
+
+def downgrade():
+    dialeto = op.get_bind().dialect.name
+
+    if dialeto == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS oferta_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS oferta_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS oferta_fts_ai")
+        op.execute("DROP TABLE IF EXISTS oferta_fts")
+
+    elif dialeto == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_oferta_busca")
@@ -0,0 +1,56 @@
+"""cria tabela estatisticas
+
+Revision ID: 5e2c8a7d4f10
+Revises: 4b7e1d9f2a63
+Create Date: 2026-10-18 15:02:37.418263
+
+"""
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2c8a7d4f10'
+down_revision = '4b7e1d9f2a63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    estatisticas = op.create_table('estatisticas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('total_usuarios', sa.Integer(), nullable=False),
+    sa.Column('total_ofertas', sa.Integer(), nullable=False),
+    sa.Column('total_favoritos', sa.Integer(), nullable=False),
+    sa.Column('mais_curtidas', sa.Text(), nullable=False),
+    sa.Column('destaques', sa.Text(), nullable=False),
+    sa.Column('atualizado_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Carga inicial da linha única a partir dos dados existentes
+    conexao = op.get_bind()
+    contar = lambda tabela: conexao.execute(sa.text(f"SELECT COUNT(*) FROM {tabela}")).scalar()
+    mais_curtidas = conexao.execute(sa.text(
+        "SELECT id, titulo, likes FROM oferta ORDER BY likes DESC, id DESC LIMIT 5"
+    )).all()
+    destaques = conexao.execute(sa.text(
+        "SELECT id, titulo, likes FROM oferta WHERE destaque = :sim ORDER BY likes DESC, id DESC LIMIT 20"
+    ), {'sim': True}).all()
+
+    op.bulk_insert(estatisticas, [{
+        'id': 1,
+        'total_usuarios': contar('usuario'),
+        'total_ofertas': contar('oferta'),
+        'total_favoritos': contar('favoritos'),
+        'mais_curtidas': json.dumps([{'id': i, 'titulo': t, 'likes': l} for i, t, l in mais_curtidas]),
+        'destaques': json.dumps([{'id': i, 'titulo': t, 'likes': l, 'destaque': True} for i, t, l in destaques]),
+        'atualizado_em': datetime.utcnow(),
+    }])
+
+
+def downgrade():
+    op.drop_table('estatisticas')
@@ -0,0 +1,52 @@
+"""adiciona indices nas tabelas quentes
+
+Revision ID: 7c41d2a9e3b0
+Revises: e29b811806cb
+Create Date: 2026-10-18 10:12:04.118532
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c41d2a9e3b0'
+down_revision = 'e29b811806cb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Remove favoritos duplicados (mantém o mais antigo) antes do índice único
+    op.execute(
+        "DELETE FROM favoritos WHERE id NOT IN ("
+        "SELECT MIN(id) FROM favoritos GROUP BY usuario_id, oferta_id)"
+    )
+
+    with op.batch_alter_table('oferta', schema=None) as batch_op:
+        batch_op.create_index('ix_oferta_data_criacao_id', ['data_criacao', 'id'], unique=False)
+        batch_op.create_index('ix_oferta_categoria_data_criacao_id', ['categoria', 'data_criacao', 'id'], unique=False)
+        batch_op.create_index('ix_oferta_likes', ['likes'], unique=False)
+        batch_op.create_index('ix_oferta_destaque_likes', ['destaque', 'likes'], unique=False)
+
+    with op.batch_alter_table('favoritos', schema=None) as batch_op:
+        batch_op.create_index('ix_favoritos_usuario_data_favorito', ['usuario_id', 'data_favorito'], unique=False)
+        batch_op.create_index('uq_favoritos_usuario_oferta', ['usuario_id', 'oferta_id'], unique=True)
+
+    with op.batch_alter_table('comentario', schema=None) as batch_op:
+        batch_op.create_index('ix_comentario_oferta_data_criacao', ['oferta_id', 'data_criacao'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('comentario', schema=None) as batch_op:
+        batch_op.drop_index('ix_comentario_oferta_data_criacao')
+
+    with op.batch_alter_table('favoritos', schema=None) as batch_op:
+        batch_op.drop_index('uq_favoritos_usuario_oferta')
+        batch_op.drop_index('ix_favoritos_usuario_data_favorito')
+
+    with op.batch_alter_table('oferta', schema=None) as batch_op:
+        batch_op.drop_index('ix_oferta_destaque_likes')
+        batch_op.drop_index('ix_oferta_likes')
+        batch_op.drop_index('ix_oferta_categoria_data_criacao_id')
+        batch_op.drop_index('ix_oferta_data_criacao_id')
@@ -0,0 +1,57 @@
+"""cria tabelas de rollup diario
+
+Revision ID: 8a4f2c6e1d95
+Revises: 5e2c8a7d4f10
+Create Date: 2026-10-18 16:10:04.902715
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4f2c6e1d95'
+down_revision = '5e2c8a7d4f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rollup_diario',
+    sa.Column('dia', sa.Date(), nullable=False),
+    sa.Column('loja', sa.String(length=100), nullable=False),
+    sa.Column('categoria', sa.String(length=100), nullable=False),
+    sa.Column('ofertas', sa.Integer(), nullable=False),
+    sa.Column('likes', sa.Integer(), nullable=False),
+    sa.Column('favoritos', sa.Integer(), nullable=False),
+    sa.Column('comentarios', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('dia', 'loja', 'categoria')
+    )
+    rollup_marca = op.create_table('rollup_marca',
+    sa.Column('fonte', sa.String(length=30), nullable=False),
+    sa.Column('ultimo_id', sa.Integer(), nullable=False),
+    sa.Column('atualizado_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('fonte')
+    )
+    op.create_table('curtida_evento',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('oferta_id', sa.Integer(), nullable=False),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('data', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Marcas zeradas: o primeiro `flask rollup` agrega todo o histórico existente
+    agora = datetime.utcnow()
+    op.bulk_insert(rollup_marca, [
+        {'fonte': fonte, 'ultimo_id': 0, 'atualizado_em': agora}
+        for fonte in ('oferta', 'favoritos', 'comentario', 'curtida_evento')
+    ])
+
+
+def downgrade():
+    op.drop_table('curtida_evento')
+    op.drop_table('rollup_marca')
+    op.drop_table('rollup_diario')
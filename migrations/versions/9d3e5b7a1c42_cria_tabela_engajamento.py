@@ -0,0 +1,42 @@
+"""cria tabela engajamento
+
+Revision ID: 9d3e5b7a1c42
+Revises: 1f9a6c3e8d27
+Create Date: 2026-10-18 12:20:51.087334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3e5b7a1c42'
+down_revision = '1f9a6c3e8d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('engajamento',
+    sa.Column('dimensao', sa.String(length=20), nullable=False),
+    sa.Column('valor', sa.String(length=100), nullable=False),
+    sa.Column('favoritos', sa.Integer(), nullable=False),
+    sa.Column('likes', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('dimensao', 'valor')
+    )
+
+    # Carga inicial dos contadores a partir dos dados existentes
+    for dimensao in ('categoria', 'loja'):
+        op.execute(
+            "INSERT INTO engajamento (dimensao, valor, favoritos, likes) "
+            f"SELECT '{dimensao}', o.{dimensao}, COALESCE(SUM(f.total), 0), COALESCE(SUM(o.likes), 0) "
+            "FROM oferta o LEFT JOIN ("
+            "SELECT oferta_id, COUNT(id) AS total FROM favoritos GROUP BY oferta_id"
+            ") f ON f.oferta_id = o.id "
+            f"WHERE o.{dimensao} IS NOT NULL AND o.{dimensao} <> '' "
+            f"GROUP BY o.{dimensao}"
+        )
+
+
+def downgrade():
+    op.drop_table('engajamento')
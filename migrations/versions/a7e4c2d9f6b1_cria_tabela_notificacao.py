@@ -0,0 +1,60 @@
+"""cria tabela notificacao
+
+Revision ID: a7e4c2d9f6b1
+Revises: f1c7a3e9b5d8
+Create Date: 2026-10-18 14:02:34.584460
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e4c2d9f6b1'
+down_revision = 'f1c7a3e9b5d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notificacao',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('oferta_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('liberar_em', sa.DateTime(), nullable=False),
+    sa.Column('data_criacao', sa.DateTime(), nullable=False),
+    sa.Column('data_envio', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['oferta_id'], ['oferta.id'], ),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuario.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('usuario_id', 'oferta_id', name='uq_notificacao_usuario_oferta')
+    )
+    with op.batch_alter_table('notificacao', schema=None) as batch_op:
+        batch_op.create_index('ix_notificacao_status_liberar', ['status', 'liberar_em'], unique=False)
+        batch_op.create_index('ix_notificacao_usuario_envio', ['usuario_id', 'data_envio'], unique=False)
+
+    with op.batch_alter_table('usuario', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('telegram_chat_id', sa.String(length=64), nullable=True))
+
+    # As ofertas já existentes não são notificadas: a marca começa na última
+    conexao = op.get_bind()
+    ultima = conexao.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM oferta")).scalar()
+    conexao.execute(
+        sa.text("INSERT INTO rollup_marca (fonte, ultimo_id, atualizado_em) VALUES ('notificacao', :ultimo, :agora)"),
+        {'ultimo': ultima, 'agora': datetime.utcnow()}
+    )
+
+
+def downgrade():
+    op.execute("DELETE FROM rollup_marca WHERE fonte = 'notificacao'")
+    with op.batch_alter_table('usuario', schema=None) as batch_op:
+        batch_op.drop_column('telegram_chat_id')
+
+    with op.batch_alter_table('notificacao', schema=None) as batch_op:
+        batch_op.drop_index('ix_notificacao_usuario_envio')
+        batch_op.drop_index('ix_notificacao_status_liberar')
+
+    op.drop_table('notificacao')
@@ -0,0 +1,29 @@
+"""adiciona versao das listas em estatisticas
+
+Revision ID: b3d8f5a1c7e2
+Revises: a7e4c2d9f6b1
+Create Date: 2026-10-18 16:21:07.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d8f5a1c7e2'
+down_revision = 'a7e4c2d9f6b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Sem versão gravada, a primeira leitura remonta as listas
+    with op.batch_alter_table('estatisticas', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('listas_versao', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('listas_em', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('estatisticas', schema=None) as batch_op:
+        batch_op.drop_column('listas_em')
+        batch_op.drop_column('listas_versao')
@@ -0,0 +1,62 @@
+"""torna data_criacao da oferta obrigatoria
+
+Revision ID: c5e1a9d3f7b4
+Revises: b3d8f5a1c7e2
+Create Date: 2026-10-18 18:02:44.517390
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e1a9d3f7b4'
+down_revision = 'b3d8f5a1c7e2'
+branch_labels = None
+depends_on = None
+
+# Os gatilhos do FTS5 (4b7e1d9f2a63) somem quando o SQLite recria a tabela no batch
+GATILHOS_FTS = (
+    "CREATE TRIGGER oferta_fts_ai AFTER INSERT ON oferta BEGIN "
+    "INSERT INTO oferta_fts(rowid, titulo, descricao, loja, categoria) "
+    "VALUES (new.id, new.titulo, new.descricao, new.loja, new.categoria); END",
+    "CREATE TRIGGER oferta_fts_ad AFTER DELETE ON oferta BEGIN "
+    "INSERT INTO oferta_fts(oferta_fts, rowid, titulo, descricao, loja, categoria) "
+    "VALUES ('delete', old.id, old.titulo, old.descricao, old.loja, old.categoria); END",
+    "CREATE TRIGGER oferta_fts_au AFTER UPDATE OF titulo, descricao, loja, categoria ON oferta BEGIN "
+    "INSERT INTO oferta_fts(oferta_fts, rowid, titulo, descricao, loja, categoria) "
+    "VALUES ('delete', old.id, old.titulo, old.descricao, old.loja, old.categoria); "
+    "INSERT INTO oferta_fts(rowid, titulo, descricao, loja, categoria) "
+    "VALUES (new.id, new.titulo, new.descricao, new.loja, new.categoria); END",
+)
+
+
+def _alterar_nulidade(nullable):
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    if sqlite:
+        for nome in ('oferta_fts_ai', 'oferta_fts_ad', 'oferta_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {nome}")
+    with op.batch_alter_table('oferta', schema=None) as batch_op:
+        batch_op.alter_column('data_criacao', existing_type=sa.DateTime(), nullable=nullable)
+    if sqlite:
+        for gatilho in GATILHOS_FTS:
+            op.execute(gatilho)
+
+
+def upgrade():
+    # Ofertas sem data entram como as mais antigas do catálogo: o cursor da listagem
+    # (data_criacao, id) não alcança NULLs. O valor vai tipado como DateTime para ficar
+    # no mesmo formato de texto que o SQLAlchemy grava no SQLite
+    oferta = sa.table('oferta', sa.column('data_criacao', sa.DateTime()))
+    mais_antiga = op.get_bind().scalar(sa.select(sa.func.min(oferta.c.data_criacao)))
+    op.execute(
+        oferta.update().where(oferta.c.data_criacao.is_(None))
+        .values(data_criacao=mais_antiga or datetime.utcnow())
+    )
+    _alterar_nulidade(False)
+
+
+def downgrade():
+    _alterar_nulidade(True)
@@ -0,0 +1,36 @@
+"""cria tabela versao_cache
+
+Revision ID: c6a8f0e2b914
+Revises: 9d3e5b7a1c42
+Create Date: 2026-10-18 13:05:12.663190
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6a8f0e2b914'
+down_revision = '9d3e5b7a1c42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    versao_cache = op.create_table('versao_cache',
+    sa.Column('nome', sa.String(length=30), nullable=False),
+    sa.Column('versao', sa.Integer(), nullable=False),
+    sa.Column('atualizado_em', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('nome')
+    )
+    agora = datetime.utcnow()
+    op.bulk_insert(versao_cache, [
+        {'nome': 'catalogo', 'versao': 1, 'atualizado_em': agora},
+        {'nome': 'curtidas', 'versao': 1, 'atualizado_em': agora},
+    ])
+
+
+def downgrade():
+    op.drop_table('versao_cache')
@@ -0,0 +1,48 @@
+"""cria tabela historico_preco
+
+Revision ID: d3b9e1f7a2c4
+Revises: 8a4f2c6e1d95
+Create Date: 2026-10-18 17:24:41.530916
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3b9e1f7a2c4'
+down_revision = '8a4f2c6e1d95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('historico_preco',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('alvo', sa.String(length=10), nullable=False),
+    sa.Column('referencia', sa.String(length=20), nullable=False),
+    sa.Column('preco', sa.Float(), nullable=False),
+    sa.Column('data', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('historico_preco', schema=None) as batch_op:
+        batch_op.create_index('ix_historico_preco_alvo_referencia_data', ['alvo', 'referencia', 'data'], unique=False)
+
+    # Preço atual de cada oferta/produto vira o primeiro ponto do histórico
+    op.execute(
+        "INSERT INTO historico_preco (alvo, referencia, preco, data) "
+        "SELECT 'oferta', CAST(id AS VARCHAR(20)), preco, COALESCE(data_criacao, CURRENT_TIMESTAMP) "
+        "FROM oferta WHERE preco IS NOT NULL"
+    )
+    op.execute(
+        "INSERT INTO historico_preco (alvo, referencia, preco, data) "
+        "SELECT 'produto', asin, preco, COALESCE(data_criacao, CURRENT_TIMESTAMP) "
+        "FROM produtos WHERE preco IS NOT NULL"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('historico_preco', schema=None) as batch_op:
+        batch_op.drop_index('ix_historico_preco_alvo_referencia_data')
+
+    op.drop_table('historico_preco')
@@ -0,0 +1,40 @@
+"""cria tabela alerta_assinatura
+
+Revision ID: f1c7a3e9b5d8
+Revises: d3b9e1f7a2c4
+Create Date: 2026-10-18 18:02:13.270384
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c7a3e9b5d8'
+down_revision = 'd3b9e1f7a2c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('alerta_assinatura',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('categoria', sa.String(length=100), nullable=True),
+    sa.Column('loja', sa.String(length=100), nullable=True),
+    sa.Column('preco_maximo', sa.Float(), nullable=True),
+    sa.Column('palavras', sa.String(length=255), nullable=True),
+    sa.Column('ativo', sa.Boolean(), nullable=False),
+    sa.Column('data_criacao', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuario.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('alerta_assinatura', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_alerta_assinatura_usuario_id'), ['usuario_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('alerta_assinatura', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_alerta_assinatura_usuario_id'))
+
+    op.drop_table('alerta_assinatura')
@@ -18,9 +18,18 @@ class Oferta(db.Model):
     categoria = db.Column(db.String(100))
     destaque = db.Column(db.Boolean, default=False)
     likes = db.Column(db.Integer, default=0)
-    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    data_criacao = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     categoria_id = db.Column(db.Integer)
 
+    # 🗂️ Índices para os caminhos quentes: listagem por data (com e sem categoria),
+    # ranking por likes e ofertas em destaque
+    __table_args__ = (
+        db.Index('ix_oferta_data_criacao_id', 'data_criacao', 'id'),
+        db.Index('ix_oferta_categoria_data_criacao_id', 'categoria', 'data_criacao', 'id'),
+        db.Index('ix_oferta_likes', 'likes'),
+        db.Index('ix_oferta_destaque_likes', 'destaque', 'likes'),
+    )
+
 
 class Usuario(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -28,6 +37,7 @@ class Usuario(db.Model):
     email = db.Column(db.String(120), unique=True)
     senha_hash = db.Column(db.String(128))
     token = db.Column(db.String(32))
+    telegram_chat_id = db.Column(db.String(64), nullable=True)  # destino dos alertas individuais
 
     @property
     def senha(self):
@@ -50,6 +60,10 @@ class Comentario(db.Model):
     autor = db.relationship('Usuario')
     oferta = db.relationship('Oferta')
 
+    __table_args__ = (
+        db.Index('ix_comentario_oferta_data_criacao', 'oferta_id', 'data_criacao'),
+    )
+
 class Favorito(db.Model):
     __tablename__ = 'favoritos'
 
@@ -62,6 +76,12 @@ class Favorito(db.Model):
     usuario = db.relationship('Usuario', backref='favoritos')
     oferta = db.relationship('Oferta', backref='favoritos')
 
+    # Um favorito por (usuário, oferta); o índice único também serve a busca do par
+    __table_args__ = (
+        db.Index('ix_favoritos_usuario_data_favorito', 'usuario_id', 'data_favorito'),
+        db.Index('uq_favoritos_usuario_oferta', 'usuario_id', 'oferta_id', unique=True),
+    )
+
 class Produto(db.Model):
     __tablename__ = 'produtos'
 
@@ -82,3 +102,129 @@ class Produto(db.Model):
             "rating": self.rating
         }
 
+
+class TelegramOutbox(db.Model):
+    __tablename__ = 'telegram_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    metodo = db.Column(db.String(30), nullable=False)  # sendMessage | sendPhoto
+    chat_id = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON com os demais campos da Bot API
+    status = db.Column(db.String(20), nullable=False, default='pendente')  # pendente | enviando | enviada | falhou
+    tentativas = db.Column(db.Integer, nullable=False, default=0)
+    proxima_tentativa = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    ultimo_erro = db.Column(db.Text, nullable=True)
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    data_envio = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_telegram_outbox_status_proxima', 'status', 'proxima_tentativa'),
+    )
+
+class Engajamento(db.Model):
+    # Contadores incrementais de engajamento por categoria e por loja
+    __tablename__ = 'engajamento'
+
+    dimensao = db.Column(db.String(20), primary_key=True)  # categoria | loja
+    valor = db.Column(db.String(100), primary_key=True)
+    favoritos = db.Column(db.Integer, nullable=False, default=0)
+    likes = db.Column(db.Integer, nullable=False, default=0)
+
+class VersaoCache(db.Model):
+    # Versões do conteúdo das listagens, incrementadas na mesma transação das escritas
+    __tablename__ = 'versao_cache'
+
+    nome = db.Column(db.String(30), primary_key=True)  # catalogo | curtidas
+    versao = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class Estatisticas(db.Model):
+    # Linha única (id=1) mantida pelas escritas; as listas são JSON já serializado
+    __tablename__ = 'estatisticas'
+
+    id = db.Column(db.Integer, primary_key=True)
+    total_usuarios = db.Column(db.Integer, nullable=False, default=0)
+    total_ofertas = db.Column(db.Integer, nullable=False, default=0)
+    total_favoritos = db.Column(db.Integer, nullable=False, default=0)
+    mais_curtidas = db.Column(db.Text, nullable=False, default='[]')
+    destaques = db.Column(db.Text, nullable=False, default='[]')
+    atualizado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Versões catalogo-curtidas com que as listas foram montadas, e quando
+    listas_versao = db.Column(db.String(64), nullable=True)
+    listas_em = db.Column(db.DateTime, nullable=True)
+
+class RollupDiario(db.Model):
+    # Série histórica por dia x loja x categoria, alimentada pelo job incremental de rollup
+    __tablename__ = 'rollup_diario'
+
+    dia = db.Column(db.Date, primary_key=True)
+    loja = db.Column(db.String(100), primary_key=True)  # '' quando a oferta não tem loja
+    categoria = db.Column(db.String(100), primary_key=True)  # '' quando não tem categoria
+    ofertas = db.Column(db.Integer, nullable=False, default=0)
+    likes = db.Column(db.Integer, nullable=False, default=0)
+    favoritos = db.Column(db.Integer, nullable=False, default=0)
+    comentarios = db.Column(db.Integer, nullable=False, default=0)
+
+class MarcaRollup(db.Model):
+    # Último id já agregado de cada fonte (oferta | favoritos | comentario | curtida_evento);
+    # 'notificacao' guarda a última oferta já distribuída aos alertas
+    __tablename__ = 'rollup_marca'
+
+    fonte = db.Column(db.String(30), primary_key=True)
+    ultimo_id = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class CurtidaEvento(db.Model):
+    # Log de likes (delta agregado por oferta a cada flush) para a série diária
+    __tablename__ = 'curtida_evento'
+
+    id = db.Column(db.Integer, primary_key=True)
+    oferta_id = db.Column(db.Integer, nullable=False)
+    delta = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class HistoricoPreco(db.Model):
+    # Append-only: uma linha só quando o preço muda (alvo 'oferta' -> id, 'produto' -> ASIN)
+    __tablename__ = 'historico_preco'
+
+    id = db.Column(db.Integer, primary_key=True)
+    alvo = db.Column(db.String(10), nullable=False)
+    referencia = db.Column(db.String(20), nullable=False)
+    preco = db.Column(db.Float, nullable=False)
+    data = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Mínimos por janela = busca por faixa neste índice
+    __table_args__ = (
+        db.Index('ix_historico_preco_alvo_referencia_data', 'alvo', 'referencia', 'data'),
+    )
+
+class AlertaAssinatura(db.Model):
+    # Critérios vazios valem como "qualquer"; palavras separadas por espaço, já normalizadas
+    __tablename__ = 'alerta_assinatura'
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False, index=True)
+    categoria = db.Column(db.String(100), nullable=True)
+    loja = db.Column(db.String(100), nullable=True)
+    preco_maximo = db.Column(db.Float, nullable=True)
+    palavras = db.Column(db.String(255), nullable=True)
+    ativo = db.Column(db.Boolean, nullable=False, default=True)
+    data_criacao = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class Notificacao(db.Model):
+    # Uma por (usuário, oferta): a restrição única é a deduplicação do fan-out
+    __tablename__ = 'notificacao'
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
+    oferta_id = db.Column(db.Integer, db.ForeignKey('oferta.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pendente')  # pendente | processando | enviada | resumida | descartada
+    liberar_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # adiada até o próximo resumo
+    data_criacao = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    data_envio = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('usuario_id', 'oferta_id', name='uq_notificacao_usuario_oferta'),
+        db.Index('ix_notificacao_status_liberar', 'status', 'liberar_em'),
+        db.Index('ix_notificacao_usuario_envio', 'usuario_id', 'data_envio'),
+    )
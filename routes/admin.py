@@ -1,22 +1,81 @@
-from flask import Blueprint, jsonify
-from models import db, Usuario, Oferta
+from datetime import datetime, timedelta
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import select
+from models import db, Oferta
+from services import rollup
+from services.estatisticas import ler as ler_estatisticas
+from utils.exportacao import Coluna, exportar, formatar_data, formatar_preco
 
 admin_bp = Blueprint('admin', __name__)
 
 @admin_bp.route('/admin/relatorios', methods=['GET'])
 def relatorio_admin():
-    total_usuarios = Usuario.query.count()
-    total_ofertas = Oferta.query.count()
-    mais_curtidas = Oferta.query.order_by(Oferta.likes.desc()).limit(5).all()
+    resumo = ler_estatisticas()
+    return jsonify({
+        'total_usuarios': resumo['total_usuarios'],
+        'total_ofertas': resumo['total_ofertas'],
+        'top_ofertas': resumo['mais_curtidas']
+    }), 200
+
+# 📤 Exportação de todas as ofertas em streaming (CSV ou NDJSON conforme o Accept)
+@admin_bp.route('/exportar-ofertas', methods=['GET'])
+@jwt_required()
+def exportar_ofertas():
+    claims = get_jwt()
+    if not claims.get("admin"):
+        return jsonify({"erro": "Acesso negado"}), 403
+
+    consulta = select(
+        Oferta.id, Oferta.titulo, Oferta.descricao, Oferta.preco, Oferta.loja, Oferta.categoria,
+        Oferta.link_afiliado, Oferta.imagem, Oferta.destaque, Oferta.likes, Oferta.data_criacao
+    ).order_by(Oferta.id)
+
+    colunas = [
+        Coluna('id', 'ID'),
+        Coluna('titulo', 'Título'),
+        Coluna('descricao', 'Descrição'),
+        Coluna('preco', 'Preço', formatar_preco),
+        Coluna('loja', 'Loja'),
+        Coluna('categoria', 'Categoria'),
+        Coluna('link_afiliado', 'Link Afiliado'),
+        Coluna('imagem', 'Imagem'),
+        Coluna('destaque', 'Destaque', lambda v: 'Sim' if v else 'Não'),
+        Coluna('likes', 'Likes'),
+        Coluna('data_criacao', 'Data Criação', formatar_data),
+    ]
+    return exportar(consulta, colunas, 'ofertas')
+
+# 📈 Séries históricas (só lê o rollup diário; `flask rollup` mantém os dados)
+@admin_bp.route('/series', methods=['GET'])
+@jwt_required()
+def series():
+    claims = get_jwt()
+    if not claims.get("admin"):
+        return jsonify({"erro": "Acesso negado"}), 403
+
+    hoje = datetime.utcnow().date()
+    try:
+        fim = datetime.strptime(request.args['fim'], "%Y-%m-%d").date() if 'fim' in request.args else hoje
+        inicio = datetime.strptime(request.args['inicio'], "%Y-%m-%d").date() \
+            if 'inicio' in request.args else fim - timedelta(days=29)
+    except ValueError:
+        return jsonify({"erro": "Formato de data inválido. Use YYYY-MM-DD"}), 400
+    if inicio > fim:
+        return jsonify({"erro": "'inicio' deve ser anterior a 'fim'."}), 400
 
-    top_ofertas = [{
-        'id': o.id,
-        'titulo': o.titulo,
-        'likes': o.likes
-    } for o in mais_curtidas]
+    agrupar = request.args.get('agrupar', 'dia')
+    if agrupar not in ('dia', 'mes'):
+        return jsonify({"erro": "'agrupar' deve ser 'dia' ou 'mes'."}), 400
+    por = request.args.get('por')
+    if por not in (None, 'loja', 'categoria'):
+        return jsonify({"erro": "'por' deve ser 'loja' ou 'categoria'."}), 400
 
     return jsonify({
-        'total_usuarios': total_usuarios,
-        'total_ofertas': total_ofertas,
-        'top_ofertas': top_ofertas
+        'inicio': inicio.isoformat(),
+        'fim': fim.isoformat(),
+        'agrupar': agrupar,
+        'por': por,
+        'serie': rollup.serie(inicio, fim, agrupar, por, request.args.get('loja'), request.args.get('categoria')),
+        'marcas': rollup.marcas()
     }), 200
@@ -1,42 +1,103 @@
-from flask import Blueprint, jsonify, request, render_template, redirect, url_for
+from flask import Blueprint, jsonify, request, render_template, redirect, url_for, abort
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from datetime import datetime
 from pydantic import ValidationError
-from models import Oferta, Comentario, Usuario, Favorito
+from sqlalchemy import and_, or_, select
+from sqlalchemy.exc import IntegrityError
+from extensions import db
+from models import Oferta, Comentario, Usuario, Favorito, Notificacao
 from schemas import ComentarioSchema
+from services import engajamento, precos
+from services.busca import buscar, termos
+from services.cache import (
+    CATALOGO, CURTIDAS, invalidar_catalogo, json_em_cache, listagem_em_cache, validador_listagem
+)
 from services.alertas import verificar_alerta_categoria
-from services.telegram import enviar_mensagem, enviar_foto
-
-print(" Arquivo ofertas.py foi carregado")
+from services.engajamento import ranking as ranking_engajamento
+from services.estatisticas import registrar as registrar_estatisticas
+from services.curtidas import buffer_curtidas
+from services.importacao import importar, ler_lista, ler_ndjson
+from services.outbox import enfileirar_oferta
+from utils.http import condicional
+from utils.serializacao import (
+    FORMATO_MINUTO, OFERTA_DEBUG, OFERTA_LISTAGEM, OFERTA_RESUMO, serializar_linhas
+)
+from utils.paginacao import CursorInvalido, codificar_cursor, decodificar_cursor, ler_limite
 
 ofertas_bp = Blueprint('ofertas_bp', __name__)
 
-# 🔍 Listar todas as ofertas (com filtro opcional)
+# 🔍 Listar ofertas (paginação por cursor em (data_criacao, id), filtro opcional)
 @ofertas_bp.route('/', methods=['GET'])
+@condicional(validador_listagem(CATALOGO, CURTIDAS))
 def listar_ofertas():
     categoria = request.args.get('categoria')
-    query = Oferta.query
-    if categoria:
-        query = query.filter_by(categoria=categoria)
-    ofertas = query.order_by(Oferta.data_criacao.desc()).all()
-
-    resultado = [{
-        'id': o.id,
-        'titulo': o.titulo,
-        'descricao': o.descricao,
-        'preco': o.preco,
-        'imagem': o.imagem,
-        'link_afiliado': o.link_afiliado,
-        'loja': o.loja,
-        'categoria': o.categoria,
-        'destaque': o.destaque,
-        'likes': o.likes,
-        'data_criacao': o.data_criacao.strftime('%d/%m/%Y %H:%M')
-    } for o in ofertas]
+    limite = ler_limite(request.args.get('limit', type=int))
+    cursor = request.args.get('cursor')
+
+    posicao = None
+    if cursor:
+        try:
+            posicao = decodificar_cursor(cursor)
+        except CursorInvalido:
+            return jsonify({'erro': 'Cursor inválido.'}), 400
+
+    def construir():
+        campos, chaves = OFERTA_LISTAGEM
+        consulta = select(*campos)
+        if categoria:
+            consulta = consulta.where(Oferta.categoria == categoria)
+        if posicao:
+            data_cursor, id_cursor = posicao
+            consulta = consulta.where(or_(
+                Oferta.data_criacao < data_cursor,
+                and_(Oferta.data_criacao == data_cursor, Oferta.id < id_cursor)
+            ))
+
+        # Busca uma linha a mais só para saber se existe próxima página
+        linhas = db.session.execute(
+            consulta.order_by(Oferta.data_criacao.desc(), Oferta.id.desc()).limit(limite + 1)
+        ).all()
+        tem_proxima = len(linhas) > limite
+        linhas = linhas[:limite]
+
+        next_cursor = None
+        if tem_proxima:
+            ultima = linhas[-1]
+            next_cursor = codificar_cursor(ultima.data_criacao, ultima.id)
+
+        resultado = serializar_linhas(linhas, chaves, {'data_criacao': FORMATO_MINUTO})
+        buffer_curtidas.aplicar(resultado)
+
+        return {
+            'ofertas': resultado,
+            'limit': limite,
+            'next_cursor': next_cursor
+        }
 
-    return jsonify(resultado)
+    filtros = {'categoria': categoria or '', 'limit': limite, 'cursor': cursor or ''}
+    return json_em_cache('ofertas', filtros, construir, dependencias=(CATALOGO, CURTIDAS))
+
+# 🔎 Busca textual indexada (FTS5 no SQLite, tsvector + GIN no Postgres)
+@ofertas_bp.route('/busca', methods=['GET'])
+def buscar_ofertas():
+    consulta = request.args.get('q', '').strip()
+    if not termos(consulta):
+        return jsonify({'erro': 'Informe o termo de busca em "q".'}), 400
+    pagina = max(request.args.get('page', 1, type=int), 1)
+    por_pagina = ler_limite(request.args.get('per_page', type=int))
+
+    linhas, tem_proxima = buscar(consulta, pagina, por_pagina)
+    resultado = serializar_linhas(linhas, OFERTA_LISTAGEM[1] + ['relevancia'], {'data_criacao': FORMATO_MINUTO})
+    buffer_curtidas.aplicar(resultado)
+
+    return jsonify({
+        'q': consulta,
+        'pagina': pagina,
+        'proxima_pagina': pagina + 1 if tem_proxima else None,
+        'resultados': resultado
+    }), 200
 
-# 🆕 Criar nova oferta (com envio ao Telegram)
+# 🆕 Criar nova oferta (com envio ao Telegram via outbox)
 @ofertas_bp.route('/cadastrar', methods=['POST'])
 @jwt_required()
 def cadastrar_oferta():
@@ -58,7 +119,10 @@ def cadastrar_oferta():
     })
 
     db.session.add(nova)
-    db.session.commit()
+    db.session.flush()
+    engajamento.registrar(nova, likes=nova.likes or 0)
+    registrar_estatisticas(ofertas=1)
+    precos.registrar_mudancas(precos.OFERTA, [(nova.id, None, nova.preco)])
 
     TEMPLATE_MENSAGEM = (
         "🔥 *Nova Oferta!*\n\n"
@@ -79,14 +143,14 @@ def cadastrar_oferta():
         link_afiliado=nova.link_afiliado
     )
 
-    # ✅ Decide se envia texto ou foto
-    if nova.imagem:
-        enviar_foto(legenda, nova.imagem)
-    else:
-        enviar_mensagem(legenda)
+    # 📬 Mensagem vai para a outbox na mesma transação; o despachante envia depois
+    enfileirar_oferta(legenda, nova.imagem)
+    invalidar_catalogo()
+    # 🔔 Os alertas dos usuários são casados depois, pelo worker (services/notificacoes.py)
+    db.session.commit()
 
     return jsonify({
-        'mensagem': 'Oferta criada com sucesso e enviada ao Telegram!',
+        'mensagem': 'Oferta criada com sucesso e enfileirada para o Telegram!',
         'id': nova.id,
         'titulo': nova.titulo,
         'descricao': nova.descricao,
@@ -100,6 +164,27 @@ def cadastrar_oferta():
         'data_criacao': nova.data_criacao.strftime('%d/%m/%Y %H:%M')
     }), 201
 
+# 📦 Cadastro em lote: lista JSON ou NDJSON (application/x-ndjson), com erros por linha
+@ofertas_bp.route('/lote', methods=['POST'])
+@jwt_required()
+def cadastrar_lote():
+    claims = get_jwt()
+    if not claims.get("admin"):
+        return jsonify({"erro": "Acesso negado"}), 403
+
+    if request.mimetype == 'application/x-ndjson':
+        registros = ler_ndjson(request.stream)
+    else:
+        dados = request.get_json(silent=True)
+        if not isinstance(dados, list):
+            return jsonify({'erro': 'Envie uma lista JSON de ofertas ou NDJSON (application/x-ndjson).'}), 400
+        registros = ler_lista(dados)
+
+    relatorio = importar(registros)
+    if not relatorio['recebidas']:
+        return jsonify({'erro': 'Nenhuma oferta enviada.'}), 400
+    return jsonify(relatorio), 201 if relatorio['criadas'] else 400
+
 # ✏️ Editar oferta
 @ofertas_bp.route('/editar/<int:id>', methods=['PUT'])
 @jwt_required()
@@ -114,13 +199,19 @@ def editar_oferta(id):
     if not oferta:
         return jsonify({"erro": "Oferta não encontrada"}), 404
 
+    preco_anterior = oferta.preco
     oferta.titulo = dados['titulo']
     oferta.descricao = dados['descricao']
     oferta.preco = dados['preco']
     oferta.link_afiliado = dados['link_afiliado']
+    quedas = precos.registrar_mudancas(precos.OFERTA, [(oferta.id, preco_anterior, oferta.preco)])
+    invalidar_catalogo()
     db.session.commit()
 
-    return jsonify({"mensagem": "Oferta atualizada com sucesso!"}), 200
+    resposta = {"mensagem": "Oferta atualizada com sucesso!"}
+    if quedas:
+        resposta["queda_preco"] = quedas[0]
+    return jsonify(resposta), 200
 
 # ❌ Deletar oferta
 @ofertas_bp.route('/deletar/<int:id>', methods=['DELETE'])
@@ -134,29 +225,51 @@ def deletar_oferta(id):
     if not oferta:
         return jsonify({"erro": "Oferta não encontrada"}), 404
 
+    # Favoritos, comentários e notificações da oferta saem junto (FKs NOT NULL), e os
+    # contadores de engajamento acompanham
+    total_favoritos = Favorito.query.filter_by(oferta_id=oferta.id).delete(synchronize_session=False)
+    engajamento.registrar(oferta, favoritos=-total_favoritos, likes=-(oferta.likes or 0))
+    Comentario.query.filter_by(oferta_id=oferta.id).delete(synchronize_session=False)
+    Notificacao.query.filter_by(oferta_id=oferta.id).delete(synchronize_session=False)
     db.session.delete(oferta)
+    registrar_estatisticas(ofertas=-1, favoritos=-total_favoritos)
+    invalidar_catalogo()
     db.session.commit()
 
     return jsonify({"mensagem": "Oferta deletada com sucesso!"}), 200
 
-# ❤️ Curtir oferta
+# ❤️ Curtir oferta (acumula no buffer; a gravação é feita em lote pelo flush)
 @ofertas_bp.route('/<int:id>/like', methods=['PATCH'])
 def curtir_oferta(id):
-    oferta = Oferta.query.get_or_404(id)
-    oferta.likes += 1
-    db.session.commit()
-    return jsonify({'likes': oferta.likes})
+    linha = db.session.execute(db.select(Oferta.likes).where(Oferta.id == id)).first()
+    if linha is None:
+        abort(404)
+    buffer_curtidas.registrar(id)
+    return jsonify({'likes': (linha.likes or 0) + buffer_curtidas.pendente(id)})
+
+# 📈 Métricas do buffer de curtidas
+@ofertas_bp.route('/curtidas/metricas', methods=['GET'])
+def metricas_curtidas():
+    return jsonify(buffer_curtidas.metricas()), 200
+
+# 📉 Histórico de preço da oferta (só as mudanças) e mínimos de 30/90 dias
+@ofertas_bp.route('/<int:id>/historico-preco', methods=['GET'])
+def historico_preco_oferta(id):
+    if db.session.get(Oferta, id) is None:
+        return jsonify({'erro': 'Oferta não encontrada'}), 404
+    return jsonify(precos.historico(precos.OFERTA, id)), 200
 
 # 💬 Listar comentários
 @ofertas_bp.route('/<int:oferta_id>/comentarios', methods=['GET'])
 def listar_comentarios(oferta_id):
-    comentarios = Comentario.query.filter_by(oferta_id=oferta_id).order_by(Comentario.data_criacao.desc()).all()
-    resultado = [{
-        'id': c.id,
-        'texto': c.texto,
-        'autor': c.autor.nome,
-        'data': c.data_criacao.strftime('%d/%m/%Y %H:%M')
-    } for c in comentarios]
+    # Nome do autor no mesmo SELECT (JOIN): antes era uma consulta por comentário
+    comentarios = db.session.execute(
+        select(Comentario.id, Comentario.texto, Usuario.nome, Comentario.data_criacao)
+        .join(Usuario, Usuario.id == Comentario.autor_id)
+        .where(Comentario.oferta_id == oferta_id)
+        .order_by(Comentario.data_criacao.desc())
+    )
+    resultado = serializar_linhas(comentarios, ['id', 'texto', 'autor', 'data'], {'data': FORMATO_MINUTO})
     return jsonify(resultado)
 
 # 📝 Comentar oferta
@@ -195,8 +308,16 @@ def comentar_oferta(oferta_id):
 @jwt_required()
 def favoritar_oferta(id_oferta):
     usuario_id = get_jwt_identity()
+    oferta = Oferta.query.get_or_404(id_oferta)
     favorito = Favorito(usuario_id=usuario_id, oferta_id=id_oferta, data_favorito=datetime.utcnow())
     db.session.add(favorito)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'mensagem': 'Oferta já favoritada.'}), 400
+    engajamento.registrar(oferta, favoritos=1)
+    registrar_estatisticas(favoritos=1)
     db.session.commit()
     return jsonify({'mensagem': 'Oferta favoritada com sucesso!'}), 201
 
@@ -204,35 +325,38 @@ def favoritar_oferta(id_oferta):
 @ofertas_bp.route('/verificar-alertas', methods=['GET'])
 @jwt_required()
 def verificar_alertas_route():
-    verificar_alerta_categoria()
-    return jsonify({'status': 'Alertas verificados'}), 200
+    alertas = verificar_alerta_categoria()
+    return jsonify({'status': 'Alertas verificados', 'alertas': alertas}), 200
 
 # 📊 Categorias mais engajadas
 @ofertas_bp.route('/categorias-mais-engajadas', methods=['GET'])
 @jwt_required()
 def categorias_mais_engajadas():
-    categorias = [
-        {'nome': 'Eletrônicos', 'favoritos': 42},
-        {'nome': 'Moda', 'favoritos': 55},
-        {'nome': 'Casa', 'favoritos': 30},
-        {'nome': 'Beleza', 'favoritos': 61},
-        {'nome': 'Esportes', 'favoritos': 61},
-    ]
-    categorias_ordenadas = sorted(categorias, key=lambda c: c['favoritos'], reverse=True)
-    return jsonify(categorias_ordenadas), 200
+    limite = request.args.get('limite', type=int)
+    return jsonify(ranking_engajamento('categoria', limite)), 200
+
+# 🏬 Lojas mais engajadas
+@ofertas_bp.route('/lojas-mais-engajadas', methods=['GET'])
+@jwt_required()
+def lojas_mais_engajadas():
+    limite = request.args.get('limite', type=int)
+    return jsonify(ranking_engajamento('loja', limite)), 200
 
 # 🛠 Debug
 @ofertas_bp.route('/listar-ofertas-debug', methods=['GET'])
+@condicional(validador_listagem(CATALOGO))
 def listar_ofertas_debug():
-    ofertas = Oferta.query.all()
-    resultado = [{'id': o.id, 'titulo': o.titulo, 'loja': o.loja, 'preco': o.preco} for o in ofertas]
-    return jsonify(resultado), 200
+    def construir():
+        campos, chaves = OFERTA_DEBUG
+        return serializar_linhas(db.session.execute(select(*campos)), chaves)
+    return json_em_cache('debug', {}, construir), 200
 
 # 📊 Painel HTML
 @ofertas_bp.route('/painel', methods=['GET'])
+@condicional(validador_listagem(CATALOGO))
 def painel_ofertas():
-    ofertas = Oferta.query.all()
-    return render_template('painel.html', ofertas=ofertas)
+    # O template não usa a lista de ofertas (o painel.js busca /ofertas/todas)
+    return listagem_em_cache('painel', {}, lambda: render_template('painel.html'))
 
 # Exibir formulário HTML
 @ofertas_bp.route('/nova-oferta', methods=['GET'])
@@ -254,19 +378,19 @@ def salvar_nova_oferta():
         categoria=categoria
     )
     db.session.add(nova)
+    db.session.flush()
+    registrar_estatisticas(ofertas=1)
+    precos.registrar_mudancas(precos.OFERTA, [(nova.id, None, nova.preco)])
+    invalidar_catalogo()
     db.session.commit()
 
     return redirect(url_for('ofertas_bp.painel_ofertas'))
 
 # 🔍 Rota para listar todas as ofertas cadastradas
 @ofertas_bp.route('/todas', methods=['GET'])
+@condicional(validador_listagem(CATALOGO))
 def todas_ofertas():
-    ofertas = Oferta.query.all()
-    resultado = [{
-        "id": o.id,
-        "titulo": o.titulo,
-        "loja": o.loja,
-        "preco": float(o.preco),
-        "categoria": o.categoria
-    } for o in ofertas]
-    return jsonify(resultado)
+    def construir():
+        campos, chaves = OFERTA_RESUMO
+        return serializar_linhas(db.session.execute(select(*campos)), chaves)
+    return json_em_cache('todas', {}, construir)
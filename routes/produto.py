@@ -1,6 +1,16 @@
+import logging
+
 from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt
 from models import Produto
 from extensions import db
+from services import precos
+from services.amazon import ERROS_PAAPI, PADRAO_ASIN, ErroAmazon, buscar_produto, metricas_busca, sincronizar
+from services.importacao import ler_lista, ler_ndjson
+from services.produtos import cache_produtos, importar_produtos
+from utils.upsert import insert_com_conflito
+
+logger = logging.getLogger(__name__)
 
 produto_bp = Blueprint('produto_bp', __name__)
 
@@ -9,12 +19,34 @@ def produto():
     asin = request.args.get('asin')
     if not asin:
         return jsonify({'erro': 'ASIN não fornecido'}), 400
+    if not PADRAO_ASIN.match(asin.strip().upper()):
+        return jsonify({'erro': 'ASIN inválido'}), 400
+
+    # Cache (LRU + TTL, com negativos) -> tabela produtos -> PA-API, uma consulta por ASIN
+    try:
+        produto = buscar_produto(asin)
+    except ErroAmazon as e:
+        return jsonify({'erro': str(e)}), 503
+    except ERROS_PAAPI as e:
+        # Só falhas da PA-API viram 502; erros locais (banco, cache) sobem como 500
+        logger.warning("Falha na PA-API para %s: %s", asin, e)
+        return jsonify({'erro': 'Falha ao consultar a Amazon', 'detalhes': str(e)}), 502
+    if produto is None:
+        return jsonify({'erro': 'Produto não encontrado'}), 404
+    return jsonify(produto), 200
 
-    return jsonify({'asin': asin, 'produto': 'Nome do produto fictício'})
+# 📉 Histórico de preço do produto (só as mudanças) e mínimos de 30/90 dias
+@produto_bp.route('/<asin>/historico', methods=['GET'])
+def historico_preco_produto(asin):
+    return jsonify(precos.historico(precos.PRODUTO, asin.strip().upper())), 200
+
+# 📈 Acertos/faltas do cache de produtos
+@produto_bp.route('/cache/metricas', methods=['GET'])
+def metricas_cache_produtos():
+    return jsonify(metricas_busca.resumo()), 200
 
 @produto_bp.route('/', methods=['POST'])
 def criar_produto():
-    print("DEBUG db:", db)  # ✅ Confirmar se db está acessível
     try:
         data = request.get_json() or {}
 
@@ -23,22 +55,72 @@ def criar_produto():
 
         if not asin or not nome:
             return jsonify({'erro': 'Campos obrigatórios: asin e nome'}), 400
+        # Mesma forma canônica da busca e do upsert: " b0abc..." e "B0ABC..." são o mesmo produto
+        asin = str(asin).strip().upper()
+        if not PADRAO_ASIN.match(asin):
+            return jsonify({'erro': 'ASIN inválido'}), 400
 
-        if Produto.query.filter_by(asin=asin).first():
-            return jsonify({'erro': 'ASIN já cadastrado'}), 409
-
-        produto = Produto(
-            asin=asin,
-            nome=nome,
-            preco=data.get('preco'),
-            imagem_url=data.get('imagem_url'),
-            rating=data.get('rating')
-        )
+        produto = {
+            'asin': asin,
+            'nome': nome,
+            'preco': data.get('preco'),
+            'imagem_url': data.get('imagem_url'),
+            'rating': data.get('rating')
+        }
 
-        db.session.add(produto)
+        # Uma ida ao banco: o índice único de asin decide se já existe, sem corrida
+        stmt = insert_com_conflito(Produto.__table__).values(**produto)\
+            .on_conflict_do_nothing(index_elements=['asin']).returning(Produto.id)
+        if db.session.execute(stmt).first() is None:
+            db.session.rollback()
+            return jsonify({'erro': 'ASIN já cadastrado'}), 409
+        precos.registrar_mudancas(precos.PRODUTO, [(asin, None, produto['preco'])])
         db.session.commit()
+        cache_produtos.remover(asin)  # pode estar no cache como "não encontrado"
 
-        return jsonify(produto.to_dict()), 201
+        return jsonify(produto), 201
 
     except Exception as e:
         return jsonify({'erro': 'Erro interno', 'detalhes': str(e)}), 500
+
+# 📦 Upsert em lote por ASIN (lista JSON, {"produtos": [...]} ou NDJSON)
+@produto_bp.route('/lote', methods=['POST'])
+@jwt_required()
+def upsert_lote():
+    claims = get_jwt()
+    if not claims.get("admin"):
+        return jsonify({"erro": "Acesso negado"}), 403
+
+    if request.mimetype == 'application/x-ndjson':
+        registros = ler_ndjson(request.stream)
+    else:
+        dados = request.get_json(silent=True)
+        if isinstance(dados, dict):
+            dados = dados.get('produtos')
+        if not isinstance(dados, list):
+            return jsonify({'erro': 'Envie uma lista JSON de produtos ou NDJSON (application/x-ndjson).'}), 400
+        registros = ler_lista(dados)
+
+    relatorio = importar_produtos(registros)
+    if not relatorio['recebidos']:
+        return jsonify({'erro': 'Nenhum produto enviado.'}), 400
+    return jsonify(relatorio), 200
+
+# 🔄 Sincroniza produtos pela PA-API (GetItems em lotes de 10, com cache e limite de ritmo)
+@produto_bp.route('/sincronizar', methods=['POST'])
+@jwt_required()
+def sincronizar_produtos():
+    claims = get_jwt()
+    if not claims.get("admin"):
+        return jsonify({"erro": "Acesso negado"}), 403
+
+    data = request.get_json() or {}
+    asins = data.get('asins')
+    if not isinstance(asins, list) or not asins:
+        return jsonify({'erro': 'Envie uma lista "asins".'}), 400
+
+    try:
+        relatorio = sincronizar(asins, forcar=bool(data.get('forcar')))
+    except ErroAmazon as e:
+        return jsonify({'erro': str(e)}), 503
+    return jsonify(relatorio), 200
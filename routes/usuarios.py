@@ -1,16 +1,66 @@
-import csv
-from io import StringIO
-from datetime import datetime
-from flask import Response, Blueprint, request, jsonify
+from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from extensions import db
-from models import Usuario, Favorito, Oferta, Comentario
-from sqlalchemy import desc
-from utils.alertas import verificar_alerta_categoria
+from models import Usuario, Favorito, Oferta, Comentario, AlertaAssinatura
+from pydantic import ValidationError
+from schemas import AlertaSchema
+from sqlalchemy import desc, func, select, update
+from sqlalchemy.exc import IntegrityError
+from services import engajamento, rollup
+from services.cache import CATALOGO, invalidar_curtidas, versoes
+from services.estatisticas import ler as ler_estatisticas, registrar as registrar_estatisticas
+from services.alertas import carregar as carregar_alertas, invalidar_alertas, normalizar, serializar as serializar_alerta, tokens
+from utils.http import condicional, gerar_etag
+from utils.exportacao import Coluna, exportar, formatar_data, formatar_preco
+from utils.serializacao import FAVORITO_OFERTA, FORMATO_MINUTO, FORMATO_SEGUNDO, OFERTA_LISTAGEM, serializar_linhas
 
 
 usuarios_bp = Blueprint('usuarios', __name__)
 
+# 🔗 Favoritos do usuário já com a oferta carregada no mesmo SELECT (JOIN), sem N+1
+def favoritos_com_oferta(usuario_id):
+    # Só as colunas que a resposta usa, como tuplas: sem montar objetos ORM
+    campos, _ = FAVORITO_OFERTA
+    return select(*campos).join(Favorito.oferta).where(Favorito.usuario_id == usuario_id)
+
+def serializar_favoritos(linhas):
+    return serializar_linhas(linhas, FAVORITO_OFERTA[1], {'data_favorito': FORMATO_SEGUNDO})
+
+def validador_favoritos():
+    # ETag dos favoritos: quantidade + último favorito do usuário + versão do catálogo
+    usuario_id = get_jwt_identity()
+    total, ultimo_id, ultima_data = db.session.query(
+        func.count(Favorito.id), func.max(Favorito.id), func.max(Favorito.data_favorito)
+    ).filter(Favorito.usuario_id == usuario_id).one()
+    versao, atualizado = versoes(CATALOGO)[CATALOGO]
+    etag = gerar_etag(request.path, sorted(request.args.items(multi=True)), usuario_id, total, ultimo_id, versao)
+    return etag, max(filter(None, [ultima_data, atualizado]), default=None)
+
+def paginar_favoritos(usuario_id):
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 10, type=int)
+
+    # Mesmas regras do paginate(error_out=False)
+    if page < 1:
+        page = 1
+    if per_page < 1:
+        per_page = 20
+
+    total = db.session.scalar(select(func.count(Favorito.id)).where(Favorito.usuario_id == usuario_id))
+    linhas = db.session.execute(
+        favoritos_com_oferta(usuario_id)
+        .order_by(Favorito.data_favorito.desc())
+        .limit(per_page).offset((page - 1) * per_page)
+    ).all() if total else []
+
+    return jsonify({
+        'pagina': page,
+        'total_paginas': -(-total // per_page),
+        'total_favoritos': total,
+        'favoritos': serializar_favoritos(linhas)
+    }), 200
+
 # Cadastro de usuário
 @usuarios_bp.route('/cadastro', methods=['POST'])
 def cadastrar_usuario():
@@ -29,6 +79,7 @@ def cadastrar_usuario():
     novo_usuario.senha = senha  # usa o setter para gerar o hash
 
     db.session.add(novo_usuario)
+    registrar_estatisticas(usuarios=1)
     db.session.commit()
 
     return jsonify({'mensagem': 'Usuário cadastrado com sucesso!'}), 201
@@ -66,41 +117,28 @@ def perfil():
         'email': usuario.email
     }), 200
 
+# 🔔 Chat do Telegram que recebe os alertas (null desliga as notificações)
+@usuarios_bp.route('/telegram', methods=['PUT'])
+@jwt_required()
+def definir_telegram():
+    usuario = Usuario.query.get(get_jwt_identity())
+    if not usuario:
+        return jsonify({'erro': 'Usuário não encontrado.'}), 404
+
+    chat_id = (request.get_json() or {}).get('chat_id')
+    if chat_id is not None and not str(chat_id).strip().lstrip('-').isdigit():
+        return jsonify({'erro': 'chat_id deve ser o id numérico do chat no Telegram.'}), 400
+
+    usuario.telegram_chat_id = str(chat_id).strip() if chat_id is not None else None
+    db.session.commit()
+    return jsonify({'telegram_chat_id': usuario.telegram_chat_id}), 200
+
 # Favoritos - listar
 @usuarios_bp.route('/favoritos', methods=['GET'])
 @jwt_required()
+@condicional(validador_favoritos)
 def listar_favoritos():
-    usuario_id = get_jwt_identity()
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-
-    favoritos_paginados = Favorito.query.filter_by(usuario_id=usuario_id)\
-        .order_by(Favorito.data_favorito.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
-
-    resultado = []
-    for favorito in favoritos_paginados.items:
-        oferta = favorito.oferta
-        if not oferta:
-            continue
-        resultado.append({
-            'id': oferta.id,
-            'titulo': oferta.titulo,
-            'imagem': oferta.imagem,
-            'loja': oferta.loja,
-            'link_afiliado': oferta.link_afiliado,
-            'link': oferta.link,
-            'preco': oferta.preco,
-            'favorito_id': favorito.id,
-            'data_favorito': favorito.data_favorito.strftime('%d/%m/%Y %H:%M:%S')
-        })
-
-    return jsonify({
-        'pagina': favoritos_paginados.page,
-        'total_paginas': favoritos_paginados.pages,
-        'total_favoritos': favoritos_paginados.total,
-        'favoritos': resultado
-    }), 200
+    return paginar_favoritos(get_jwt_identity())
 
 # Favoritar
 @usuarios_bp.route('/favoritos/<int:oferta_id>', methods=['POST'])
@@ -108,19 +146,36 @@ def listar_favoritos():
 def favoritar(oferta_id):
     usuario_id = get_jwt_identity()
 
-    favorito_existente = Favorito.query.filter_by(usuario_id=usuario_id, oferta_id=oferta_id).first()
-    if favorito_existente:
-        return jsonify({'mensagem': 'Oferta já favoritada.'}), 400
-
+    # O índice único (usuario_id, oferta_id) decide a duplicidade, sem corrida
     novo_favorito = Favorito(usuario_id=usuario_id, oferta_id=oferta_id)
     db.session.add(novo_favorito)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'mensagem': 'Oferta já favoritada.'}), 400
 
-    oferta = Oferta.query.get(oferta_id)
+    # likes = likes + 1 no banco: um read-modify-write perderia o que o buffer de curtidas
+    # gravou em paralelo
+    oferta = db.session.execute(
+        update(Oferta).where(Oferta.id == oferta_id)
+        .values(likes=func.coalesce(Oferta.likes, 0) + 1)
+        .returning(Oferta.id, Oferta.likes, Oferta.destaque, Oferta.categoria, Oferta.loja)
+        .execution_options(synchronize_session=False)
+    ).first()
     if oferta:
-        oferta.likes += 1
-        comentarios = Comentario.query.filter_by(oferta_id=oferta.id).count()
-        if oferta.likes >= 10 and comentarios >= 5 and not oferta.destaque:
-            oferta.destaque = True
+        engajamento.registrar(oferta, favoritos=1, likes=1)
+        rollup.registrar_curtidas({oferta.id: 1})
+        invalidar_curtidas()
+        if oferta.likes >= 10 and not oferta.destaque:
+            comentarios = Comentario.query.filter_by(oferta_id=oferta.id).count()
+            if comentarios >= 5:
+                db.session.execute(
+                    update(Oferta).where(Oferta.id == oferta.id).values(destaque=True)
+                    .execution_options(synchronize_session=False)
+                )
+    # Só o total; as listas do resumo (likes/destaque) são remontadas na leitura
+    registrar_estatisticas(favoritos=1)
 
     db.session.commit()
     return jsonify({'mensagem': 'Oferta favoritada com sucesso!'}), 201
@@ -136,9 +191,23 @@ def desfavoritar(oferta_id):
 
     db.session.delete(favorito)
 
-    oferta = Oferta.query.get(oferta_id)
-    if oferta and oferta.likes > 0:
-        oferta.likes -= 1
+    # Decremento atômico e só acima de zero; sem linha devolvida a oferta já estava em 0
+    oferta = db.session.execute(
+        update(Oferta).where(Oferta.id == oferta_id, Oferta.likes > 0)
+        .values(likes=Oferta.likes - 1)
+        .returning(Oferta.id, Oferta.categoria, Oferta.loja)
+        .execution_options(synchronize_session=False)
+    ).first()
+    likes_removidos = 1 if oferta else 0
+    if oferta is None:
+        oferta = db.session.execute(
+            select(Oferta.id, Oferta.categoria, Oferta.loja).where(Oferta.id == oferta_id)
+        ).first()
+    if oferta:
+        engajamento.registrar(oferta, favoritos=-1, likes=-likes_removidos)
+        rollup.registrar_curtidas({oferta.id: -likes_removidos})
+        invalidar_curtidas()
+    registrar_estatisticas(favoritos=-1)
 
     db.session.commit()
     return jsonify({'mensagem': 'Oferta desfavoritada com sucesso!'}), 200
@@ -147,69 +216,22 @@ def desfavoritar(oferta_id):
 @usuarios_bp.route('/estatisticas', methods=['GET'])
 @jwt_required()
 def estatisticas():
-    total_usuarios = Usuario.query.count()
-    total_ofertas = Oferta.query.count()
-    total_favoritos = Favorito.query.count()
-
-    ofertas_destaque = Oferta.query.filter_by(destaque=True).all()
-    ofertas_mais_curtidas = Oferta.query.order_by(Oferta.likes.desc()).limit(5).all()
-
-    destaque_serializado = [{
-        'id': o.id,
-        'titulo': o.titulo,
-        'likes': o.likes,
-        'destaque': o.destaque
-    } for o in ofertas_destaque]
-
-    mais_curtidas_serializado = [{
-        'id': o.id,
-        'titulo': o.titulo,
-        'likes': o.likes
-    } for o in ofertas_mais_curtidas]
-
+    # Resumo mantido pelas escritas (services/estatisticas.py): uma consulta só
+    resumo = ler_estatisticas()
     return jsonify({
-        'total_usuarios': total_usuarios,
-        'total_ofertas': total_ofertas,
-        'total_favoritos': total_favoritos,
-        'ofertas_destaque': destaque_serializado,
-        'ofertas_mais_curtidas': mais_curtidas_serializado
+        'total_usuarios': resumo['total_usuarios'],
+        'total_ofertas': resumo['total_ofertas'],
+        'total_favoritos': resumo['total_favoritos'],
+        'ofertas_destaque': resumo['destaques'],
+        'ofertas_mais_curtidas': resumo['mais_curtidas']
     }), 200
 
 # Meus favoritos
 @usuarios_bp.route('/meus-favoritos', methods=['GET'])
 @jwt_required()
+@condicional(validador_favoritos)
 def meus_favoritos():
-    usuario_id = get_jwt_identity()
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
-
-    favoritos_paginados = Favorito.query.filter_by(usuario_id=usuario_id)\
-        .order_by(Favorito.data_favorito.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
-
-    resultado = []
-    for favorito in favoritos_paginados.items:
-        oferta = favorito.oferta
-        if not oferta:
-            continue
-        resultado.append({
-            'id': oferta.id,
-            'titulo': oferta.titulo,
-            'imagem': oferta.imagem,
-            'loja': oferta.loja,
-            'link_afiliado': oferta.link_afiliado,
-            'link': oferta.link,
-            'preco': oferta.preco,
-            'favorito_id': favorito.id,
-            'data_favorito': favorito.data_favorito.strftime('%d/%m/%Y %H:%M:%S')
-        })
-
-    return jsonify({
-        'pagina': favoritos_paginados.page,
-        'total_paginas': favoritos_paginados.pages,
-        'total_favoritos': favoritos_paginados.total,
-        'favoritos': resultado
-    }), 200
+    return paginar_favoritos(get_jwt_identity())
 
 # Ofertas filtradas
 @usuarios_bp.route('/ofertas-filtradas', methods=['GET'])
@@ -220,26 +242,28 @@ def ofertas_filtradas():
     data_min = request.args.get('data_min')
     data_max = request.args.get('data_max')
 
-    query = Oferta.query
+    campos, chaves = OFERTA_LISTAGEM
+    query = select(*campos)
 
     if loja:
-        query = query.filter(Oferta.loja.ilike(f'%{loja}%'))
+        query = query.where(Oferta.loja.ilike(f'%{loja}%'))
     if categoria_id:
-        query = query.filter_by(categoria_id=categoria_id)
+        query = query.where(Oferta.categoria_id == categoria_id)
     if data_min:
         try:
             data_min = datetime.strptime(data_min, "%Y-%m-%d")
-            query = query.filter(Oferta.data_criacao >= data_min)
+            query = query.where(Oferta.data_criacao >= data_min)
         except ValueError:
             return jsonify({'erro': 'Formato inválido para data_min. Use YYYY-MM-DD'}), 400
     if data_max:
         try:
             data_max = datetime.strptime(data_max, "%Y-%m-%d")
-            query = query.filter(Oferta.data_criacao <= data_max)
+            query = query.where(Oferta.data_criacao <= data_max)
         except ValueError:
             return jsonify({'erro': 'Formato inválido para data_max. Use YYYY-MM-DD'}), 400
 
-    ofertas = query.order_by(desc(Oferta.likes)).limit(20)
+    ofertas = db.session.execute(query.order_by(desc(Oferta.likes)).limit(20))
+    return jsonify(serializar_linhas(ofertas, chaves, {'data_criacao': FORMATO_MINUTO})), 200
 
 @usuarios_bp.route('/relatorio-favoritos', methods=['GET'])
 @jwt_required()
@@ -254,75 +278,136 @@ def relatorio_favoritos():
     except:
         return jsonify({"erro": "Formato de data inválido. Use YYYY-MM-DD"}), 400
 
-    favoritos = Favorito.query.filter(
-        Favorito.usuario_id == usuario_id,
+    favoritos = db.session.execute(favoritos_com_oferta(usuario_id).where(
         Favorito.data_favorito >= data_inicio,
         Favorito.data_favorito <= data_fim
-    ).all()
-
-    resultado = []
-    for fav in favoritos:
-        oferta = Oferta.query.get(fav.oferta_id)
-        resultado.append({
-            "id": oferta.id,
-            "titulo": oferta.titulo,
-            "loja": oferta.loja,
-            "preco": oferta.preco,
-            "data_favorito": fav.data_favorito.strftime("%d/%m/%Y %H:%M:%S")
-        })
+    )).all()
+
+    resultado = serializar_favoritos(favoritos)
 
     return jsonify(resultado), 200
 
-@usuarios_bp.route('/verificar-alertas', methods=['GET'])
+# 🔔 Assinaturas de alerta (categoria, loja, preço máximo e/ou palavras-chave)
+MAX_ALERTAS_POR_USUARIO = 50
+
+@usuarios_bp.route('/alertas', methods=['POST'])
 @jwt_required()
-def verificar_alertas():
+def criar_alerta():
     usuario_id = get_jwt_identity()
+    try:
+        dados = AlertaSchema(**(request.get_json() or {}))
+    except ValidationError as e:
+        return jsonify({"erro": "Validação falhou", "detalhes": e.errors(include_url=False, include_context=False)}), 422
+
+    total = db.session.scalar(select(func.count(AlertaAssinatura.id)).where(AlertaAssinatura.usuario_id == usuario_id))
+    if total >= MAX_ALERTAS_POR_USUARIO:
+        return jsonify({'erro': f'Limite de {MAX_ALERTAS_POR_USUARIO} alertas por usuário atingido.'}), 400
+
+    # Gravado já normalizado: o índice compara sem acento e em minúsculas
+    palavras = dados.palavras if isinstance(dados.palavras, str) else ' '.join(dados.palavras or [])
+    alerta = AlertaAssinatura(
+        usuario_id=usuario_id,
+        categoria=normalizar(dados.categoria) or None,
+        loja=normalizar(dados.loja) or None,
+        preco_maximo=dados.preco_maximo,
+        palavras=' '.join(sorted(tokens(palavras))) or None,
+    )
+    if not (alerta.categoria or alerta.loja or alerta.preco_maximo or alerta.palavras):
+        return jsonify({'erro': 'Informe ao menos um critério válido.'}), 400
+
+    db.session.add(alerta)
+    invalidar_alertas()
+    db.session.commit()
+    return jsonify(serializar_alerta(alerta)), 201
+
+@usuarios_bp.route('/alertas', methods=['GET'])
+@jwt_required()
+def listar_alertas():
+    alertas = AlertaAssinatura.query.filter_by(usuario_id=get_jwt_identity()).order_by(AlertaAssinatura.id).all()
+    return jsonify([serializar_alerta(a) for a in alertas]), 200
+
+@usuarios_bp.route('/alertas/<int:alerta_id>', methods=['DELETE'])
+@jwt_required()
+def remover_alerta(alerta_id):
+    alerta = db.session.get(AlertaAssinatura, alerta_id)
+    if alerta is None or str(alerta.usuario_id) != str(get_jwt_identity()):
+        return jsonify({'erro': 'Alerta não encontrado.'}), 404
 
-    # Aqui você pode chamar uma função que verifica alertas por categoria, preço, etc.
-    # Exemplo fictício:
-    status = verificar_alerta_categoria(usuario_id)
+    db.session.delete(alerta)
+    invalidar_alertas()
+    db.session.commit()
+    return jsonify({'mensagem': 'Alerta removido.'}), 200
 
-    return jsonify({"status": status}), 200
+# Ofertas lidas por resposta no máximo: o resto fica para a próxima página (?antes_de=)
+MAX_OFERTAS_VERIFICADAS = 2000
 
+@usuarios_bp.route('/verificar-alertas', methods=['GET'])
+@jwt_required()
+def verificar_alertas():
+    # Ofertas recentes que casam com os alertas do usuário (índice só com os dele), da mais
+    # nova para a mais antiga; ?limite= casadas por página e ?antes_de=<proximo> continua
+    usuario_id = get_jwt_identity()
+    dias = min(max(request.args.get('dias', 1, type=int), 1), 30)
+    limite = min(max(request.args.get('limite', 20, type=int), 1), 100)
+    antes_de = request.args.get('antes_de', type=int)
+
+    indice = carregar_alertas(AlertaAssinatura.usuario_id == usuario_id)
+    if not len(indice):
+        return jsonify({'alertas': 0, 'ofertas': [], 'proximo': None}), 200
+
+    campos, chaves = OFERTA_LISTAGEM
+    consulta = select(*campos).where(Oferta.data_criacao >= datetime.utcnow() - timedelta(days=dias))
+    if antes_de:
+        consulta = consulta.where(Oferta.id < antes_de)
+    linhas = db.session.execute(consulta.order_by(desc(Oferta.id)).limit(MAX_OFERTAS_VERIFICADAS)).all()
+
+    ofertas, proximo = [], None
+    for oferta in serializar_linhas(linhas, chaves, {'data_criacao': FORMATO_MINUTO}):
+        encontradas = indice.encontrar(oferta['titulo'], oferta['descricao'], oferta['categoria'], oferta['loja'], oferta['preco'])
+        if encontradas:
+            ofertas.append({**oferta, 'alertas': sorted(a.id for a in encontradas)})
+            if len(ofertas) == limite:
+                proximo = oferta['id']
+                break
+    else:
+        if len(linhas) == MAX_OFERTAS_VERIFICADAS:
+            proximo = linhas[-1].id
+
+    return jsonify({'alertas': len(indice), 'ofertas': ofertas, 'proximo': proximo}), 200
+
+# Exportação dos favoritos em streaming (CSV ou NDJSON conforme o Accept)
 @usuarios_bp.route('/exportar-favoritos', methods=['GET'])
 @jwt_required()
 def exportar_favoritos_csv():
     usuario_id = get_jwt_identity()
-    favoritos = Favorito.query.filter_by(usuario_id=usuario_id).all()
-
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['ID', 'Título', 'Loja', 'Preço', 'Data Favorito'])
-
-    for fav in favoritos:
-        oferta = Oferta.query.get(fav.oferta_id)
-        writer.writerow([
-            oferta.id,
-            oferta.titulo,
-            oferta.loja,
-            f"R$ {oferta.preco:.2f}",
-            fav.data_favorito.strftime("%d/%m/%Y %H:%M:%S")
-        ])
-
-    output.seek(0)
-    return Response(
-        output.getvalue(),
-        mimetype='text/csv',
-        headers={"Content-Disposition": "attachment;filename=favoritos.csv"}
-    )
+    consulta = select(Oferta.id, Oferta.titulo, Oferta.loja, Oferta.preco, Favorito.data_favorito)\
+        .join(Oferta, Favorito.oferta_id == Oferta.id)\
+        .where(Favorito.usuario_id == usuario_id)\
+        .order_by(Favorito.id)
+
+    colunas = [
+        Coluna('id', 'ID'),
+        Coluna('titulo', 'Título'),
+        Coluna('loja', 'Loja'),
+        Coluna('preco', 'Preço', formatar_preco),
+        Coluna('data_favorito', 'Data Favorito', formatar_data),
+    ]
+    return exportar(consulta, colunas, 'favoritos')
+
 @usuarios_bp.route('/grafico-categorias', methods=['GET'])
 @jwt_required()
 def grafico_categorias():
     usuario_id = get_jwt_identity()
 
-    # Exemplo: contar favoritos por categoria
-    categorias = {}
-    favoritos = Favorito.query.filter_by(usuario_id=usuario_id).all()
+    # Contagem de favoritos por categoria feita no banco (GROUP BY)
+    categoria = func.coalesce(func.nullif(Oferta.categoria, ''), 'Sem categoria')
+    linhas = db.session.query(categoria, func.count(Favorito.id))\
+        .join(Oferta, Favorito.oferta_id == Oferta.id)\
+        .filter(Favorito.usuario_id == usuario_id)\
+        .group_by(categoria)\
+        .all()
 
-    for fav in favoritos:
-        oferta = Oferta.query.get(fav.oferta_id)
-        categoria = oferta.categoria or "Sem categoria"
-        categorias[categoria] = categorias.get(categoria, 0) + 1
+    categorias = {nome: total for nome, total in linhas}
 
     return jsonify(categorias), 200
 
@@ -1,6 +1,44 @@
+from typing import List, Optional, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter, model_validator
 
 class ComentarioSchema(BaseModel):
     texto: str
 
+class OfertaSchema(BaseModel):
+    # Mesmos campos obrigatórios do POST /ofertas/cadastrar
+    titulo: str = Field(min_length=1, max_length=100)
+    descricao: str = Field(min_length=1)
+    preco: float = Field(gt=0)
+    imagem: str = Field(min_length=1, max_length=255)
+    link_afiliado: str = Field(min_length=1, max_length=255)
+    loja: str = Field(min_length=1, max_length=100)
+    categoria: str = Field(min_length=1, max_length=100)
+    link: Optional[str] = Field(default=None, max_length=255)
+    categoria_id: Optional[int] = None
+    destaque: bool = False
+    likes: int = Field(default=0, ge=0)
+
+# Valida um lote inteiro numa chamada só ao pydantic-core
+ListaOfertas = TypeAdapter(List[OfertaSchema])
+
+class ProdutoSchema(BaseModel):
+    asin: str = Field(pattern=r'^[A-Za-z0-9]{10}$')
+    nome: str = Field(min_length=1, max_length=255)
+    preco: Optional[float] = Field(default=None, ge=0)
+    imagem_url: Optional[str] = Field(default=None, max_length=500)
+    rating: Optional[float] = Field(default=None, ge=0, le=5)
+
+ListaProdutos = TypeAdapter(List[ProdutoSchema])
+
+class AlertaSchema(BaseModel):
+    categoria: Optional[str] = Field(default=None, max_length=100)
+    loja: Optional[str] = Field(default=None, max_length=100)
+    preco_maximo: Optional[float] = Field(default=None, gt=0)
+    palavras: Union[str, List[str], None] = None
+
+    @model_validator(mode='after')
+    def exige_um_criterio(self):
+        if not (self.categoria or self.loja or self.preco_maximo or self.palavras):
+            raise ValueError('Informe ao menos um critério: categoria, loja, preco_maximo ou palavras.')
+        return self
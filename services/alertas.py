@@ -1,23 +1,207 @@
-def verificar_alerta_categoria():
-    LIMITE_FAVORITOS = 50
+import bisect
+import logging
+import re
+import threading
+import unicodedata
+from collections import namedtuple
 
-    categorias = [
-        {'nome': 'Eletrônicos', 'favoritos': 42},
-        {'nome': 'Moda', 'favoritos': 55},
-        {'nome': 'Casa', 'favoritos': 30},
-        {'nome': 'Beleza', 'favoritos': 61},
-        {'nome': 'Esportes', 'favoritos': 61},
-    ]
+from sqlalchemy import select
 
-    for categoria in categorias:
-        if categoria['favoritos'] > LIMITE_FAVORITOS:
-            print(f"⚠️ Alerta: Categoria {categoria['nome']} ultrapassou {LIMITE_FAVORITOS} favoritos!")
+from extensions import db
+from models import AlertaAssinatura
+from services.cache import assinatura as assinatura_versoes, invalidar
+from services.engajamento import ranking
 
-def verificar_alerta_categoria(usuario_id):
-    # Lógica de verificação de alertas vai aqui
-    return "Alertas verificados"
+logger = logging.getLogger(__name__)
 
-def verificar_alerta_categoria(usuario_id):
-    # Aqui você pode colocar a lógica real de verificação de alertas
-    return "Alertas verificados"
+LIMITE_FAVORITOS = 50
+ALERTAS = "alertas"  # versão em versao_cache: muda a cada alteração de assinatura
+INFINITO = float('inf')
 
+
+def verificar_alerta_categoria(limite=LIMITE_FAVORITOS):
+    # Lê os contadores de engajamento (O(categorias)), não a tabela de favoritos
+    alertas = [c for c in ranking('categoria') if c['favoritos'] > limite]
+    for categoria in alertas:
+        logger.warning("Categoria %s ultrapassou %s favoritos", categoria['nome'], limite)
+    return alertas
+
+
+# 🔔 Assinaturas de alerta: índice invertido em memória
+
+Assinatura = namedtuple('Assinatura', 'id usuario_id categoria loja preco_maximo palavras')
+
+
+def normalizar(texto):
+    # Minúsculas e sem acento: "Eletrônicos" casa com "eletronicos"
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower().strip()
+
+
+def tokens(texto):
+    return set(re.findall(r'\w{2,}', normalizar(texto)))
+
+
+class _Postagens:
+    # Assinaturas de uma chave ordenadas por preço máximo: as que aceitam o preço da
+    # oferta são um sufixo da lista, achado por busca binária
+    __slots__ = ('precos', 'ids')
+
+    def __init__(self):
+        self.precos = []
+        self.ids = []
+
+    def adicionar(self, preco_maximo, assinatura_id):
+        preco = INFINITO if preco_maximo is None else preco_maximo
+        posicao = bisect.bisect_right(self.precos, preco)
+        self.precos.insert(posicao, preco)
+        self.ids.insert(posicao, assinatura_id)
+
+    def remover(self, preco_maximo, assinatura_id):
+        preco = INFINITO if preco_maximo is None else preco_maximo
+        posicao = bisect.bisect_left(self.precos, preco)
+        while posicao < len(self.ids) and self.precos[posicao] == preco:
+            if self.ids[posicao] == assinatura_id:
+                del self.precos[posicao]
+                del self.ids[posicao]
+                return
+            posicao += 1
+
+    def aceitando(self, preco):
+        return self.ids[bisect.bisect_left(self.precos, preco):]
+
+
+class IndiceAlertas:
+    # Cada assinatura entra numa única lista, pelo critério mais seletivo que tiver
+    # (palavra-chave > categoria > loja > só preço). Uma oferta consulta só as listas
+    # das suas palavras, da sua categoria, da sua loja e a de "só preço", e confere
+    # os candidatos por completo.
+
+    def __init__(self, assinaturas=()):
+        self._postagens = {}
+        self._assinaturas = {}
+        for item in assinaturas:
+            self.adicionar(item)
+
+    def __len__(self):
+        return len(self._assinaturas)
+
+    def ids(self):
+        return set(self._assinaturas)
+
+    @staticmethod
+    def _chave(item):
+        if item.palavras:
+            return 'p:' + max(item.palavras, key=len)  # palavra mais longa costuma ser a mais rara
+        if item.categoria:
+            return 'c:' + item.categoria
+        if item.loja:
+            return 'l:' + item.loja
+        return '*'
+
+    def adicionar(self, item):
+        self.remover(item.id)
+        self._assinaturas[item.id] = item
+        self._postagens.setdefault(self._chave(item), _Postagens()).adicionar(item.preco_maximo, item.id)
+
+    def remover(self, assinatura_id):
+        item = self._assinaturas.pop(assinatura_id, None)
+        if item is not None:
+            self._postagens[self._chave(item)].remover(item.preco_maximo, item.id)
+
+    def encontrar(self, titulo, descricao, categoria, loja, preco):
+        # Devolve as assinaturas que casam com a oferta
+        palavras = tokens(titulo) | tokens(descricao)
+        categoria = normalizar(categoria)
+        loja = normalizar(loja)
+        preco = preco if preco is not None else INFINITO
+
+        chaves = ['p:' + p for p in palavras] + ['*']
+        if categoria:
+            chaves.append('c:' + categoria)
+        if loja:
+            chaves.append('l:' + loja)
+
+        encontradas = []
+        for chave in chaves:
+            postagens = self._postagens.get(chave)
+            if postagens is None:
+                continue
+            for assinatura_id in postagens.aceitando(preco):
+                item = self._assinaturas.get(assinatura_id)  # removida por outra thread no meio
+                if item is not None and ((not item.categoria or item.categoria == categoria)
+                        and (not item.loja or item.loja == loja)
+                        and item.palavras <= palavras):
+                    encontradas.append(item)
+        return encontradas
+
+
+def _montar(linha):
+    id_, usuario_id, categoria, loja, preco_maximo, palavras = linha
+    return Assinatura(id_, usuario_id, categoria or None, loja or None, preco_maximo,
+                      frozenset((palavras or '').split()))
+
+
+def _consulta():
+    return select(
+        AlertaAssinatura.id, AlertaAssinatura.usuario_id, AlertaAssinatura.categoria,
+        AlertaAssinatura.loja, AlertaAssinatura.preco_maximo, AlertaAssinatura.palavras
+    ).where(AlertaAssinatura.ativo.is_(True))
+
+
+def carregar(filtro=None):
+    consulta = _consulta()
+    if filtro is not None:
+        consulta = consulta.where(filtro)
+    return IndiceAlertas(_montar(linha) for linha in db.session.execute(consulta))
+
+
+def atualizar(indice, lote=500):
+    # Aplica ao índice só o que mudou no banco: tira as assinaturas que sumiram (ou foram
+    # desativadas) e carrega as novas. Assinaturas não são editadas, só criadas e removidas
+    ativas = set(db.session.scalars(select(AlertaAssinatura.id).where(AlertaAssinatura.ativo.is_(True))))
+    conhecidas = indice.ids()
+    for assinatura_id in conhecidas - ativas:
+        indice.remover(assinatura_id)
+    novas = sorted(ativas - conhecidas)
+    for inicio in range(0, len(novas), lote):
+        parte = novas[inicio:inicio + lote]
+        for linha in db.session.execute(_consulta().where(AlertaAssinatura.id.in_(parte))):
+            indice.adicionar(_montar(linha))
+    return len(conhecidas - ativas) + len(novas)
+
+
+_indice = None
+_indice_versao = None
+_indice_lock = threading.Lock()
+
+
+def obter_indice():
+    # Índice do processo (usado pelo worker das notificações). Montado uma vez; quando a
+    # versão "alertas" muda (qualquer worker) recebe só a diferença, sem reconstruir
+    global _indice, _indice_versao
+    versao = assinatura_versoes(ALERTAS)
+    if _indice is None or _indice_versao != versao:
+        with _indice_lock:
+            if _indice is None:
+                _indice = carregar()
+            elif _indice_versao != versao:
+                atualizar(_indice)
+            _indice_versao = versao
+    return _indice
+
+
+def invalidar_alertas():
+    invalidar(ALERTAS)
+
+
+def serializar(assinatura_modelo):
+    return {
+        'id': assinatura_modelo.id,
+        'categoria': assinatura_modelo.categoria,
+        'loja': assinatura_modelo.loja,
+        'preco_maximo': assinatura_modelo.preco_maximo,
+        'palavras': assinatura_modelo.palavras.split() if assinatura_modelo.palavras else [],
+        'ativo': assinatura_modelo.ativo,
+        'data_criacao': assinatura_modelo.data_criacao.strftime('%d/%m/%Y %H:%M:%S'),
+    }
@@ -0,0 +1,316 @@
+import logging
+import os
+import re
+import threading
+from types import SimpleNamespace
+
+from flask import current_app
+from sqlalchemy import select
+from urllib3.exceptions import HTTPError
+
+from extensions import db
+from models import Produto
+from services.produtos import NAO_ENCONTRADO, PRODUTOS_CACHE_TTL_NEGATIVO, cache_produtos, upsert_produtos
+from utils.concorrencia import VooUnico
+from utils.limites import TokenBucket, TokenBucketSQLite
+
+try:
+    from amazon_paapi import AmazonApi
+    from amazon_paapi.errors import AmazonError, ItemsNotFound, TooManyRequests
+except ImportError:  # SDK opcional: sem ele só funciona com um cliente injetado (ex.: o stub)
+    AmazonApi = None
+
+    class AmazonError(Exception):
+        pass
+
+    class ItemsNotFound(AmazonError):
+        pass
+
+    class TooManyRequests(AmazonError):
+        pass
+
+logger = logging.getLogger(__name__)
+
+ACCESS_KEY = os.getenv("ACCESS_KEY")
+SECRET_KEY = os.getenv("SECRET_KEY")
+PARTNER_TAG = os.getenv("PARTNER_TAG")
+AMAZON_PAIS = os.getenv("AMAZON_PAIS", "BR")
+AMAZON_CLIENTE = os.getenv("AMAZON_CLIENTE", "paapi")  # paapi | stub (offline)
+# Cota inicial da PA-API: 1 requisição por segundo, por conta (não por processo)
+AMAZON_TPS = float(os.getenv("AMAZON_TPS", "1"))
+# Arquivo SQLite do balde da cota, dividido por todos os processos da máquina (workers,
+# CLI, telegram-worker); padrão: instance/limites.sqlite3. "memoria" = balde por processo.
+# Com o app em N máquinas, use AMAZON_TPS = cota / N em cada uma
+AMAZON_LIMITE_PATH = os.getenv("AMAZON_LIMITE_PATH")
+AMAZON_TENTATIVAS_429 = int(os.getenv("AMAZON_TENTATIVAS_429", "3"))
+
+MAX_ITENS_POR_REQUISICAO = 10  # limite do GetItems
+PADRAO_ASIN = re.compile(r'^[A-Z0-9]{10}$')
+
+
+class ErroAmazon(Exception):
+    pass
+
+
+# Falhas do lado da Amazon: erros do SDK e do transporte (o SDK não embrulha os do urllib3).
+# Erros locais (banco, cache) não entram: não são "falha ao consultar a Amazon"
+ERROS_PAAPI = (AmazonError, HTTPError)
+
+
+class ClienteStub:
+    # Imita o AmazonApi.get_items para rodar tudo offline (AMAZON_CLIENTE=stub ou injetado).
+    # catalogo: {asin: {'nome', 'preco', 'imagem_url', 'rating'}}; sem catálogo, inventa os dados
+    def __init__(self, catalogo=None):
+        self.catalogo = catalogo
+        self.chamadas = []
+
+    def get_items(self, items, **kwargs):
+        self.chamadas.append(list(items))
+        encontrados = []
+        for asin in items:
+            dados = self.catalogo.get(asin) if self.catalogo is not None else {
+                'nome': f'Produto {asin}', 'preco': 99.9, 'imagem_url': f'https://example.com/{asin}.jpg'
+            }
+            if dados is None:
+                continue
+            encontrados.append(SimpleNamespace(
+                asin=asin,
+                item_info=SimpleNamespace(title=SimpleNamespace(display_value=dados.get('nome'))),
+                offers=SimpleNamespace(listings=[SimpleNamespace(price=SimpleNamespace(amount=dados.get('preco')))]),
+                images=SimpleNamespace(primary=SimpleNamespace(large=SimpleNamespace(url=dados.get('imagem_url')))),
+                customer_reviews=SimpleNamespace(star_rating=SimpleNamespace(value=dados.get('rating'))),
+            ))
+        if not encontrados:
+            raise ItemsNotFound("No items have been found")
+        return encontrados
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+_limite = None
+
+
+def definir_cliente(cliente):
+    # Permite trocar o cliente (ex.: ClienteStub) sem mexer em variáveis de ambiente
+    global _cliente
+    _cliente = cliente
+
+
+def obter_cliente():
+    global _cliente
+    if _cliente is None:
+        with _cliente_lock:
+            if _cliente is None:
+                if AMAZON_CLIENTE == "stub":
+                    _cliente = ClienteStub()
+                elif AmazonApi is None:
+                    raise ErroAmazon("python-amazon-paapi não está instalado.")
+                elif not (ACCESS_KEY and SECRET_KEY and PARTNER_TAG):
+                    raise ErroAmazon("ACCESS_KEY, SECRET_KEY e PARTNER_TAG são obrigatórios.")
+                else:
+                    # throttling=0: o ritmo das requisições é controlado pelo TokenBucket
+                    _cliente = AmazonApi(ACCESS_KEY, SECRET_KEY, PARTNER_TAG, AMAZON_PAIS, throttling=0)
+    return _cliente
+
+
+def obter_limite():
+    # Criado no primeiro uso (precisa do instance_path do app)
+    global _limite
+    if _limite is None:
+        with _cliente_lock:
+            if _limite is None:
+                if AMAZON_LIMITE_PATH == "memoria":
+                    _limite = TokenBucket(AMAZON_TPS, capacidade=1)
+                else:
+                    caminho = AMAZON_LIMITE_PATH or os.path.join(current_app.instance_path, "limites.sqlite3")
+                    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+                    _limite = TokenBucketSQLite(caminho, "amazon_paapi", AMAZON_TPS, capacidade=1)
+    return _limite
+
+
+def _atributo(objeto, *caminho):
+    for nome in caminho:
+        if objeto is None:
+            return None
+        if isinstance(nome, int):
+            objeto = objeto[nome] if len(objeto or []) > nome else None
+        else:
+            objeto = getattr(objeto, nome, None)
+    return objeto
+
+
+def _extrair(item):
+    asin = item.asin
+    return {
+        'asin': asin,
+        'nome': (_atributo(item, 'item_info', 'title', 'display_value') or asin)[:255],
+        'preco': _atributo(item, 'offers', 'listings', 0, 'price', 'amount'),
+        'imagem_url': _atributo(item, 'images', 'primary', 'large', 'url'),
+        'rating': _atributo(item, 'customer_reviews', 'star_rating', 'value'),
+    }
+
+
+def normalizar_asins(asins):
+    # (válidos sem repetição, na ordem recebida; inválidos)
+    validos, invalidos, vistos = [], [], set()
+    for asin in asins:
+        asin = (asin or '').strip().upper()
+        if not PADRAO_ASIN.match(asin):
+            invalidos.append(asin)
+        elif asin not in vistos:
+            vistos.add(asin)
+            validos.append(asin)
+    return validos, invalidos
+
+
+def _consultar(cliente, lote):
+    # Uma requisição GetItems (até 10 ASINs) respeitando a cota; 429 pausa o balde e repete
+    limite = obter_limite()
+    for tentativa in range(AMAZON_TENTATIVAS_429 + 1):
+        limite.adquirir()
+        try:
+            return cliente.get_items(lote)
+        except ItemsNotFound:
+            return []
+        except TooManyRequests:
+            if tentativa == AMAZON_TENTATIVAS_429:
+                raise
+            espera = 2 ** tentativa
+            logger.warning("PA-API pediu para diminuir o ritmo; nova tentativa em %ss", espera)
+            limite.pausar(espera)
+
+
+def sincronizar(asins, forcar=False, cliente=None):
+    # Resolve os ASINs (cache primeiro, depois GetItems em lotes de 10) e faz upsert em Produto
+    validos, invalidos = normalizar_asins(asins)
+    relatorio = {
+        'solicitados': len(validos), 'do_cache': 0, 'requisicoes': 0,
+        'inseridos': 0, 'atualizados': 0, 'inalterados': 0, 'quedas': [],
+        'nao_encontrados': [], 'invalidos': invalidos, 'erros': [],
+    }
+
+    faltando = []
+    for asin in validos:
+        em_cache = None if forcar else cache_produtos.obter(asin)
+        if em_cache is None:
+            faltando.append(asin)
+        else:
+            relatorio['do_cache'] += 1
+            if em_cache is NAO_ENCONTRADO:
+                relatorio['nao_encontrados'].append(asin)
+
+    if not faltando:
+        return relatorio
+
+    cliente = cliente or obter_cliente()
+    produtos = []
+    for inicio in range(0, len(faltando), MAX_ITENS_POR_REQUISICAO):
+        lote = faltando[inicio:inicio + MAX_ITENS_POR_REQUISICAO]
+        try:
+            itens = _consultar(cliente, lote)
+        except Exception as e:
+            logger.exception("Falha no GetItems para %s", lote)
+            relatorio['erros'].append({'asins': lote, 'erro': str(e)})
+            continue
+        relatorio['requisicoes'] += 1
+
+        encontrados = {}
+        for item in itens:
+            dados = _extrair(item)
+            encontrados[dados['asin']] = dados
+        for asin in lote:
+            dados = encontrados.get(asin)
+            if dados is None:
+                cache_produtos.guardar(asin, NAO_ENCONTRADO, ttl=PRODUTOS_CACHE_TTL_NEGATIVO)
+                relatorio['nao_encontrados'].append(asin)
+            else:
+                produtos.append(dados)
+
+    relatorio.update(upsert_produtos(produtos))
+    db.session.commit()
+    for dados in produtos:
+        cache_produtos.guardar(dados['asin'], dados)
+    return relatorio
+
+
+# 🔎 Consulta read-through de um produto: cache -> tabela produtos -> PA-API
+
+class MetricasBusca:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acertos = 0            # cache com o produto
+        self.acertos_negativos = 0  # cache dizendo que o ASIN não existe
+        self.faltas = 0
+        self.colapsadas = 0         # faltas que só esperaram outra consulta do mesmo ASIN
+        self.do_banco = 0
+        self.da_api = 0
+        self.nao_encontrados = 0
+        self.erros = 0
+
+    def contar(self, nome):
+        with self._lock:
+            setattr(self, nome, getattr(self, nome) + 1)
+
+    def resumo(self):
+        with self._lock:
+            consultas = self.acertos + self.acertos_negativos + self.faltas
+            return {
+                'acertos': self.acertos,
+                'acertos_negativos': self.acertos_negativos,
+                'faltas': self.faltas,
+                'colapsadas': self.colapsadas,
+                'do_banco': self.do_banco,
+                'da_api': self.da_api,
+                'nao_encontrados': self.nao_encontrados,
+                'erros': self.erros,
+                'taxa_acerto': round((self.acertos + self.acertos_negativos) / consultas, 4) if consultas else 0.0,
+                'itens_em_cache': len(cache_produtos),
+            }
+
+
+metricas_busca = MetricasBusca()
+_voo_unico = VooUnico()
+
+
+def _resolver(asin, cliente):
+    linha = db.session.execute(
+        select(Produto.asin, Produto.nome, Produto.preco, Produto.imagem_url, Produto.rating)
+        .where(Produto.asin == asin)
+    ).first()
+    if linha is not None:
+        metricas_busca.contar('do_banco')
+        dados = linha._asdict()
+        cache_produtos.guardar(asin, dados)
+        return dados
+
+    metricas_busca.contar('da_api')
+    itens = _consultar(cliente or obter_cliente(), [asin])
+    dados = next((_extrair(item) for item in itens if item.asin == asin), None)
+    if dados is None:
+        metricas_busca.contar('nao_encontrados')
+        cache_produtos.guardar(asin, NAO_ENCONTRADO, ttl=PRODUTOS_CACHE_TTL_NEGATIVO)
+        return None
+    upsert_produtos([dados])
+    db.session.commit()
+    cache_produtos.guardar(asin, dados)
+    return dados
+
+
+def buscar_produto(asin, cliente=None):
+    # Devolve o dict do produto ou None se o ASIN não existe. Falhas da PA-API sobem
+    # (ErroAmazon etc.) e não entram no cache negativo
+    asin = asin.strip().upper()
+    em_cache = cache_produtos.obter(asin)
+    if em_cache is not None:
+        metricas_busca.contar('acertos_negativos' if em_cache is NAO_ENCONTRADO else 'acertos')
+        return em_cache or None
+
+    metricas_busca.contar('faltas')
+    try:
+        dados, compartilhado = _voo_unico.executar(asin, lambda: _resolver(asin, cliente))
+    except Exception:
+        metricas_busca.contar('erros')
+        raise
+    if compartilhado:
+        metricas_busca.contar('colapsadas')
+    return dados
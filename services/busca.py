@@ -0,0 +1,85 @@
+import re
+
+from sqlalchemy import Boolean, DateTime, Float, text
+
+from extensions import db
+
+TABELA_FTS = 'oferta_fts'
+# Pesos nos dois bancos: título > loja/categoria > descrição.
+# Expressão do índice GIN no Postgres; a consulta precisa usar exatamente a mesma
+VETOR_POSTGRES = (
+    "setweight(to_tsvector('portuguese', coalesce(titulo, '')), 'A') || "
+    "setweight(to_tsvector('portuguese', coalesce(loja, '')), 'B') || "
+    "setweight(to_tsvector('portuguese', coalesce(categoria, '')), 'B') || "
+    "setweight(to_tsvector('portuguese', coalesce(descricao, '')), 'C')"
+)
+COLUNAS = "o.id, o.titulo, o.descricao, o.preco, o.imagem, o.link_afiliado, o.loja, o.categoria, " \
+          "o.destaque, o.likes, o.data_criacao"
+
+
+def termos(consulta):
+    return re.findall(r'\w+', consulta or '')
+
+
+def ignorar_tabelas_busca(objeto, nome, tipo, refletido, comparado):
+    # Para o autogenerate do Alembic não tentar apagar a tabela FTS5 e suas tabelas-sombra
+    return not (tipo == 'table' and nome and nome.startswith(TABELA_FTS))
+
+
+def _sql_sqlite(palavras):
+    # Cada termo vira prefixo entre aspas ("term"*): a entrada do usuário nunca é sintaxe FTS
+    match = ' '.join('"{}"*'.format(p.replace('"', '')) for p in palavras)
+    sql = text(
+        f"SELECT {COLUNAS}, -bm25({TABELA_FTS}, 10.0, 1.0, 5.0, 5.0) AS relevancia "
+        f"FROM {TABELA_FTS} JOIN oferta o ON o.id = {TABELA_FTS}.rowid "
+        f"WHERE {TABELA_FTS} MATCH :consulta "
+        "ORDER BY relevancia DESC, o.id DESC LIMIT :limite OFFSET :deslocamento"
+    )
+    return sql, match
+
+
+def _sql_postgres(palavras):
+    consulta = ' & '.join(f"{p}:*" for p in palavras)
+    sql = text(
+        f"SELECT {COLUNAS}, ts_rank({VETOR_POSTGRES}, to_tsquery('portuguese', :consulta)) AS relevancia "
+        "FROM oferta o "
+        f"WHERE ({VETOR_POSTGRES}) @@ to_tsquery('portuguese', :consulta) "
+        "ORDER BY relevancia DESC, o.id DESC LIMIT :limite OFFSET :deslocamento"
+    )
+    return sql, consulta
+
+
+def _sql_generico(palavras):
+    # Outros bancos: sem índice textual, só para não quebrar em desenvolvimento
+    condicoes = ' AND '.join(
+        f"(o.titulo LIKE :t{i} OR o.descricao LIKE :t{i} OR o.loja LIKE :t{i} OR o.categoria LIKE :t{i})"
+        for i in range(len(palavras))
+    )
+    sql = text(
+        f"SELECT {COLUNAS}, 0 AS relevancia FROM oferta o WHERE {condicoes} "
+        "ORDER BY o.id DESC LIMIT :limite OFFSET :deslocamento"
+    )
+    return sql.bindparams(**{f"t{i}": f"%{p}%" for i, p in enumerate(palavras)}), None
+
+
+def buscar(consulta, pagina=1, por_pagina=20):
+    # Devolve (linhas, tem_proxima); linhas são Rows com as colunas da oferta + relevancia
+    palavras = termos(consulta)
+    if not palavras:
+        return [], False
+
+    dialeto = db.engine.dialect.name
+    if dialeto == 'sqlite':
+        sql, parametro = _sql_sqlite(palavras)
+    elif dialeto == 'postgresql':
+        sql, parametro = _sql_postgres(palavras)
+    else:
+        sql, parametro = _sql_generico(palavras)
+
+    # Tipos das colunas para o SQL textual devolver datetime/bool como o ORM
+    sql = sql.columns(data_criacao=DateTime, destaque=Boolean, relevancia=Float)
+    parametros = {'limite': por_pagina + 1, 'deslocamento': (pagina - 1) * por_pagina}
+    if parametro is not None:
+        parametros['consulta'] = parametro
+    linhas = db.session.execute(sql, parametros).all()
+    return linhas[:por_pagina], len(linhas) > por_pagina
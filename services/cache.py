@@ -0,0 +1,206 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from flask import current_app, g, request
+from sqlalchemy import select
+
+from extensions import db
+from models import VersaoCache
+from utils.http import gerar_etag
+from utils.upsert import insert_com_conflito
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memoria")  # memoria | sqlite
+CACHE_TTL = float(os.getenv("CACHE_TTL", "30"))
+CACHE_MAX_ITENS = int(os.getenv("CACHE_MAX_ITENS", "512"))
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH")
+
+
+class CacheLRU:
+    # Cache em memória do processo: LRU com limite de itens e TTL por entrada
+
+    def __init__(self, max_itens=CACHE_MAX_ITENS, ttl=CACHE_TTL):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            valor, expira = item
+            if expira < time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def guardar(self, chave, valor, ttl=None):
+        expira = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._itens[chave] = (valor, expira)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def remover(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+class CacheSQLite:
+    # Cache compartilhado entre os workers do gunicorn num arquivo SQLite local (WAL):
+    # o payload montado por um worker serve a todos
+
+    def __init__(self, caminho, max_itens=CACHE_MAX_ITENS, ttl=CACHE_TTL):
+        self.caminho = caminho
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._conexao() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (chave TEXT PRIMARY KEY, valor BLOB, expira REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_expira ON cache (expira)")
+
+    def _conexao(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def obter(self, chave):
+        linha = self._conexao().execute(
+            "SELECT valor FROM cache WHERE chave = ? AND expira >= ?", (chave, time.time())
+        ).fetchone()
+        return linha[0] if linha else None
+
+    def guardar(self, chave, valor, ttl=None):
+        agora = time.time()
+        expira = agora + (self.ttl if ttl is None else ttl)
+        with self._conexao() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache (chave, valor, expira) VALUES (?, ?, ?)", (chave, valor, expira))
+            conn.execute("DELETE FROM cache WHERE expira < ?", (agora,))
+            # Mantém o limite de itens descartando os que expiram primeiro
+            conn.execute(
+                "DELETE FROM cache WHERE chave IN (SELECT chave FROM cache ORDER BY expira "
+                "LIMIT max((SELECT COUNT(*) FROM cache) - ?, 0))", (self.max_itens,)
+            )
+
+    def remover(self, chave):
+        with self._conexao() as conn:
+            conn.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+
+    def limpar(self):
+        with self._conexao() as conn:
+            conn.execute("DELETE FROM cache")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def obter_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if CACHE_BACKEND == "sqlite":
+                    caminho = CACHE_SQLITE_PATH or os.path.join(current_app.instance_path, "cache.sqlite3")
+                    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                    _cache = CacheSQLite(caminho)
+                else:
+                    _cache = CacheLRU()
+    return _cache
+
+
+# 🗂️ Payloads das listagens de ofertas, invalidados pelas versões em versao_cache.
+# As versões moram no banco principal: todo worker enxerga a invalidação no mesmo
+# instante, qualquer que seja o backend, e elas também servem de ETag.
+
+CATALOGO = "catalogo"  # conteúdo das ofertas (cadastro, edição, exclusão)
+CURTIDAS = "curtidas"  # likes/destaque, que mudam bem mais que o resto
+
+
+def versoes(*nomes):
+    # {nome: (versao, atualizado_em)}, lido uma vez por requisição
+    cache_g = g.setdefault('versoes_cache', {})
+    faltando = [n for n in nomes if n not in cache_g]
+    if faltando:
+        linhas = db.session.execute(
+            select(VersaoCache.nome, VersaoCache.versao, VersaoCache.atualizado_em)
+            .where(VersaoCache.nome.in_(faltando))
+        ).all()
+        encontrados = {nome: (versao, atualizado_em) for nome, versao, atualizado_em in linhas}
+        for nome in faltando:
+            cache_g[nome] = encontrados.get(nome, (0, None))
+    return {n: cache_g[n] for n in nomes}
+
+
+def assinatura(*nomes):
+    return "-".join(str(versao) for versao, _ in versoes(*nomes).values())
+
+
+def listagem_em_cache(rota, filtros, construir, dependencias=(CATALOGO,)):
+    # Devolve o corpo já serializado (bytes); `construir` só roda em caso de falta
+    cache = obter_cache()
+    chave = f"{rota}:v{assinatura(*dependencias)}:" + "&".join(f"{k}={v}" for k, v in sorted(filtros.items()))
+    corpo = cache.obter(chave)
+    if corpo is None:
+        corpo = construir()
+        if isinstance(corpo, str):
+            corpo = corpo.encode()
+        cache.guardar(chave, corpo)
+    return corpo
+
+
+def json_em_cache(rota, filtros, construir_payload, dependencias=(CATALOGO,)):
+    # Mesma saída do jsonify, mas o corpo serializado é que vai para o cache
+    corpo = listagem_em_cache(
+        rota, filtros, lambda: current_app.json.response(construir_payload()).get_data(), dependencias
+    )
+    return current_app.response_class(corpo, mimetype=current_app.json.mimetype)
+
+
+def validador_listagem(*dependencias):
+    # Para @condicional: ETag e Last-Modified saem das versões, sem montar o payload
+    def validador(*args, **kwargs):
+        estado = versoes(*dependencias)
+        etag = gerar_etag(request.path, sorted(request.args.items(multi=True)), assinatura(*dependencias))
+        modificado = max((atualizado for _, atualizado in estado.values() if atualizado), default=None)
+        return etag, modificado
+    return validador
+
+
+def invalidar(*nomes):
+    # Roda dentro da transação da escrita: a nova versão só aparece junto com o commit
+    tabela = VersaoCache.__table__
+    stmt = insert_com_conflito(tabela)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tabela.c.nome],
+        set_={'versao': tabela.c.versao + 1, 'atualizado_em': stmt.excluded.atualizado_em}
+    )
+    agora = datetime.utcnow()
+    db.session.execute(stmt, [{'nome': nome, 'versao': 1, 'atualizado_em': agora} for nome in nomes])
+    g.pop('versoes_cache', None)
+
+
+def invalidar_catalogo():
+    invalidar(CATALOGO)
+
+
+def invalidar_curtidas():
+    invalidar(CURTIDAS)
@@ -0,0 +1,147 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import bindparam, func, update
+
+from extensions import db
+from models import Oferta
+from services import engajamento, rollup
+from services.cache import invalidar_curtidas
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_MS = int(os.getenv("CURTIDAS_FLUSH_MS", "250"))
+
+
+class BufferCurtidas:
+    # Acumula curtidas por oferta em memória e grava tudo de tempos em tempos
+    # com um único UPDATE em lote (likes = likes + delta), sem read-modify-write.
+
+    def __init__(self, intervalo_ms=INTERVALO_MS):
+        self.intervalo = intervalo_ms / 1000.0
+        self._pendentes = Counter()
+        self._gravando = Counter()  # lote em gravação: continua somado nas leituras até o commit
+        self._lock = threading.Lock()
+        self._app = None
+        self._pid = None
+        self._parar = threading.Event()
+        # Métricas
+        self.flushes = 0
+        self.erros = 0
+        self.curtidas_gravadas = 0
+        self.ultimo_flush_ms = 0.0
+        self.maior_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def iniciar(self, app):
+        self._app = app
+        atexit.register(self.descarregar)
+
+    def _garantir_thread(self):
+        # Inicia a thread no primeiro uso de cada processo (também depois do fork do gunicorn)
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._executar, name="curtidas-flush", daemon=True).start()
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            self.descarregar()
+
+    def registrar(self, oferta_id, quantidade=1):
+        self._garantir_thread()
+        with self._lock:
+            self._pendentes[oferta_id] += quantidade
+
+    def pendente(self, oferta_id):
+        with self._lock:
+            return self._pendentes.get(oferta_id, 0) + self._gravando.get(oferta_id, 0)
+
+    def aplicar(self, itens):
+        # Soma as curtidas ainda não gravadas nos dicts serializados ('id' e 'likes')
+        with self._lock:
+            if not self._pendentes and not self._gravando:
+                return itens
+            pendentes = Counter(self._pendentes)
+            pendentes.update(self._gravando)  # update, não "+": deltas negativos contam
+        for item in itens:
+            delta = pendentes.get(item['id'])
+            if delta:
+                item['likes'] = (item['likes'] or 0) + delta
+        return itens
+
+    def _descontar_gravando(self, lote):
+        # Chamado com o lock: tira o lote (já gravado ou devolvido aos pendentes) das leituras
+        for oferta_id, delta in lote.items():
+            restante = self._gravando[oferta_id] - delta
+            if restante:
+                self._gravando[oferta_id] = restante
+            else:
+                del self._gravando[oferta_id]
+
+    def descarregar(self):
+        with self._lock:
+            if not self._pendentes:
+                return 0
+            lote, self._pendentes = self._pendentes, Counter()
+            self._gravando.update(lote)
+
+        inicio = time.perf_counter()
+        tabela = Oferta.__table__
+        stmt = (
+            update(tabela)
+            .where(tabela.c.id == bindparam('b_id'))
+            .values(likes=func.coalesce(tabela.c.likes, 0) + bindparam('b_delta'))
+        )
+        try:
+            with self._app.app_context():
+                db.session.execute(stmt, [{'b_id': i, 'b_delta': d} for i, d in lote.items()])
+                engajamento.registrar_curtidas(lote)
+                rollup.registrar_curtidas(lote)
+                invalidar_curtidas()
+                db.session.commit()
+        except Exception:
+            logger.exception("Falha ao gravar %s curtidas; mantidas no buffer", sum(lote.values()))
+            self.erros += 1
+            with self._lock:
+                self._descontar_gravando(lote)
+                self._pendentes.update(lote)
+            return 0
+        with self._lock:
+            self._descontar_gravando(lote)
+
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        self.flushes += 1
+        self.curtidas_gravadas += sum(lote.values())
+        self.ultimo_flush_ms = duracao_ms
+        self.maior_flush_ms = max(self.maior_flush_ms, duracao_ms)
+        self._total_flush_ms += duracao_ms
+        return len(lote)
+
+    def metricas(self):
+        with self._lock:
+            ofertas_pendentes = len(self._pendentes)
+            curtidas_pendentes = sum(self._pendentes.values())
+            curtidas_gravando = sum(self._gravando.values())
+        return {
+            'ofertas_pendentes': ofertas_pendentes,
+            'curtidas_pendentes': curtidas_pendentes,
+            'curtidas_gravando': curtidas_gravando,
+            'flushes': self.flushes,
+            'erros': self.erros,
+            'curtidas_gravadas': self.curtidas_gravadas,
+            'ultimo_flush_ms': round(self.ultimo_flush_ms, 3),
+            'maior_flush_ms': round(self.maior_flush_ms, 3),
+            'media_flush_ms': round(self._total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+            'intervalo_ms': int(self.intervalo * 1000),
+        }
+
+
+buffer_curtidas = BufferCurtidas()
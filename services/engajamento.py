@@ -0,0 +1,94 @@
+from collections import Counter
+
+from sqlalchemy import delete, func, literal, select
+
+from extensions import db
+from models import Engajamento, Favorito, Oferta
+from utils.upsert import insert_com_conflito
+
+DIMENSOES = ('categoria', 'loja')
+
+
+def _incrementar(deltas):
+    # deltas: {(dimensao, valor): (favoritos, likes)} -> um único upsert em lote
+    linhas = [
+        {'dimensao': dimensao, 'valor': valor, 'favoritos': favoritos, 'likes': likes}
+        for (dimensao, valor), (favoritos, likes) in deltas.items()
+        if valor and (favoritos or likes)
+    ]
+    if not linhas:
+        return
+    tabela = Engajamento.__table__
+    stmt = insert_com_conflito(tabela)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tabela.c.dimensao, tabela.c.valor],
+        set_={
+            'favoritos': tabela.c.favoritos + stmt.excluded.favoritos,
+            'likes': tabela.c.likes + stmt.excluded.likes,
+        }
+    )
+    db.session.execute(stmt, linhas)
+
+
+def registrar(oferta, favoritos=0, likes=0):
+    # Chamado na mesma transação da escrita que mudou o engajamento da oferta
+    _incrementar({
+        ('categoria', oferta.categoria): (favoritos, likes),
+        ('loja', oferta.loja): (favoritos, likes),
+    })
+
+
+def registrar_curtidas(lote):
+    # lote: {oferta_id: delta de likes}, vindo do flush do buffer de curtidas
+    ofertas = db.session.execute(
+        select(Oferta.id, Oferta.categoria, Oferta.loja).where(Oferta.id.in_(list(lote)))
+    ).all()
+    likes = Counter()
+    for oferta_id, categoria, loja in ofertas:
+        likes[('categoria', categoria)] += lote[oferta_id]
+        likes[('loja', loja)] += lote[oferta_id]
+    _incrementar({chave: (0, delta) for chave, delta in likes.items()})
+
+
+def registrar_ofertas(ofertas):
+    # ofertas: dicts com categoria, loja e likes (cadastro em lote)
+    likes = Counter()
+    for oferta in ofertas:
+        for dimensao in DIMENSOES:
+            likes[(dimensao, oferta[dimensao])] += oferta.get('likes') or 0
+    _incrementar({chave: (0, delta) for chave, delta in likes.items()})
+
+
+def ranking(dimensao, limite=None):
+    consulta = select(Engajamento.valor, Engajamento.favoritos, Engajamento.likes)\
+        .where(Engajamento.dimensao == dimensao)\
+        .order_by(Engajamento.favoritos.desc(), Engajamento.likes.desc(), Engajamento.valor)
+    if limite:
+        consulta = consulta.limit(limite)
+    return [
+        {'nome': valor, 'favoritos': favoritos, 'likes': likes}
+        for valor, favoritos, likes in db.session.execute(consulta)
+    ]
+
+
+def recalcular():
+    # Reconstrói os contadores a partir das tabelas brutas com GROUP BY
+    favoritos_por_oferta = select(Favorito.oferta_id, func.count(Favorito.id).label('total'))\
+        .group_by(Favorito.oferta_id).subquery()
+
+    db.session.execute(delete(Engajamento))
+    for dimensao in DIMENSOES:
+        coluna = getattr(Oferta, dimensao)
+        consulta = select(
+            literal(dimensao),
+            coluna,
+            func.coalesce(func.sum(favoritos_por_oferta.c.total), 0),
+            func.coalesce(func.sum(Oferta.likes), 0),
+        ).select_from(Oferta)\
+            .outerjoin(favoritos_por_oferta, favoritos_por_oferta.c.oferta_id == Oferta.id)\
+            .where(coluna.isnot(None), coluna != '')\
+            .group_by(coluna)
+        db.session.execute(
+            Engajamento.__table__.insert().from_select(['dimensao', 'valor', 'favoritos', 'likes'], consulta)
+        )
+    db.session.commit()
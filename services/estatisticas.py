@@ -0,0 +1,115 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_, select, update
+
+from extensions import db
+from models import Estatisticas, Favorito, Oferta, Usuario, VersaoCache
+from services.cache import CATALOGO, CURTIDAS
+
+ID_ESTATISTICAS = 1
+TOP_CURTIDAS = int(os.getenv("ESTATISTICAS_TOP_CURTIDAS", "5"))
+MAX_DESTAQUES = int(os.getenv("ESTATISTICAS_MAX_DESTAQUES", "20"))
+# Listas desatualizadas são remontadas na leitura, no máximo uma vez a cada intervalo
+INTERVALO_LISTAS = timedelta(seconds=float(os.getenv("ESTATISTICAS_LISTAS_SEGUNDOS", "5")))
+
+
+def _listas():
+    # Duas consultas com LIMIT pelos índices ix_oferta_likes e ix_oferta_destaque_likes
+    mais_curtidas = db.session.execute(
+        select(Oferta.id, Oferta.titulo, Oferta.likes)
+        .order_by(Oferta.likes.desc(), Oferta.id.desc()).limit(TOP_CURTIDAS)
+    ).all()
+    destaques = db.session.execute(
+        select(Oferta.id, Oferta.titulo, Oferta.likes)
+        .where(Oferta.destaque.is_(True))
+        .order_by(Oferta.likes.desc(), Oferta.id.desc()).limit(MAX_DESTAQUES)
+    ).all()
+    return {
+        'mais_curtidas': json.dumps([
+            {'id': id_, 'titulo': titulo, 'likes': likes} for id_, titulo, likes in mais_curtidas
+        ]),
+        'destaques': json.dumps([
+            {'id': id_, 'titulo': titulo, 'likes': likes, 'destaque': True} for id_, titulo, likes in destaques
+        ]),
+    }
+
+
+def _versao(nome):
+    return func.coalesce(select(VersaoCache.versao).where(VersaoCache.nome == nome).scalar_subquery(), 0)
+
+
+def registrar(usuarios=0, ofertas=0, favoritos=0):
+    # Chamado na mesma transação da escrita: só os totais, com UPDATE x = x + delta (sem
+    # ler antes). As listas não entram aqui: toda escrita que muda likes, destaque ou
+    # título incrementa a versão catalogo/curtidas, e a leitura remonta as listas
+    valores = {'atualizado_em': datetime.utcnow()}
+    tabela = Estatisticas.__table__
+    for coluna, delta in (('total_usuarios', usuarios), ('total_ofertas', ofertas), ('total_favoritos', favoritos)):
+        if delta:
+            valores[coluna] = tabela.c[coluna] + delta
+    if len(valores) == 1:
+        return
+    resultado = db.session.execute(update(tabela).where(tabela.c.id == ID_ESTATISTICAS).values(**valores))
+    if resultado.rowcount == 0:
+        recalcular(commit=False)
+
+
+def ler():
+    # Uma única consulta (resumo + versões atuais), sem contar nada. Se as versões mudaram
+    # desde a montagem das listas, elas são remontadas aqui (no máximo uma vez por
+    # INTERVALO_LISTAS entre todos os workers)
+    linha = db.session.execute(
+        select(Estatisticas.total_usuarios, Estatisticas.total_ofertas, Estatisticas.total_favoritos,
+               Estatisticas.mais_curtidas, Estatisticas.destaques, Estatisticas.listas_versao,
+               Estatisticas.listas_em, _versao(CATALOGO), _versao(CURTIDAS))
+        .where(Estatisticas.id == ID_ESTATISTICAS)
+    ).first()
+    if linha is None:
+        return {'total_usuarios': 0, 'total_ofertas': 0, 'total_favoritos': 0,
+                'mais_curtidas': [], 'destaques': []}
+
+    mais_curtidas, destaques = linha.mais_curtidas, linha.destaques
+    versao = f"{linha[-2]}-{linha[-1]}"
+    agora = datetime.utcnow()
+    if linha.listas_versao != versao and (linha.listas_em is None or linha.listas_em <= agora - INTERVALO_LISTAS):
+        listas = _listas()
+        tabela = Estatisticas.__table__
+        db.session.execute(
+            update(tabela)
+            .where(tabela.c.id == ID_ESTATISTICAS,
+                   or_(tabela.c.listas_em.is_(None), tabela.c.listas_em <= agora - INTERVALO_LISTAS))
+            .values(**listas, listas_versao=versao, listas_em=agora)
+        )
+        db.session.commit()
+        mais_curtidas, destaques = listas['mais_curtidas'], listas['destaques']
+
+    return {
+        'total_usuarios': linha.total_usuarios,
+        'total_ofertas': linha.total_ofertas,
+        'total_favoritos': linha.total_favoritos,
+        'mais_curtidas': json.loads(mais_curtidas),
+        'destaques': json.loads(destaques),
+    }
+
+
+def recalcular(commit=True):
+    # Reconstrói a linha a partir das tabelas (contagens completas); para correções manuais
+    valores = {
+        'total_usuarios': db.session.scalar(select(func.count(Usuario.id))),
+        'total_ofertas': db.session.scalar(select(func.count(Oferta.id))),
+        'total_favoritos': db.session.scalar(select(func.count(Favorito.id))),
+        'atualizado_em': datetime.utcnow(),
+        **_listas(),
+    }
+    catalogo, curtidas = db.session.execute(select(_versao(CATALOGO), _versao(CURTIDAS))).one()
+    valores.update(listas_versao=f"{catalogo}-{curtidas}", listas_em=valores['atualizado_em'])
+    estatisticas = db.session.get(Estatisticas, ID_ESTATISTICAS)
+    if estatisticas is None:
+        db.session.add(Estatisticas(id=ID_ESTATISTICAS, **valores))
+    else:
+        for coluna, valor in valores.items():
+            setattr(estatisticas, coluna, valor)
+    if commit:
+        db.session.commit()
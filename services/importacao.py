@@ -0,0 +1,109 @@
+import os
+
+from flask import current_app
+from pydantic import ValidationError
+from sqlalchemy import insert
+
+from extensions import db
+from models import Oferta
+from schemas import ListaOfertas
+from services import engajamento, precos
+from services.cache import invalidar_catalogo
+from services.estatisticas import registrar as registrar_estatisticas
+from services.outbox import enfileirar_oferta
+
+TAMANHO_LOTE = int(os.getenv("IMPORTACAO_LOTE", "500"))
+MAX_RESUMO = int(os.getenv("IMPORTACAO_MAX_RESUMO", "10"))  # ofertas listadas no resumo do Telegram
+
+
+def ler_ndjson(fluxo):
+    # Gera (linha, dados, erro) sem carregar o corpo inteiro; linhas vazias são ignoradas
+    for numero, linha in enumerate(fluxo, 1):
+        if not linha.strip():
+            continue
+        try:
+            yield numero, current_app.json.loads(linha), None
+        except ValueError:
+            yield numero, None, 'JSON inválido.'
+
+
+def ler_lista(dados):
+    for numero, item in enumerate(dados, 1):
+        yield numero, item, None
+
+
+def validar_lote(lote, adaptador=ListaOfertas):
+    # lote: [(linha, dados)]. Uma validação para o lote todo; se houver erros,
+    # as linhas válidas passam numa segunda chamada. Devolve ([(linha, modelo)], erros)
+    numeros = [numero for numero, _ in lote]
+    dados = [item for _, item in lote]
+    try:
+        return list(zip(numeros, adaptador.validate_python(dados))), []
+    except ValidationError as e:
+        por_indice = {}
+        for erro in e.errors(include_url=False, include_input=False):
+            indice, *campo = erro['loc']
+            por_indice.setdefault(indice, []).append({
+                'campo': '.'.join(str(c) for c in campo) or None,
+                'mensagem': erro['msg'],
+            })
+    restantes = [i for i in range(len(dados)) if i not in por_indice]
+    validas = adaptador.validate_python([dados[i] for i in restantes])
+    erros = [{'linha': numeros[i], 'erros': detalhes} for i, detalhes in sorted(por_indice.items())]
+    return list(zip((numeros[i] for i in restantes), validas)), erros
+
+
+def _inserir(lote, relatorio, resumo):
+    validas, erros = validar_lote(lote)
+    relatorio['erros'].extend(erros)
+    if not validas:
+        return
+
+    linhas = [oferta.model_dump() for _, oferta in validas]
+    # executemany com RETURNING (insertmanyvalues): poucos round-trips por lote
+    ids = db.session.scalars(insert(Oferta).returning(Oferta.id), linhas).all()
+    engajamento.registrar_ofertas(linhas)
+    precos.registrar_mudancas(precos.OFERTA, [(id_, None, linha['preco']) for id_, linha in zip(ids, linhas)])
+    registrar_estatisticas(ofertas=len(ids))
+    invalidar_catalogo()
+
+    relatorio['criadas'] += len(ids)
+    relatorio['ids'].extend(ids)
+    resumo.extend(linhas[:MAX_RESUMO - len(resumo)])
+
+
+def _legenda_resumo(total, resumo):
+    partes = [f"📦 *{total} novas ofertas!*\n"]
+    for oferta in resumo:
+        partes.append(
+            f"• *{oferta['titulo']}* — R$ {oferta['preco']} ({oferta['loja']})\n"
+            f"[👉 Comprar agora]({oferta['link_afiliado']})"
+        )
+    if total > len(resumo):
+        partes.append(f"\n_e mais {total - len(resumo)} ofertas_")
+    return "\n".join(partes)
+
+
+def importar(registros, tamanho_lote=TAMANHO_LOTE):
+    # registros: iterável de (linha, dados, erro). Cada lote é um commit; o último
+    # leva junto um único resumo na outbox do Telegram em vez de uma mensagem por oferta
+    relatorio = {'recebidas': 0, 'criadas': 0, 'ids': [], 'erros': []}
+    resumo = []
+    lote = []
+    for numero, dados, erro in registros:
+        relatorio['recebidas'] += 1
+        if erro:
+            relatorio['erros'].append({'linha': numero, 'erros': [{'campo': None, 'mensagem': erro}]})
+            continue
+        lote.append((numero, dados))
+        if len(lote) >= tamanho_lote:
+            _inserir(lote, relatorio, resumo)
+            db.session.commit()
+            lote = []
+
+    if lote:
+        _inserir(lote, relatorio, resumo)
+    if relatorio['criadas']:
+        enfileirar_oferta(_legenda_resumo(relatorio['criadas'], resumo))
+    db.session.commit()
+    return relatorio
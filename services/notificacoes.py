@@ -0,0 +1,196 @@
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, select, update
+
+from extensions import db
+from models import MarcaRollup, Notificacao, Oferta, Usuario
+from services.alertas import obter_indice
+from services.outbox import enfileirar_varios
+from services.rollup import limite_seguro
+from utils.upsert import insert_com_conflito
+
+logger = logging.getLogger(__name__)
+
+MARCA = "notificacao"  # linha em rollup_marca: última oferta já distribuída
+LOTE_OFERTAS = int(os.getenv("NOTIFICACOES_LOTE_OFERTAS", "100"))
+LOTE_USUARIOS = int(os.getenv("NOTIFICACOES_LOTE_USUARIOS", "500"))
+# Até N alertas individuais por usuário na janela; o excedente vira um resumo
+LIMITE_JANELA = int(os.getenv("NOTIFICACOES_POR_JANELA", "5"))
+JANELA = timedelta(minutes=float(os.getenv("NOTIFICACOES_JANELA_MINUTOS", "60")))
+MAX_RESUMO = int(os.getenv("NOTIFICACOES_MAX_RESUMO", "10"))  # ofertas listadas no resumo
+# Posse das notificações "processando"; se o despachante morrer, elas voltam a ser entregues
+LEASE = timedelta(seconds=float(os.getenv("NOTIFICACOES_LEASE", "60")))
+TAMANHO_INSERT = 1000
+
+
+def _em_partes(itens, tamanho):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+
+def distribuir(lote=LOTE_OFERTAS):
+    # Casa as ofertas acima da marca (até o limite_seguro) com o índice de alertas e grava
+    # uma notificação por (usuário, oferta). Só entram usuários com chat do Telegram; a
+    # restrição única descarta repetições (ex.: duas execuções ao mesmo tempo)
+    marca = db.session.get(MarcaRollup, MARCA)
+    if marca is None:
+        db.session.add(MarcaRollup(fonte=MARCA, ultimo_id=0))
+        db.session.commit()
+        marca = db.session.get(MarcaRollup, MARCA)
+    atual = marca.ultimo_id
+    # Mesmo cuidado do rollup: ofertas de transações ainda abertas não ficam para trás da marca
+    limite = limite_seguro(Oferta.id, Oferta.data_criacao, atual)
+    if limite <= atual:
+        return 0
+
+    ofertas = db.session.execute(
+        select(Oferta.id, Oferta.titulo, Oferta.descricao, Oferta.categoria, Oferta.loja, Oferta.preco)
+        .where(Oferta.id > atual, Oferta.id <= limite).order_by(Oferta.id).limit(lote)
+    ).all()
+    if not ofertas:
+        return 0
+
+    indice = obter_indice()
+    com_chat = set(db.session.scalars(select(Usuario.id).where(Usuario.telegram_chat_id.isnot(None))))
+    linhas = []
+    for oferta_id, titulo, descricao, categoria, loja, preco in ofertas:
+        usuarios = {a.usuario_id for a in indice.encontrar(titulo, descricao, categoria, loja, preco)}
+        linhas.extend({'usuario_id': u, 'oferta_id': oferta_id} for u in usuarios & com_chat)
+
+    tabela = Notificacao.__table__
+    stmt = insert_com_conflito(tabela).on_conflict_do_nothing(index_elements=[tabela.c.usuario_id, tabela.c.oferta_id])
+    for parte in _em_partes(linhas, TAMANHO_INSERT):
+        db.session.execute(stmt, parte)
+
+    ultima = ofertas[-1][0]
+    movida = db.session.execute(
+        update(MarcaRollup)
+        .where(MarcaRollup.fonte == MARCA, MarcaRollup.ultimo_id == atual)
+        .values(ultimo_id=ultima, atualizado_em=datetime.utcnow())
+    ).rowcount
+    if not movida:
+        db.session.rollback()
+        return 0
+    db.session.commit()
+    return len(linhas)
+
+
+def _mensagem(oferta):
+    legenda = (
+        "🔔 *Oferta para o seu alerta!*\n\n"
+        f"*{oferta.titulo}*\n"
+        f"💰 Preço: R$ {oferta.preco}\n"
+        f"🏬 Loja: {oferta.loja}\n\n"
+        f"[👉 Comprar agora]({oferta.link_afiliado})"
+    )
+    if oferta.imagem:
+        return "sendPhoto", {"caption": legenda, "photo": oferta.imagem, "parse_mode": "Markdown"}
+    return "sendMessage", {"text": legenda, "parse_mode": "Markdown"}
+
+
+def _resumo(ofertas):
+    partes = [f"🔔 *{len(ofertas)} ofertas para os seus alertas*\n"]
+    for oferta in ofertas[:MAX_RESUMO]:
+        partes.append(f"• *{oferta.titulo}* — R$ {oferta.preco} ({oferta.loja})\n[👉 Comprar agora]({oferta.link_afiliado})")
+    if len(ofertas) > MAX_RESUMO:
+        partes.append(f"\n_e mais {len(ofertas) - MAX_RESUMO} ofertas_")
+    return "sendMessage", {"text": "\n".join(partes), "parse_mode": "Markdown"}
+
+
+def _reservar(usuarios, agora):
+    # Reserva condicional, como a da outbox: só um despachante passa cada notificação para
+    # "processando"; as que já têm dono (posse ainda válida) ficam de fora
+    reservadas = db.session.scalars(
+        update(Notificacao)
+        .where(Notificacao.usuario_id.in_(usuarios),
+               Notificacao.status.in_(('pendente', 'processando')),
+               Notificacao.liberar_em <= agora)
+        .values(status='processando', liberar_em=agora + LEASE)
+        .returning(Notificacao.id)
+    ).all()
+    db.session.commit()
+    return reservadas
+
+
+def entregar(lote=LOTE_USUARIOS):
+    # Transforma as notificações pendentes de um lote de usuários em mensagens na outbox
+    # (o despachante envia em paralelo, respeitando os limites do Telegram). Por usuário:
+    # até LIMITE_JANELA individuais por janela; o resto vai num único resumo, e quem já
+    # recebeu resumo na janela acumula até ela acabar
+    agora = datetime.utcnow()
+    usuarios = db.session.scalars(
+        select(Notificacao.usuario_id)
+        .where(Notificacao.status.in_(('pendente', 'processando')), Notificacao.liberar_em <= agora)
+        .group_by(Notificacao.usuario_id).limit(lote)
+    ).all()
+    if not usuarios:
+        return 0
+
+    reservadas = _reservar(usuarios, agora)
+    if not reservadas:
+        return 0
+
+    # As mensagens saem só do que este despachante reservou
+    pendentes = {}
+    for parte in _em_partes(sorted(reservadas), TAMANHO_INSERT):
+        for linha in db.session.execute(
+            select(Notificacao.id, Notificacao.usuario_id, Usuario.telegram_chat_id,
+                   Oferta.titulo, Oferta.preco, Oferta.loja, Oferta.link_afiliado, Oferta.imagem)
+            .join(Usuario, Usuario.id == Notificacao.usuario_id)
+            .join(Oferta, Oferta.id == Notificacao.oferta_id)
+            .where(Notificacao.id.in_(parte))
+            .order_by(Notificacao.usuario_id, Notificacao.id)
+        ):
+            pendentes.setdefault(linha.usuario_id, []).append(linha)
+    usuarios = list(pendentes)
+
+    # Uma consulta para o histórico da janela de todo o lote
+    historico = {
+        usuario_id: (enviadas, ultimo_resumo)
+        for usuario_id, enviadas, ultimo_resumo in db.session.execute(
+            select(Notificacao.usuario_id,
+                   func.count(case((Notificacao.status == 'enviada', 1))),
+                   func.max(case((Notificacao.status == 'resumida', Notificacao.data_envio))))
+            .where(Notificacao.usuario_id.in_(usuarios), Notificacao.data_envio >= agora - JANELA)
+            .group_by(Notificacao.usuario_id)
+        )
+    }
+
+    mensagens, alteracoes = [], []
+    for usuario_id, itens in pendentes.items():
+        chat_id = itens[0].telegram_chat_id
+        if not chat_id:
+            # Usuário removeu o chat depois da distribuição: nada a enviar
+            alteracoes.extend({'id': i.id, 'status': 'descartada'} for i in itens)
+            continue
+        enviadas, ultimo_resumo = historico.get(usuario_id, (0, None))
+        livres = max(LIMITE_JANELA - enviadas, 0)
+        individuais, excedentes = itens[:livres], itens[livres:]
+
+        for item in individuais:
+            mensagens.append((*_mensagem(item), chat_id))
+            alteracoes.append({'id': item.id, 'status': 'enviada', 'data_envio': agora})
+        if not excedentes:
+            continue
+        if ultimo_resumo is None:
+            mensagens.append((*_resumo(excedentes), chat_id))
+            alteracoes.extend({'id': i.id, 'status': 'resumida', 'data_envio': agora} for i in excedentes)
+        else:
+            # Devolve a reserva: voltam a pendentes quando a janela do resumo acabar
+            liberar_em = ultimo_resumo + JANELA
+            alteracoes.extend({'id': i.id, 'status': 'pendente', 'liberar_em': liberar_em} for i in excedentes)
+
+    enfileirar_varios(mensagens)
+    if alteracoes:
+        # UPDATE em lote pela chave primária (executemany); são todas reservadas por este despachante
+        db.session.execute(update(Notificacao), alteracoes)
+    db.session.commit()
+    logger.info("Notificações: %s mensagens para %s usuários", len(mensagens), len(pendentes))
+    return len(mensagens)
+
+
+def processar():
+    # Uma volta do pipeline: distribui ofertas novas e entrega um lote de usuários
+    return distribuir() + entregar()
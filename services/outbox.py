@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, update
+
+from extensions import db
+from models import TelegramOutbox
+from services import telegram
+
+logger = logging.getLogger(__name__)
+
+MAX_TENTATIVAS = int(os.getenv("OUTBOX_MAX_TENTATIVAS", "8"))
+BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", "5"))  # segundos
+BACKOFF_MAXIMO = float(os.getenv("OUTBOX_BACKOFF_MAXIMO", "900"))
+# Tempo de posse de uma mensagem "enviando"; se o worker morrer, ela volta à fila
+LEASE_SEGUNDOS = float(os.getenv("OUTBOX_LEASE", "60"))
+# Mensagens reservadas por volta; o envio delas é concorrente no pool do cliente
+LOTE = int(os.getenv("OUTBOX_LOTE", "50"))
+
+
+def enfileirar(metodo, payload, chat_id=None):
+    # Só adiciona à sessão: o commit é o mesmo da transação de quem chamou
+    mensagem = TelegramOutbox(
+        metodo=metodo,
+        chat_id=str(chat_id or telegram.TELEGRAM_CHAT_ID),
+        payload=json.dumps(payload, ensure_ascii=False),
+    )
+    db.session.add(mensagem)
+    return mensagem
+
+
+def enfileirar_varios(mensagens):
+    # mensagens: [(metodo, payload, chat_id)]; um INSERT executemany, para fan-outs grandes
+    linhas = [
+        {"metodo": metodo, "chat_id": str(chat_id), "payload": json.dumps(payload, ensure_ascii=False)}
+        for metodo, payload, chat_id in mensagens
+    ]
+    if linhas:
+        db.session.execute(insert(TelegramOutbox), linhas)
+    return len(linhas)
+
+
+def enfileirar_oferta(legenda, imagem=None):
+    # Uma linha por canal/grupo: cada destino tem suas próprias tentativas
+    if imagem:
+        metodo, payload = "sendPhoto", {"caption": legenda, "photo": imagem, "parse_mode": "Markdown"}
+    else:
+        metodo, payload = "sendMessage", {"text": legenda, "parse_mode": "Markdown"}
+    return [enfileirar(metodo, payload, chat_id) for chat_id in telegram.TELEGRAM_CHAT_IDS]
+
+
+def calcular_backoff(tentativas):
+    return min(BACKOFF_BASE * (2 ** max(tentativas - 1, 0)), BACKOFF_MAXIMO)
+
+
+def _reservar(mensagem_id, agora):
+    # Reserva condicional: só um worker consegue passar a mensagem para "enviando"
+    resultado = db.session.execute(
+        update(TelegramOutbox)
+        .where(
+            TelegramOutbox.id == mensagem_id,
+            TelegramOutbox.status.in_(("pendente", "enviando")),
+            TelegramOutbox.proxima_tentativa <= agora,
+        )
+        .values(status="enviando", proxima_tentativa=agora + timedelta(seconds=LEASE_SEGUNDOS))
+    )
+    return resultado.rowcount == 1
+
+
+def despachar_pendentes(limite=LOTE):
+    agora = datetime.utcnow()
+    ids = db.session.scalars(
+        db.select(TelegramOutbox.id)
+        .where(
+            TelegramOutbox.status.in_(("pendente", "enviando")),
+            TelegramOutbox.proxima_tentativa <= agora,
+        )
+        .order_by(TelegramOutbox.proxima_tentativa, TelegramOutbox.id)
+        .limit(limite)
+    ).all()
+
+    reservados = [mensagem_id for mensagem_id in ids if _reservar(mensagem_id, agora)]
+    db.session.commit()
+    if not reservados:
+        return 0, 0
+
+    mensagens = db.session.scalars(
+        db.select(TelegramOutbox).where(TelegramOutbox.id.in_(reservados)).order_by(TelegramOutbox.id)
+    ).all()
+    # Envio concorrente pelo pool do cliente. Nem 429 nem o limite por chat bloqueiam o
+    # worker: esperar a ficha de um grupo (20/min) segurando a posse passaria do
+    # LEASE_SEGUNDOS e outro despachante reenviaria a mensagem; vira reagendamento
+    cliente = telegram.obter_cliente()
+    resultados = cliente.enviar_varios(
+        [(m.metodo, {"chat_id": m.chat_id, **json.loads(m.payload)}) for m in mensagens],
+        tentativas_429=0, bloquear_chat=False,
+    )
+
+    enviadas = falhas = 0
+    adiadas = {}  # por chat: as adiadas voltam espaçadas na taxa do chat, não todas juntas
+    for mensagem, resultado in zip(mensagens, resultados):
+        if isinstance(resultado, telegram.ErroTelegram):
+            falhas += 1
+            # 429 e limite do chat são controle de vazão, não contam como tentativa perdida
+            if resultado.retry_after is None:
+                mensagem.tentativas += 1
+            mensagem.ultimo_erro = str(resultado)
+            if mensagem.tentativas >= MAX_TENTATIVAS:
+                mensagem.status = "falhou"
+                logger.error("Outbox %s descartada após %s tentativas: %s", mensagem.id, mensagem.tentativas, resultado)
+            else:
+                if resultado.retry_after is not None:
+                    posicao = adiadas[mensagem.chat_id] = adiadas.get(mensagem.chat_id, -1) + 1
+                    espera = resultado.retry_after + posicao / cliente.limite_do_chat(mensagem.chat_id).taxa
+                else:
+                    espera = calcular_backoff(mensagem.tentativas)
+                mensagem.status = "pendente"
+                mensagem.proxima_tentativa = datetime.utcnow() + timedelta(seconds=espera)
+        else:
+            enviadas += 1
+            mensagem.status = "enviada"
+            mensagem.data_envio = datetime.utcnow()
+            mensagem.ultimo_erro = None
+    db.session.commit()
+
+    return enviadas, falhas
+
+
+def executar_despachante(app, intervalo=2.0, parar=None, tarefas=()):
+    # tarefas: funções extras rodadas a cada volta antes do envio (ex.: notificações
+    # dos alertas), cada uma devolvendo quanto trabalho fez
+    parar = parar or threading.Event()
+    while not parar.is_set():
+        trabalho = 0
+        with app.app_context():
+            for tarefa in tarefas:
+                try:
+                    trabalho += tarefa() or 0
+                except Exception:
+                    logger.exception("Erro na tarefa %s do despachante", getattr(tarefa, "__name__", tarefa))
+                    db.session.rollback()
+            try:
+                enviadas, falhas = despachar_pendentes()
+            except Exception:
+                logger.exception("Erro no despachante do Telegram")
+                db.session.rollback()
+                enviadas = falhas = 0
+        # Se a fila ainda tinha trabalho, volta logo; senão espera o intervalo
+        if not (trabalho or enviadas or falhas):
+            parar.wait(intervalo)
+
+
+_despachante_pid = None
+_despachante_lock = threading.Lock()
+
+
+def garantir_thread_despachante(app, intervalo=2.0, tarefas=()):
+    # Uma thread por processo, iniciada no primeiro request: com gunicorn --preload o
+    # master monta o app e as threads não sobreviveriam ao fork dos workers
+    global _despachante_pid
+    if _despachante_pid == os.getpid():
+        return
+    with _despachante_lock:
+        if _despachante_pid == os.getpid():
+            return
+        _despachante_pid = os.getpid()
+        iniciar_thread_despachante(app, intervalo, tarefas)
+
+
+def iniciar_thread_despachante(app, intervalo=2.0, tarefas=()):
+    parar = threading.Event()
+    thread = threading.Thread(
+        target=executar_despachante, args=(app, intervalo, parar, tarefas),
+        name="telegram-outbox", daemon=True
+    )
+    thread.start()
+    return thread, parar
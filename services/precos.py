@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.orm import aliased
+
+from extensions import db
+from models import HistoricoPreco
+
+OFERTA = 'oferta'
+PRODUTO = 'produto'
+JANELAS = (30, 90)  # dias
+
+
+def _mesmo_preco(a, b):
+    return a is not None and b is not None and round(a, 2) == round(b, 2)
+
+
+def minimos_varios(alvo, referencias, agora=None):
+    # {referencia: {30: menor preço, 90: menor preço}} de várias referências numa ida ao banco
+    # (GROUP BY referencia). Em cada janela entram as mudanças dentro dela e o preço que já valia
+    # no início dela; tudo por faixa no índice (alvo, referencia, data)
+    agora = agora or datetime.utcnow()
+    referencias = sorted({str(r) for r in referencias})
+    if not referencias:
+        return {}
+    inicios = {dias: agora - timedelta(days=dias) for dias in JANELAS}
+    colunas = [HistoricoPreco.referencia]
+    for dias, inicio in inicios.items():
+        colunas.append(func.min(case((HistoricoPreco.data >= inicio, HistoricoPreco.preco))).label(f'min_{dias}'))
+        colunas.append(func.max(case((HistoricoPreco.data < inicio, HistoricoPreco.data))).label(f'antes_{dias}'))
+    grupos = select(*colunas).where(
+        HistoricoPreco.alvo == alvo, HistoricoPreco.referencia.in_(referencias)
+    ).group_by(HistoricoPreco.referencia).subquery()
+
+    # Preço que valia no início da janela: a última mudança antes dela (subconsulta correlacionada)
+    anterior = aliased(HistoricoPreco)
+    consulta = select(grupos.c.referencia)
+    for dias in JANELAS:
+        consulta = consulta.add_columns(
+            grupos.c[f'min_{dias}'],
+            select(anterior.preco).where(
+                anterior.alvo == alvo, anterior.referencia == grupos.c.referencia,
+                anterior.data == grupos.c[f'antes_{dias}']
+            ).order_by(anterior.id.desc()).limit(1).scalar_subquery(),
+        )
+    resultado = {}
+    for referencia, *valores in db.session.execute(consulta):
+        resultado[referencia] = {
+            dias: min((v for v in valores[i * 2:i * 2 + 2] if v is not None), default=None)
+            for i, dias in enumerate(JANELAS)
+        }
+    return resultado
+
+
+def minimos(alvo, referencia, agora=None):
+    # {30: menor preço, 90: menor preço} de uma referência
+    return minimos_varios(alvo, [referencia], agora).get(str(referencia), {dias: None for dias in JANELAS})
+
+
+def registrar_mudancas(alvo, mudancas):
+    # mudancas: [(referencia, preco_anterior, preco_novo)], na transação de quem gravou o preço.
+    # Só grava o que mudou. Devolve a análise das reduções: queda_real quando o novo preço fica
+    # abaixo do menor dos últimos 30 dias (não é só a volta de um preço inflado)
+    agora = datetime.utcnow()
+    mudancas = [
+        (referencia, anterior, novo) for referencia, anterior, novo in mudancas
+        if novo is not None and not _mesmo_preco(anterior, novo)
+    ]
+    # Mínimos de todas as reduções do lote numa consulta só, antes do INSERT das novas linhas
+    reducoes = [referencia for referencia, anterior, novo in mudancas if anterior is not None and novo < anterior]
+    todos_minimos = minimos_varios(alvo, reducoes, agora)
+    linhas, quedas = [], []
+    for referencia, anterior, novo in mudancas:
+        if anterior is not None and novo < anterior:
+            menores = todos_minimos.get(str(referencia), {dias: None for dias in JANELAS})
+            minimo_30 = menores[30] if menores[30] is not None else anterior
+            quedas.append({
+                'referencia': str(referencia),
+                'anterior': anterior,
+                'novo': novo,
+                'percentual': round((anterior - novo) / anterior * 100, 2) if anterior else None,
+                'minimo_30d': menores[30],
+                'minimo_90d': menores[90],
+                'queda_real': round(novo, 2) < round(minimo_30, 2),
+            })
+        linhas.append({'alvo': alvo, 'referencia': str(referencia), 'preco': novo, 'data': agora})
+    if linhas:
+        db.session.execute(insert(HistoricoPreco), linhas)
+    return quedas
+
+
+def historico(alvo, referencia, limite=100):
+    # Mudanças mais recentes primeiro + mínimos das janelas
+    linhas = db.session.execute(
+        select(HistoricoPreco.preco, HistoricoPreco.data)
+        .where(HistoricoPreco.alvo == alvo, HistoricoPreco.referencia == str(referencia))
+        .order_by(HistoricoPreco.data.desc(), HistoricoPreco.id.desc())
+        .limit(limite)
+    ).all()
+    menores = minimos(alvo, referencia)
+    return {
+        'referencia': str(referencia),
+        'preco_atual': linhas[0].preco if linhas else None,
+        'minimo_30d': menores[30],
+        'minimo_90d': menores[90],
+        'mudancas': [{'preco': preco, 'data': data.strftime('%d/%m/%Y %H:%M:%S')} for preco, data in linhas],
+    }
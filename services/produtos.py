@@ -0,0 +1,97 @@
+import os
+
+from sqlalchemy import func, or_, select
+
+from extensions import db
+from models import Produto
+from services import precos
+from services.cache import CacheLRU
+from utils.upsert import insert_com_conflito
+
+TAMANHO_LOTE = int(os.getenv("PRODUTOS_LOTE", "1000"))
+CAMPOS = ('nome', 'preco', 'imagem_url', 'rating')
+
+# Cache dos produtos por ASIN (consulta e sincronização com a PA-API)
+PRODUTOS_CACHE_TTL = float(os.getenv("PRODUTOS_CACHE_TTL", "3600"))
+PRODUTOS_CACHE_TTL_NEGATIVO = float(os.getenv("PRODUTOS_CACHE_TTL_NEGATIVO", "600"))
+PRODUTOS_CACHE_MAX_ITENS = int(os.getenv("PRODUTOS_CACHE_MAX_ITENS", "10000"))
+NAO_ENCONTRADO = {}  # marcador do cache negativo
+cache_produtos = CacheLRU(max_itens=PRODUTOS_CACHE_MAX_ITENS, ttl=PRODUTOS_CACHE_TTL)
+
+
+def _upsert(tabela):
+    stmt = insert_com_conflito(tabela)
+    novos = {
+        'nome': stmt.excluded.nome,
+        'preco': stmt.excluded.preco,
+        'imagem_url': stmt.excluded.imagem_url,
+        # A PA-API nem sempre devolve avaliação: não apaga a que já existe
+        'rating': func.coalesce(stmt.excluded.rating, tabela.c.rating),
+    }
+    # Só reescreve a linha se algo mudou de fato (comparação que trata NULL)
+    mudou = or_(*(tabela.c[campo].is_distinct_from(valor) for campo, valor in novos.items()))
+    return stmt.on_conflict_do_update(index_elements=[tabela.c.asin], set_=novos, where=mudou)\
+        .returning(tabela.c.asin)
+
+
+def upsert_produtos(linhas, tamanho_lote=TAMANHO_LOTE):
+    # linhas: dicts com asin, nome, preco, imagem_url, rating. Por lote: um SELECT dos ASINs
+    # que já existem e um INSERT ... ON CONFLICT (asin) DO UPDATE ... WHERE <mudou> RETURNING.
+    # Linhas sem mudança não são reescritas nem devolvidas pelo RETURNING.
+    contagem = {'inseridos': 0, 'atualizados': 0, 'inalterados': 0, 'quedas': []}
+    # Um ASIN repetido no mesmo INSERT quebraria o ON CONFLICT: vale a última ocorrência
+    por_asin = {linha['asin'].upper(): {**{c: None for c in CAMPOS}, **linha, 'asin': linha['asin'].upper()}
+                for linha in linhas}
+    linhas = list(por_asin.values())
+    tabela = Produto.__table__
+    stmt = _upsert(tabela)
+
+    for inicio in range(0, len(linhas), tamanho_lote):
+        lote = linhas[inicio:inicio + tamanho_lote]
+        asins = [linha['asin'] for linha in lote]
+        # Preço anterior junto: o histórico só recebe o que mudou
+        existentes = dict(db.session.execute(
+            select(tabela.c.asin, tabela.c.preco).where(tabela.c.asin.in_(asins))
+        ).all())
+        gravados = db.session.scalars(stmt, lote).all()
+        novos = {linha['asin']: linha['preco'] for linha in lote}
+        contagem['quedas'] += precos.registrar_mudancas(
+            precos.PRODUTO, [(asin, existentes.get(asin), novos[asin]) for asin in gravados]
+        )
+        # Inclusive os negativos: um ASIN recém-inserido deixa de ser "não encontrado"
+        for asin in gravados:
+            cache_produtos.remover(asin)
+        inseridos = sum(1 for asin in gravados if asin not in existentes)
+        contagem['inseridos'] += inseridos
+        contagem['atualizados'] += len(gravados) - inseridos
+        contagem['inalterados'] += len(lote) - len(gravados)
+    return contagem
+
+
+def importar_produtos(registros, tamanho_lote=TAMANHO_LOTE):
+    # registros: iterável de (linha, dados, erro), como em services.importacao. Um commit por lote
+    from schemas import ListaProdutos
+    from services.importacao import validar_lote
+
+    relatorio = {'recebidos': 0, 'inseridos': 0, 'atualizados': 0, 'inalterados': 0, 'quedas': [], 'erros': []}
+
+    def gravar(lote):
+        validos, erros = validar_lote(lote, ListaProdutos)
+        relatorio['erros'].extend(erros)
+        for chave, total in upsert_produtos([produto.model_dump() for _, produto in validos]).items():
+            relatorio[chave] += total
+        db.session.commit()
+
+    lote = []
+    for numero, dados, erro in registros:
+        relatorio['recebidos'] += 1
+        if erro:
+            relatorio['erros'].append({'linha': numero, 'erros': [{'campo': None, 'mensagem': erro}]})
+            continue
+        lote.append((numero, dados))
+        if len(lote) >= tamanho_lote:
+            gravar(lote)
+            lote = []
+    if lote:
+        gravar(lote)
+    return relatorio
@@ -0,0 +1,141 @@
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import Date, func, insert, select, type_coerce, update
+
+from extensions import db
+from models import Comentario, CurtidaEvento, Favorito, MarcaRollup, Oferta, RollupDiario
+from utils.upsert import insert_com_conflito
+
+LOTE = int(os.getenv("ROLLUP_LOTE", "50000"))
+METRICAS = ('ofertas', 'likes', 'favoritos', 'comentarios')
+# Linhas mais novas que isso ainda não entram: no Postgres um id menor pode ser commitado
+# depois de um maior (transações concorrentes) e a marca já teria passado dele
+ATRASO = timedelta(seconds=float(os.getenv("ROLLUP_ATRASO_SEGUNDOS", "30")))
+
+# fonte -> (tabela, coluna id, coluna de data, valor agregado, métrica do rollup).
+# Favoritos, comentários e curtidas pegam loja/categoria da oferta.
+FONTES = OrderedDict([
+    ('oferta', (Oferta, Oferta.id, Oferta.data_criacao, func.count(Oferta.id), 'ofertas')),
+    ('favoritos', (Favorito, Favorito.id, Favorito.data_favorito, func.count(Favorito.id), 'favoritos')),
+    ('comentario', (Comentario, Comentario.id, Comentario.data_criacao, func.count(Comentario.id), 'comentarios')),
+    ('curtida_evento', (CurtidaEvento, CurtidaEvento.id, CurtidaEvento.data, func.sum(CurtidaEvento.delta), 'likes')),
+])
+
+
+def registrar_curtidas(lote):
+    # lote: {oferta_id: delta}; uma linha por oferta a cada flush, na transação da escrita
+    agora = datetime.utcnow()
+    linhas = [{'oferta_id': oferta_id, 'delta': delta, 'data': agora} for oferta_id, delta in lote.items() if delta]
+    if linhas:
+        db.session.execute(insert(CurtidaEvento), linhas)
+
+
+def limite_seguro(coluna_id, coluna_data, acima_de=0):
+    # Maior id com data anterior a agora - ATRASO: toda transação que pegou um id abaixo
+    # dele já terminou (supondo transações mais curtas que o ATRASO). Varre os ids do
+    # topo para baixo e para na primeira linha antiga, então custa só as linhas recentes
+    corte = datetime.utcnow() - ATRASO
+    limite = db.session.scalar(
+        select(coluna_id).where(coluna_id > acima_de, coluna_data < corte).order_by(coluna_id.desc()).limit(1)
+    )
+    return limite if limite is not None else acima_de
+
+
+def _consulta(fonte):
+    tabela, coluna_id, coluna_data, valor, _ = FONTES[fonte]
+    dia = type_coerce(func.date(coluna_data), Date)
+    loja = func.coalesce(Oferta.loja, '')
+    categoria = func.coalesce(Oferta.categoria, '')
+    consulta = select(dia, loja, categoria, valor).where(coluna_data.isnot(None))
+    if tabela is not Oferta:
+        consulta = consulta.select_from(tabela).join(Oferta, Oferta.id == tabela.oferta_id)
+    return consulta.group_by(dia, loja, categoria), coluna_id
+
+
+def _somar(metrica, linhas):
+    linhas = [
+        {'dia': dia, 'loja': loja, 'categoria': categoria,
+         **{m: 0 for m in METRICAS}, metrica: total}
+        for dia, loja, categoria, total in linhas if total
+    ]
+    if not linhas:
+        return
+    tabela = RollupDiario.__table__
+    stmt = insert_com_conflito(tabela)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tabela.c.dia, tabela.c.loja, tabela.c.categoria],
+        set_={metrica: tabela.c[metrica] + stmt.excluded[metrica]}
+    )
+    db.session.execute(stmt, linhas)
+
+
+def executar(lote=LOTE):
+    # Agrega só as linhas com id acima da marca de cada fonte (e abaixo do limite_seguro),
+    # em lotes de ids.
+    # Rollup e marca avançam no mesmo commit; a marca só anda se ninguém a moveu antes
+    # (duas execuções simultâneas não contam a mesma linha duas vezes).
+    processadas = {}
+    for fonte in FONTES:
+        consulta, coluna_id = _consulta(fonte)
+        marca = db.session.get(MarcaRollup, fonte)
+        if marca is None:
+            db.session.add(MarcaRollup(fonte=fonte, ultimo_id=0))
+            db.session.commit()
+            marca = db.session.get(MarcaRollup, fonte)
+        inicio = marca.ultimo_id
+        maximo = limite_seguro(coluna_id, FONTES[fonte][2], inicio)
+
+        atual = inicio
+        while atual < maximo:
+            ate = min(atual + lote, maximo)
+            linhas = db.session.execute(consulta.where(coluna_id > atual, coluna_id <= ate)).all()
+            _somar(FONTES[fonte][4], linhas)
+            movida = db.session.execute(
+                update(MarcaRollup)
+                .where(MarcaRollup.fonte == fonte, MarcaRollup.ultimo_id == atual)
+                .values(ultimo_id=ate, atualizado_em=datetime.utcnow())
+            ).rowcount
+            if not movida:
+                db.session.rollback()
+                break
+            db.session.commit()
+            atual = ate
+        processadas[fonte] = atual - inicio
+    return processadas
+
+
+def serie(inicio, fim, agrupar='dia', por=None, loja=None, categoria=None):
+    # Lê só o rollup: um ano de dados são no máximo 365 dias x lojas x categorias
+    colunas = [RollupDiario.dia]
+    if por:
+        colunas.append(getattr(RollupDiario, por))
+    consulta = select(*colunas, *(func.sum(getattr(RollupDiario, m)) for m in METRICAS))\
+        .where(RollupDiario.dia >= inicio, RollupDiario.dia <= fim)
+    if loja is not None:
+        consulta = consulta.where(RollupDiario.loja == loja)
+    if categoria is not None:
+        consulta = consulta.where(RollupDiario.categoria == categoria)
+    consulta = consulta.group_by(*colunas).order_by(*colunas)
+
+    pontos = {}
+    for linha in db.session.execute(consulta):
+        dia = linha[0]
+        periodo = dia.isoformat() if agrupar == 'dia' else f"{dia.year}-{dia.month:02d}"
+        chave = (periodo, linha[1]) if por else (periodo,)
+        ponto = pontos.get(chave)
+        if ponto is None:
+            ponto = pontos[chave] = {'periodo': periodo, **({por: linha[1]} if por else {}), **{m: 0 for m in METRICAS}}
+        for metrica, valor in zip(METRICAS, linha[-len(METRICAS):]):
+            ponto[metrica] += valor or 0
+    return [pontos[chave] for chave in sorted(pontos)]
+
+
+def marcas():
+    return {
+        fonte: {'ultimo_id': ultimo_id, 'atualizado_em': atualizado_em}
+        for fonte, ultimo_id, atualizado_em in db.session.execute(
+            select(MarcaRollup.fonte, MarcaRollup.ultimo_id, MarcaRollup.atualizado_em)
+        )
+    }
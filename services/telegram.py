@@ -1,35 +1,154 @@
+import logging
 import requests
 import os
-from dotenv import load_dotenv
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from utils.limites import TokenBucket
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
+# O .env é carregado pelo create_app(), antes de este módulo ser importado
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
+# Lista de canais/grupos separados por vírgula; sem ela usa só TELEGRAM_CHAT_ID
+TELEGRAM_CHAT_IDS = [c.strip() for c in os.getenv("TELEGRAM_CHAT_IDS", TELEGRAM_CHAT_ID or "").split(",") if c.strip()]
+# Permite apontar para um stub local da Bot API (testes/homologação)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+TELEGRAM_TIMEOUT = float(os.getenv("TELEGRAM_TIMEOUT", "10"))
+
+# Limites da Bot API: ~30 msg/s no total, 1 msg/s por chat privado, 20 msg/min por grupo/canal
+LIMITE_GLOBAL = float(os.getenv("TELEGRAM_LIMITE_GLOBAL", "30"))
+LIMITE_CHAT = float(os.getenv("TELEGRAM_LIMITE_CHAT", "1"))
+LIMITE_GRUPO_MINUTO = float(os.getenv("TELEGRAM_LIMITE_GRUPO", "20"))
+MAX_CONEXOES = int(os.getenv("TELEGRAM_MAX_CONEXOES", "16"))
+# Baldes por chat mantidos em memória (LRU): o menos usado sai quando passa disso
+MAX_LIMITES_CHAT = int(os.getenv("TELEGRAM_MAX_LIMITES_CHAT", "10000"))
+
+
+class ErroTelegram(Exception):
+    def __init__(self, mensagem, retry_after=None):
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+
+
+class ClienteTelegram:
+
+    def __init__(self, token=TELEGRAM_TOKEN, api_url=TELEGRAM_API_URL, timeout=TELEGRAM_TIMEOUT,
+                 max_conexoes=MAX_CONEXOES):
+        self.base_url = f"{api_url}/bot{token}"
+        self.timeout = timeout
+        # Sessão com pool de conexões keep-alive reaproveitadas entre envios
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_conexoes)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_conexoes, thread_name_prefix="telegram")
+        self.limite_global = TokenBucket(LIMITE_GLOBAL)
+        self._limites_chat = OrderedDict()
+        self._lock = threading.Lock()
+
+    def limite_do_chat(self, chat_id):
+        with self._lock:
+            balde = self._limites_chat.get(chat_id)
+            if balde is not None:
+                self._limites_chat.move_to_end(chat_id)
+            else:
+                # Grupos e canais têm id negativo ou @username
+                if str(chat_id).startswith(("-", "@")):
+                    balde = TokenBucket(LIMITE_GRUPO_MINUTO / 60.0, capacidade=3)
+                else:
+                    balde = TokenBucket(LIMITE_CHAT, capacidade=1)
+                self._limites_chat[chat_id] = balde
+                if len(self._limites_chat) > MAX_LIMITES_CHAT:
+                    self._limites_chat.popitem(last=False)
+            return balde
+
+    def chamar(self, metodo, payload, tentativas_429=3, bloquear_chat=True):
+        # bloquear_chat=False: sem ficha do chat não espera; devolve ErroTelegram com o
+        # retry_after até a próxima ficha (a outbox reagenda em vez de segurar a mensagem)
+        chat_id = payload.get("chat_id")
+        limite_chat = self.limite_do_chat(chat_id) if chat_id is not None else None
+        while True:
+            if limite_chat and not limite_chat.adquirir(bloquear=bloquear_chat):
+                raise ErroTelegram(f"Limite de envio do chat {chat_id}", retry_after=max(limite_chat.espera(), 0.1))
+            self.limite_global.adquirir()
+            try:
+                response = self.session.post(f"{self.base_url}/{metodo}", data=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                raise ErroTelegram(f"Falha de rede: {e}") from e
+
+            if response.status_code == 200:
+                return response.json()
+
+            retry_after = None
+            if response.status_code == 429:
+                try:
+                    retry_after = response.json().get("parameters", {}).get("retry_after")
+                except ValueError:
+                    pass
+                retry_after = float(retry_after or 1)
+                # Todo envio para o mesmo chat respeita a pausa pedida pelo Telegram
+                if limite_chat:
+                    limite_chat.pausar(retry_after)
+                if tentativas_429 > 0:
+                    tentativas_429 -= 1
+                    continue
+            raise ErroTelegram(f"HTTP {response.status_code}: {response.text[:500]}", retry_after=retry_after)
+
+    def enviar_varios(self, envios, tentativas_429=3, bloquear_chat=True):
+        # envios: lista de (metodo, payload); devolve, na mesma ordem, o resultado ou a ErroTelegram
+        def enviar(envio):
+            metodo, payload = envio
+            try:
+                return self.chamar(metodo, payload, tentativas_429=tentativas_429, bloquear_chat=bloquear_chat)
+            except ErroTelegram as e:
+                return e
+        return list(self.executor.map(enviar, envios))
+
+    def transmitir(self, metodo, payload, chat_ids=None):
+        # Fan-out concorrente: a mesma mensagem para todos os canais/grupos configurados
+        chat_ids = chat_ids or TELEGRAM_CHAT_IDS
+        resultados = self.enviar_varios([(metodo, {**payload, "chat_id": chat_id}) for chat_id in chat_ids])
+        return dict(zip(chat_ids, resultados))
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def obter_cliente():
+    global _cliente
+    if _cliente is None:
+        with _cliente_lock:
+            if _cliente is None:
+                _cliente = ClienteTelegram()
+    return _cliente
+
+
+def chamar_api(metodo: str, payload: dict, tentativas_429=3):
+    return obter_cliente().chamar(metodo, payload, tentativas_429=tentativas_429)
 
 def enviar_mensagem(mensagem: str):
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
     payload = {
-        "chat_id": TELEGRAM_CHAT_ID,
         "text": mensagem,
         "parse_mode": "Markdown"
     }
-    response = requests.post(url, data=payload)
-    if response.status_code == 200:
-        print("✅ Mensagem enviada ao Telegram com sucesso!")
-    else:
-        print("❌ Erro ao enviar:", response.text)
+    for chat_id, resultado in obter_cliente().transmitir("sendMessage", payload).items():
+        if isinstance(resultado, ErroTelegram):
+            logger.warning("Erro ao enviar mensagem para %s: %s", chat_id, resultado)
+        else:
+            logger.info("Mensagem enviada ao Telegram (%s)", chat_id)
 
 def enviar_foto(mensagem: str, imagem: str):
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendPhoto"
     payload = {
-        "chat_id": TELEGRAM_CHAT_ID,
         "caption": mensagem,
         "photo": imagem,
         "parse_mode": "Markdown"
     }
-    response = requests.post(url, data=payload)
-    if response.status_code == 200:
-        print("✅ Foto enviada ao Telegram com sucesso!")
-    else:
-        print("❌ Erro ao enviar foto:", response.text)
+    for chat_id, resultado in obter_cliente().transmitir("sendPhoto", payload).items():
+        if isinstance(resultado, ErroTelegram):
+            logger.warning("Erro ao enviar foto para %s: %s", chat_id, resultado)
+        else:
+            logger.info("Foto enviada ao Telegram (%s)", chat_id)
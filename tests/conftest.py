@@ -0,0 +1,48 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+@pytest.fixture
+def app(tmp_path):
+    from app import create_app
+    from extensions import db
+
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'teste.db'}",
+        "JWT_SECRET_KEY": "chave-de-teste-com-tamanho-suficiente",
+    })
+    with app.app_context():
+        db.create_all()
+        # O cache das listagens é do processo e as versões recomeçam em cada banco novo
+        from services.cache import obter_cache
+        obter_cache().limpar()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+@contextmanager
+def contar_consultas(engine):
+    # Conta os comandos enviados ao banco (before_cursor_execute) dentro do bloco
+    comandos = []
+
+    def registrar(conexao, cursor, sql, parametros, contexto, executemany):
+        comandos.append(sql)
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        yield comandos
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
@@ -0,0 +1,52 @@
+from flask_jwt_extended import create_access_token
+
+from extensions import db
+from models import AlertaAssinatura, Oferta, Usuario
+from services import alertas
+
+
+def criar_usuario():
+    usuario = Usuario(email="alerta@exemplo.com", nome="Alerta", senha_hash="x")
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario.id
+
+
+def test_atualizar_aplica_so_a_diferenca(app):
+    usuario_id = criar_usuario()
+    fone = AlertaAssinatura(usuario_id=usuario_id, palavras="fone")
+    tv = AlertaAssinatura(usuario_id=usuario_id, categoria="eletronicos", preco_maximo=1000)
+    db.session.add_all([fone, tv])
+    db.session.commit()
+    indice = alertas.carregar()
+
+    db.session.delete(fone)
+    kindle = AlertaAssinatura(usuario_id=usuario_id, palavras="kindle")
+    db.session.add(kindle)
+    db.session.commit()
+    assert alertas.atualizar(indice) == 2
+
+    assert indice.ids() == {tv.id, kindle.id}
+    assert indice.encontrar("Fone JBL", "", "Moda", "Loja", 50) == []
+    assert [a.id for a in indice.encontrar("Kindle Paperwhite", "", "Livros", "Loja", 500)] == [kindle.id]
+    assert [a.id for a in indice.encontrar("Smart TV", "", "Eletrônicos", "Loja", 900)] == [tv.id]
+
+
+def test_verificar_alertas_pagina_os_resultados(app, cliente):
+    usuario_id = criar_usuario()
+    db.session.add(AlertaAssinatura(usuario_id=usuario_id, palavras="fone"))
+    db.session.add_all([
+        Oferta(titulo=f"Fone {n}" if n % 2 else f"Mouse {n}", preco=10, loja="Loja",
+               link_afiliado=f"https://exemplo.com/{n}")
+        for n in range(10)
+    ])
+    db.session.commit()
+    cabecalhos = {"Authorization": "Bearer " + create_access_token(identity=str(usuario_id))}
+
+    primeira = cliente.get("/usuarios/verificar-alertas?limite=3", headers=cabecalhos).get_json()
+    segunda = cliente.get(f"/usuarios/verificar-alertas?limite=3&antes_de={primeira['proximo']}",
+                          headers=cabecalhos).get_json()
+
+    assert [o['titulo'] for o in primeira['ofertas']] == ["Fone 9", "Fone 7", "Fone 5"]
+    assert [o['titulo'] for o in segunda['ofertas']] == ["Fone 3", "Fone 1"]
+    assert segunda['proximo'] is None
@@ -0,0 +1,53 @@
+import os
+
+from extensions import db
+from models import Oferta
+from services import curtidas, rollup
+
+
+def novo_buffer(app):
+    buffer = curtidas.BufferCurtidas()
+    buffer._app = app
+    buffer._pid = os.getpid()  # sem a thread de flush: o teste descarrega na mão
+    return buffer
+
+
+def test_lote_em_gravacao_continua_nas_leituras(app, monkeypatch):
+    oferta = Oferta(titulo="Fone", preco=10, loja="Loja", likes=5)
+    db.session.add(oferta)
+    db.session.commit()
+    buffer = novo_buffer(app)
+    buffer.registrar(oferta.id, 2)
+
+    durante = []
+    registrar_rollup = rollup.registrar_curtidas
+
+    def observar(lote):
+        # UPDATE já executado, commit ainda não: outros leitores veem likes=5 no banco
+        durante.append((buffer.pendente(oferta.id), buffer.aplicar([{'id': oferta.id, 'likes': 5}])[0]['likes']))
+        return registrar_rollup(lote)
+
+    monkeypatch.setattr(rollup, "registrar_curtidas", observar)
+    assert buffer.descarregar() == 1
+
+    assert durante == [(2, 7)]
+    assert buffer.pendente(oferta.id) == 0
+    db.session.expire_all()
+    assert db.session.get(Oferta, oferta.id).likes == 7
+
+
+def test_falha_na_gravacao_devolve_o_lote(app, monkeypatch):
+    oferta = Oferta(titulo="Fone", preco=10, loja="Loja", likes=5)
+    db.session.add(oferta)
+    db.session.commit()
+    buffer = novo_buffer(app)
+    buffer.registrar(oferta.id, 2)
+
+    def falhar(lote):
+        raise RuntimeError("banco fora")
+
+    monkeypatch.setattr(rollup, "registrar_curtidas", falhar)
+    assert buffer.descarregar() == 0
+
+    assert buffer.pendente(oferta.id) == 2
+    assert buffer.metricas()['curtidas_gravando'] == 0
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from flask_jwt_extended import create_access_token
+
+from conftest import contar_consultas
+from extensions import db
+from models import Oferta, Usuario
+from services import estatisticas
+
+
+def test_favoritar_nao_remonta_as_listas(app, cliente, monkeypatch):
+    monkeypatch.setattr(estatisticas, "INTERVALO_LISTAS", timedelta(0))
+    usuario = Usuario(email="stats@exemplo.com", nome="Stats", senha_hash="x")
+    ofertas = [Oferta(titulo=f"Oferta {n}", preco=10, loja="Loja", link_afiliado=f"https://e.com/{n}", likes=n)
+               for n in range(3)]
+    db.session.add_all([usuario, *ofertas])
+    db.session.commit()
+    estatisticas.recalcular()
+    cabecalhos = {"Authorization": "Bearer " + create_access_token(identity=str(usuario.id))}
+    menos_curtida = ofertas[0].id
+
+    with contar_consultas(db.engine) as comandos:
+        for _ in range(3):
+            cliente.post(f"/usuarios/favoritos/{menos_curtida}", headers=cabecalhos)
+            cliente.delete(f"/usuarios/favoritos/{menos_curtida}", headers=cabecalhos)
+        cliente.post(f"/usuarios/favoritos/{menos_curtida}", headers=cabecalhos)
+    # Nenhuma das escritas roda as consultas de top-N
+    assert not any("ORDER BY oferta.likes DESC" in sql for sql in comandos)
+
+    resumo = cliente.get("/usuarios/estatisticas", headers=cabecalhos).get_json()
+    assert resumo["total_favoritos"] == 1
+    assert [o["likes"] for o in resumo["ofertas_mais_curtidas"]] == [2, 1, 1]
+
+    # Sem escrita nova, a leitura não remonta nada
+    with contar_consultas(db.engine) as comandos:
+        cliente.get("/usuarios/estatisticas", headers=cabecalhos)
+    assert not any("ORDER BY oferta.likes DESC" in sql for sql in comandos)
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from conftest import contar_consultas
+from extensions import db
+from models import Favorito, Oferta, Usuario
+
+ROTAS = [
+    "/usuarios/favoritos?per_page=100",
+    "/usuarios/meus-favoritos?per_page=100",
+    "/usuarios/relatorio-favoritos?inicio=2000-01-01&fim=2100-01-01",
+    "/usuarios/exportar-favoritos",
+    "/usuarios/exportar-favoritos?formato=ndjson",
+    "/usuarios/grafico-categorias",
+]
+
+
+def criar_usuario_com_favoritos(email, quantidade):
+    usuario = Usuario(email=email, nome=email, senha_hash="x")
+    db.session.add(usuario)
+    db.session.flush()
+    agora = datetime.utcnow()
+    for n in range(quantidade):
+        oferta = Oferta(titulo=f"Oferta {email} {n}", descricao="d", preco=10 + n, loja="Loja",
+                        link_afiliado=f"https://exemplo.com/{email}/{n}", categoria=f"Cat {n % 4}")
+        db.session.add(oferta)
+        db.session.flush()
+        db.session.add(Favorito(usuario_id=usuario.id, oferta_id=oferta.id,
+                                data_favorito=agora - timedelta(minutes=n)))
+    db.session.commit()
+    return {"Authorization": "Bearer " + create_access_token(identity=str(usuario.id))}
+
+
+def consultas(cliente, rota, cabecalhos):
+    with contar_consultas(db.engine) as comandos:
+        resposta = cliente.get(rota, headers=cabecalhos)
+        resposta.get_data()  # exportação em streaming consulta enquanto o corpo é lido
+    assert resposta.status_code == 200, resposta.get_data(as_text=True)
+    return len(comandos), resposta
+
+
+@pytest.mark.parametrize("rota", ROTAS)
+def test_consultas_nao_crescem_com_os_favoritos(app, cliente, rota):
+    poucos = criar_usuario_com_favoritos("poucos@exemplo.com", 5)
+    muitos = criar_usuario_com_favoritos("muitos@exemplo.com", 50)
+
+    consultas(cliente, rota, poucos)  # aquece caches por processo (versões do catálogo)
+    consultas_poucos, _ = consultas(cliente, rota, poucos)
+    consultas_muitos, resposta = consultas(cliente, rota, muitos)
+
+    assert consultas_muitos == consultas_poucos
+    if rota.startswith("/usuarios/favoritos"):
+        assert resposta.get_json()["total_favoritos"] == 50
+
+
+def test_favoritar_e_desfavoritar_ajustam_likes_no_banco(app, cliente):
+    cabecalhos = criar_usuario_com_favoritos("curte@exemplo.com", 0)
+    oferta = Oferta(titulo="Oferta curtida", preco=10, loja="Loja", link_afiliado="https://exemplo.com/c",
+                    categoria="Cat", likes=0)
+    db.session.add(oferta)
+    db.session.commit()
+    oferta_id = oferta.id
+
+    assert cliente.post(f"/usuarios/favoritos/{oferta_id}", headers=cabecalhos).status_code == 201
+    # Curtidas gravadas por fora (ex.: flush do buffer) entre as duas escritas não se perdem
+    db.session.execute(db.update(Oferta).where(Oferta.id == oferta_id).values(likes=Oferta.likes + 3))
+    db.session.commit()
+    assert cliente.delete(f"/usuarios/favoritos/{oferta_id}", headers=cabecalhos).status_code == 200
+    assert db.session.scalar(db.select(Oferta.likes).where(Oferta.id == oferta_id)) == 3
+
+    # Nunca fica negativo
+    db.session.execute(db.update(Oferta).where(Oferta.id == oferta_id).values(likes=0))
+    db.session.commit()
+    cliente.post(f"/usuarios/favoritos/{oferta_id}", headers=cabecalhos)
+    db.session.execute(db.update(Oferta).where(Oferta.id == oferta_id).values(likes=0))
+    db.session.commit()
+    assert cliente.delete(f"/usuarios/favoritos/{oferta_id}", headers=cabecalhos).status_code == 200
+    assert db.session.scalar(db.select(Oferta.likes).where(Oferta.id == oferta_id)) == 0
@@ -0,0 +1,25 @@
+import gzip
+
+from extensions import db
+from models import Oferta
+from utils import http
+
+
+def test_corpo_comprimido_sai_do_cache_na_mesma_etag(app, cliente, monkeypatch):
+    db.session.add_all([
+        Oferta(titulo=f"Oferta {n}", descricao="x" * 50, preco=10, loja="Loja", link_afiliado=f"https://e.com/{n}")
+        for n in range(50)
+    ])
+    db.session.commit()
+    compressoes = []
+    original = gzip.compress
+    monkeypatch.setattr(http, "brotli", None)
+    monkeypatch.setattr(http.gzip, "compress", lambda dados, **kw: compressoes.append(1) or original(dados, **kw))
+
+    respostas = [cliente.get("/ofertas/todas", headers={"Accept-Encoding": "gzip"}) for _ in range(3)]
+
+    assert all(r.status_code == 200 and r.headers["Content-Encoding"] == "gzip" for r in respostas)
+    assert len({r.headers["ETag"] for r in respostas}) == 1
+    assert len({r.get_data() for r in respostas}) == 1
+    assert len(compressoes) == 1
+    assert b"Oferta 49" in gzip.decompress(respostas[0].get_data())
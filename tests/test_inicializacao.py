@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.tempo_importacao import importtime
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+# Orçamento do "import app" (acumulado no -X importtime); folgado para máquinas de CI lentas
+ORCAMENTO_IMPORTACAO_MS = float(os.getenv("ORCAMENTO_IMPORTACAO_MS", "1500"))
+TOP_IMPORTACAO = 10
+
+# Roda num interpretador novo: registra conexões de rede/SQLite, threads e leitura do
+# .env feitas só por importar o módulo
+_SONDA = r"""
+import json, socket, sqlite3, sys, threading
+import dotenv
+
+chamadas = []
+def registrar(nome, original):
+    def sonda(*args, **kwargs):
+        chamadas.append(nome)
+        return original(*args, **kwargs)
+    return sonda
+
+socket.socket.connect = registrar("socket.connect", socket.socket.connect)
+socket.create_connection = registrar("socket.create_connection", socket.create_connection)
+sqlite3.connect = registrar("sqlite3.connect", sqlite3.connect)
+threading.Thread.start = registrar("Thread.start", threading.Thread.start)
+dotenv.load_dotenv = registrar("load_dotenv", dotenv.load_dotenv)
+
+import {modulo}
+print(json.dumps({{
+    "chamadas": chamadas,
+    "modulos": sorted(m for m in sys.modules if m.split(".")[0] in ("routes", "services", "models", "extensions")),
+}}))
+"""
+
+
+def sondar(modulo):
+    saida = subprocess.run([sys.executable, "-c", _SONDA.format(modulo=modulo)], cwd=RAIZ,
+                           capture_output=True, text=True, check=True).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def test_importar_app_nao_faz_trabalho():
+    resultado = sondar("app")
+
+    assert resultado["chamadas"] == []
+    # Rotas, serviços e modelos só são importados pelo create_app()
+    assert resultado["modulos"] == []
+
+
+def test_importar_cliente_telegram_nao_carrega_o_env():
+    assert sondar("services.telegram")["chamadas"] == []
+
+
+def arvore_do_app(modulos):
+    # No -X importtime os filhos vêm antes do pai: a árvore do "app" são as linhas entre o
+    # módulo de nível 0 anterior e ele
+    fim = next(i for i, (nome, _, _, nivel) in enumerate(modulos) if nome == "app" and nivel == 0)
+    inicio = fim
+    while inicio > 0 and modulos[inicio - 1][3] > 0:
+        inicio -= 1
+    return modulos[inicio:fim], modulos[fim][2]
+
+
+def test_tempo_de_importacao_do_app():
+    # A primeira rodada pode incluir a compilação dos .pyc; vale a mais rápida
+    filhos, acumulado = min((arvore_do_app(importtime("import app")) for _ in range(2)), key=lambda a: a[1])
+    total_ms = acumulado / 1000
+    mais_lentos = sorted((m for m in filhos if m[3] == 1), key=lambda m: -m[2])[:TOP_IMPORTACAO]
+    relatorio = "\n".join(f"{acumulado / 1000:8.1f} ms  {nome}" for nome, _, acumulado, _ in mais_lentos)
+    print(f"\nimport app: {total_ms:.1f} ms\n{relatorio}")
+
+    assert total_ms <= ORCAMENTO_IMPORTACAO_MS, (
+        f"import app levou {total_ms:.1f} ms (orçamento {ORCAMENTO_IMPORTACAO_MS:.0f} ms):\n{relatorio}"
+    )
@@ -0,0 +1,45 @@
+import multiprocessing
+import time
+
+import pytest
+
+from utils.limites import TokenBucketSQLite
+
+
+def _consumir(caminho, quantidade):
+    balde = TokenBucketSQLite(caminho, "teste", 50, capacidade=1)
+    for _ in range(quantidade):
+        balde.adquirir()
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="precisa de fork")
+def test_cota_dividida_entre_processos(tmp_path):
+    caminho = str(tmp_path / "limites.sqlite3")
+    TokenBucketSQLite(caminho, "teste", 50, capacidade=1)
+    contexto = multiprocessing.get_context("fork")
+    processos = [contexto.Process(target=_consumir, args=(caminho, 10)) for _ in range(4)]
+
+    inicio = time.monotonic()
+    for processo in processos:
+        processo.start()
+    for processo in processos:
+        processo.join(30)
+    decorrido = time.monotonic() - inicio
+
+    assert all(p.exitcode == 0 for p in processos)
+    # 40 fichas a 50/s somando os 4 processos: ~0,8s (cada um com o seu balde levaria ~0,2s)
+    assert decorrido >= 0.7
+
+
+def test_pausa_vale_para_outra_instancia(tmp_path):
+    caminho = str(tmp_path / "limites.sqlite3")
+    primeiro = TokenBucketSQLite(caminho, "teste", 100, capacidade=1)
+    segundo = TokenBucketSQLite(caminho, "teste", 100, capacidade=1)
+
+    primeiro.pausar(0.3)
+
+    assert segundo.adquirir(bloquear=False) is False
+    assert 0.2 < segundo.espera() <= 0.3
+    inicio = time.monotonic()
+    segundo.adquirir()
+    assert time.monotonic() - inicio >= 0.2
@@ -0,0 +1,31 @@
+from extensions import db
+from models import Notificacao, Oferta, TelegramOutbox, Usuario
+from services import notificacoes
+
+
+def test_entregas_simultaneas_nao_duplicam(app, monkeypatch):
+    usuario = Usuario(email="notifica@exemplo.com", nome="Notifica", senha_hash="x", telegram_chat_id="42")
+    ofertas = [Oferta(titulo=f"Oferta {n}", preco=10, loja="Loja", link_afiliado=f"https://exemplo.com/{n}")
+               for n in range(3)]
+    db.session.add_all([usuario, *ofertas])
+    db.session.commit()
+    db.session.add_all([Notificacao(usuario_id=usuario.id, oferta_id=o.id) for o in ofertas])
+    db.session.commit()
+
+    # O segundo despachante roda no meio do primeiro: depois da leitura, antes da escrita
+    enfileirar = notificacoes.enfileirar_varios
+    concorrente = []
+
+    def enfileirar_durante_outra_entrega(mensagens):
+        if not concorrente:
+            concorrente.append(None)
+            concorrente[0] = notificacoes.entregar()
+        return enfileirar(mensagens)
+
+    monkeypatch.setattr(notificacoes, "enfileirar_varios", enfileirar_durante_outra_entrega)
+
+    assert notificacoes.entregar() == 3
+    assert concorrente == [0]
+    assert TelegramOutbox.query.count() == 3
+    assert {n.status for n in Notificacao.query} == {"enviada"}
+    assert notificacoes.entregar() == 0
@@ -0,0 +1,25 @@
+from flask_jwt_extended import create_access_token
+
+from extensions import db
+from models import Comentario, Favorito, Oferta, Usuario
+
+
+def test_deletar_oferta_remove_os_comentarios(app, cliente):
+    usuario = Usuario(email="comenta@exemplo.com", nome="Comenta", senha_hash="x")
+    oferta = Oferta(titulo="Fone", preco=10, loja="Loja", categoria="Eletrônicos")
+    db.session.add_all([usuario, oferta])
+    db.session.commit()
+    db.session.add_all([
+        Comentario(texto="Bom preço", autor_id=usuario.id, oferta_id=oferta.id),
+        Favorito(usuario_id=usuario.id, oferta_id=oferta.id),
+    ])
+    db.session.commit()
+    cabecalhos = {"Authorization": "Bearer " + create_access_token(identity=str(usuario.id),
+                                                                   additional_claims={"admin": True})}
+
+    resposta = cliente.delete(f"/ofertas/deletar/{oferta.id}", headers=cabecalhos)
+
+    assert resposta.status_code == 200
+    assert db.session.scalar(db.select(db.func.count(Comentario.id))) == 0
+    assert db.session.scalar(db.select(db.func.count(Favorito.id))) == 0
+    assert db.session.scalar(db.select(db.func.count(Oferta.id))) == 0
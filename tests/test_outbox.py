@@ -0,0 +1,57 @@
+import time
+from datetime import datetime
+
+from requests.models import Response
+
+from extensions import db
+from models import TelegramOutbox
+from services import outbox, telegram
+
+
+def cliente_sem_rede(monkeypatch):
+    # Cliente real com o POST respondido localmente: só os limites são exercitados
+    cliente = telegram.ClienteTelegram(token="teste", api_url="http://telegram.invalido")
+    enviados = []
+
+    def post(url, data=None, timeout=None):
+        enviados.append(data["chat_id"])
+        resposta = Response()
+        resposta.status_code = 200
+        resposta._content = b'{"ok": true}'
+        return resposta
+
+    monkeypatch.setattr(cliente.session, "post", post)
+    monkeypatch.setattr(telegram, "obter_cliente", lambda: cliente)
+    return cliente, enviados
+
+
+def test_limite_do_grupo_reagenda_sem_segurar_a_posse(app, monkeypatch):
+    _, enviados = cliente_sem_rede(monkeypatch)
+    for n in range(10):
+        outbox.enfileirar("sendMessage", {"text": f"msg {n}"}, chat_id="-100123")
+    db.session.commit()
+
+    inicio = time.monotonic()
+    enviadas, falhas = outbox.despachar_pendentes()
+    assert time.monotonic() - inicio < 5  # não espera as fichas do grupo (20/min)
+
+    assert enviadas == 3 and falhas == 7  # capacidade do balde de grupo
+    assert len(enviados) == 3
+    adiadas = TelegramOutbox.query.filter_by(status="pendente").order_by(TelegramOutbox.proxima_tentativa).all()
+    assert len(adiadas) == 7
+    assert all(m.tentativas == 0 for m in adiadas)
+    assert all(m.proxima_tentativa > datetime.utcnow() for m in adiadas)
+    # Espaçadas na taxa do grupo: a última volta ~18s (6 x 3s) depois da primeira
+    intervalo = (adiadas[-1].proxima_tentativa - adiadas[0].proxima_tentativa).total_seconds()
+    assert 17 < intervalo < 19
+
+
+def test_baldes_por_chat_sao_limitados(monkeypatch):
+    monkeypatch.setattr(telegram, "MAX_LIMITES_CHAT", 3)
+    cliente = telegram.ClienteTelegram(token="teste", api_url="http://telegram.invalido")
+    primeiro = cliente.limite_do_chat("1")
+    for chat_id in ("2", "3", "1", "4"):
+        cliente.limite_do_chat(chat_id)
+
+    assert list(cliente._limites_chat) == ["3", "1", "4"]  # o "2" era o menos usado
+    assert cliente.limite_do_chat("1") is primeiro
@@ -0,0 +1,44 @@
+import os
+from datetime import datetime
+
+from flask_migrate import upgrade
+from sqlalchemy import DateTime, column, insert, table
+
+from extensions import db
+
+MIGRACOES = os.path.join(os.path.dirname(__file__), "..", "migrations")
+
+
+def test_listagem_percorre_ofertas_que_estavam_sem_data(tmp_path):
+    from app import create_app
+
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'migrado.db'}"})
+    with app.app_context():
+        # Banco antigo, em que data_criacao ainda aceitava NULL
+        upgrade(directory=MIGRACOES, revision="b3d8f5a1c7e2")
+        oferta = table("oferta", column("id"), column("titulo"), column("preco"), column("data_criacao", DateTime()))
+        db.session.execute(insert(oferta), [
+            {"id": 1, "titulo": "a", "preco": 1, "data_criacao": datetime(2026, 1, 1)},
+            {"id": 2, "titulo": "b", "preco": 1, "data_criacao": None},
+            {"id": 3, "titulo": "c", "preco": 1, "data_criacao": datetime(2026, 1, 3)},
+            {"id": 4, "titulo": "d", "preco": 1, "data_criacao": None},
+        ])
+        db.session.commit()
+        upgrade(directory=MIGRACOES)
+
+        from services.cache import obter_cache
+        obter_cache().limpar()
+        cliente = app.test_client()
+        vistos, cursor = [], ""
+        for _ in range(10):  # sem laço infinito se o cursor não avançar
+            pagina = cliente.get(f"/ofertas/?limit=2&cursor={cursor}")
+            assert pagina.status_code == 200
+            corpo = pagina.get_json()
+            vistos.extend(o["id"] for o in corpo["ofertas"])
+            cursor = corpo["next_cursor"]
+            if not cursor:
+                break
+        db.session.remove()
+        db.engine.dispose()
+
+    assert vistos == [3, 4, 2, 1]
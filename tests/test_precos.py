@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+from conftest import contar_consultas
+from extensions import db
+from models import HistoricoPreco
+from services import precos
+
+
+def gravar(referencia, *precos_por_dias):
+    agora = datetime.utcnow()
+    for dias, preco in precos_por_dias:
+        db.session.add(HistoricoPreco(alvo=precos.PRODUTO, referencia=referencia, preco=preco,
+                                      data=agora - timedelta(days=dias)))
+    db.session.commit()
+
+
+def test_minimos_por_janela(app):
+    # 120 dias atrás valia 50 (é o preço no início das duas janelas), depois 80 e 70
+    gravar('A', (120, 50.0), (60, 80.0), (10, 70.0))
+    gravar('B', (5, 30.0))
+
+    menores = precos.minimos_varios(precos.PRODUTO, ['A', 'B', 'C'])
+
+    assert menores['A'] == {30: 70.0, 90: 50.0}
+    assert menores['B'] == {30: 30.0, 90: 30.0}
+    assert 'C' not in menores
+    assert precos.minimos(precos.PRODUTO, 'C') == {30: None, 90: None}
+
+
+def test_registrar_mudancas_faz_uma_consulta_por_lote(app):
+    for n in range(20):
+        gravar(f'R{n}', (40, 100.0 + n), (5, 90.0 + n))
+
+    mudancas = [(f'R{n}', 90.0 + n, 85.0 + n) for n in range(20)] + [('NOVA', None, 10.0)]
+    with contar_consultas(db.engine) as comandos:
+        quedas = precos.registrar_mudancas(precos.PRODUTO, mudancas)
+
+    selects = [sql for sql in comandos if sql.lstrip().upper().startswith('SELECT')]
+    assert len(selects) == 1
+    assert len(quedas) == 20
+    assert all(q['queda_real'] for q in quedas)
+    assert quedas[0]['minimo_30d'] == 90.0 and quedas[0]['minimo_90d'] == 90.0
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+from models import HistoricoPreco, Produto
+from services import amazon, precos
+from utils.limites import TokenBucket
+
+
+def test_criar_produto_normaliza_o_asin(app, cliente):
+    resposta = cliente.post("/produto/", json={"asin": " b0abc12345 ", "nome": "Kindle", "preco": 399.0})
+
+    assert resposta.status_code == 201
+    assert resposta.get_json()["asin"] == "B0ABC12345"
+    assert db.session.scalar(db.select(Produto.asin)) == "B0ABC12345"
+    assert db.session.scalar(db.select(HistoricoPreco.referencia).where(HistoricoPreco.alvo == precos.PRODUTO)) \
+        == "B0ABC12345"
+    # A mesma chave em outra grafia é duplicada
+    assert cliente.post("/produto/", json={"asin": "B0ABC12345", "nome": "Kindle"}).status_code == 409
+
+
+def test_criar_produto_rejeita_asin_invalido(app, cliente):
+    resposta = cliente.post("/produto/", json={"asin": "abc", "nome": "Kindle"})
+
+    assert resposta.status_code == 400
+    assert db.session.scalar(db.select(db.func.count(Produto.id))) == 0
+
+
+class ClienteComFalha:
+    def get_items(self, items, **kwargs):
+        raise amazon.AmazonError("Request failed: Service Unavailable")
+
+
+def test_falha_da_amazon_vira_502(app, cliente, monkeypatch):
+    monkeypatch.setattr(amazon, "_cliente", ClienteComFalha())
+    monkeypatch.setattr(amazon, "_limite", TokenBucket(1000, capacidade=10))
+
+    resposta = cliente.get("/produto/?asin=B0ABC12345")
+
+    assert resposta.status_code == 502
+    assert resposta.get_json()["erro"] == "Falha ao consultar a Amazon"
+
+
+def test_erro_local_nao_vira_falha_da_amazon(app, cliente, monkeypatch):
+    def falhar(asin, cliente):
+        raise OperationalError("SELECT produtos.asin FROM produtos", {}, Exception("database is locked"))
+
+    monkeypatch.setattr(amazon, "_resolver", falhar)
+
+    # Em TESTING o Flask repassa a exceção em vez do 500: não foi convertida em 502
+    with pytest.raises(OperationalError):
+        cliente.get("/produto/?asin=B0ABC12345")
@@ -0,0 +1,21 @@
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import MarcaRollup, Oferta
+from services import rollup
+
+
+def test_marca_nao_passa_de_linhas_recentes(app):
+    agora = datetime.utcnow()
+    antigas = [Oferta(titulo=f"Antiga {n}", preco=10, loja="Loja", link_afiliado=f"https://exemplo.com/a{n}",
+                      data_criacao=agora - timedelta(minutes=5)) for n in range(3)]
+    recente = Oferta(titulo="Recente", preco=10, loja="Loja", link_afiliado="https://exemplo.com/r",
+                     data_criacao=agora)
+    db.session.add_all(antigas + [recente])
+    db.session.commit()
+
+    assert rollup.limite_seguro(Oferta.id, Oferta.data_criacao) == antigas[-1].id
+    processadas = rollup.executar()
+
+    assert processadas['oferta'] == 3
+    assert db.session.get(MarcaRollup, 'oferta').ultimo_id == antigas[-1].id
@@ -1,3 +0,0 @@
-def verificar_alerta_categoria(usuario_id):
-    return "Alertas verificados"
-
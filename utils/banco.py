@@ -0,0 +1,66 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# SQLite: cada conexão recebe os PRAGMAs (WAL deixa leitores e o escritor em paralelo;
+# busy_timeout espera o lock em vez de falhar com "database is locked")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # NORMAL é seguro com WAL
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))
+
+# Postgres: pool por worker do gunicorn (workers x (pool + overflow) <= max_connections)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+DB_LOCK_TIMEOUT_MS = int(os.getenv("DB_LOCK_TIMEOUT_MS", "5000"))
+
+
+def pragmas_sqlite():
+    return [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}",  # negativo = KiB
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def _aplicar_pragmas(conexao_dbapi, _registro):
+    cursor = conexao_dbapi.cursor()
+    try:
+        for pragma in pragmas_sqlite():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def opcoes_engine(uri):
+    # Valor de SQLALCHEMY_ENGINE_OPTIONS conforme o banco da URI
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite":
+        # O timeout do driver cobre o intervalo até o busy_timeout ser aplicado
+        return {"connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    opcoes = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+    if url.get_backend_name() == "postgresql":
+        opcoes["connect_args"] = {
+            "options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS} -c lock_timeout={DB_LOCK_TIMEOUT_MS}"
+        }
+    return opcoes
+
+
+def configurar_engine(engine):
+    # Registra os PRAGMAs antes da primeira conexão do pool
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _aplicar_pragmas)
+    return engine
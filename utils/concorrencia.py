@@ -0,0 +1,42 @@
+import threading
+
+
+class _Chamada:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class VooUnico:
+    # Single-flight: chamadas concorrentes com a mesma chave esperam a execução que
+    # já está em andamento e recebem o mesmo resultado (ou a mesma exceção)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_andamento = {}
+
+    def executar(self, chave, funcao):
+        # Devolve (resultado, compartilhado); compartilhado=True se só esperou outra chamada
+        with self._lock:
+            chamada = self._em_andamento.get(chave)
+            lider = chamada is None
+            if lider:
+                chamada = self._em_andamento[chave] = _Chamada()
+
+        if not lider:
+            chamada.evento.wait()
+            if chamada.erro is not None:
+                raise chamada.erro
+            return chamada.resultado, True
+
+        try:
+            chamada.resultado = funcao()
+        except BaseException as e:
+            chamada.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+            chamada.evento.set()
+        return chamada.resultado, False
@@ -0,0 +1,96 @@
+import csv
+import json
+from io import StringIO
+from flask import Response, request, stream_with_context
+from extensions import db
+
+LOTE_PADRAO = 1000
+
+FORMATOS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Coluna:
+    # chave: nome no NDJSON; rotulo: cabeçalho do CSV; formatar_csv: valor -> texto do CSV
+    def __init__(self, chave, rotulo, formatar_csv=None):
+        self.chave = chave
+        self.rotulo = rotulo
+        self.formatar_csv = formatar_csv
+
+
+def formatar_data(valor):
+    return valor.strftime('%d/%m/%Y %H:%M:%S') if valor else ''
+
+
+def formatar_preco(valor):
+    return f"R$ {valor:.2f}" if valor is not None else ''
+
+
+def escolher_formato():
+    # ?formato=csv|ndjson tem prioridade; depois o cabeçalho Accept; CSV é o padrão
+    formato = request.args.get('formato')
+    if formato in FORMATOS:
+        return formato
+    melhor = request.accept_mimetypes.best_match(list(FORMATOS.values()), default=FORMATOS['csv'])
+    return 'ndjson' if melhor == FORMATOS['ndjson'] else 'csv'
+
+
+def _json_padrao(valor):
+    return valor.isoformat() if hasattr(valor, 'isoformat') else str(valor)
+
+
+def gerar_csv(colunas, linhas, lote=LOTE_PADRAO):
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([c.rotulo for c in colunas])
+    pendentes = 0
+    for linha in linhas:
+        writer.writerow([
+            c.formatar_csv(valor) if c.formatar_csv else valor
+            for c, valor in zip(colunas, linha)
+        ])
+        pendentes += 1
+        if pendentes >= lote:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pendentes = 0
+    yield buffer.getvalue()
+
+
+def gerar_ndjson(colunas, linhas, lote=LOTE_PADRAO):
+    chaves = [c.chave for c in colunas]
+    partes = []
+    for linha in linhas:
+        partes.append(json.dumps(dict(zip(chaves, linha)), ensure_ascii=False, default=_json_padrao))
+        if len(partes) >= lote:
+            yield '\n'.join(partes) + '\n'
+            partes = []
+    if partes:
+        yield '\n'.join(partes) + '\n'
+
+
+def exportar(consulta, colunas, nome_arquivo, lote=LOTE_PADRAO):
+    # Lê em lotes do cursor do banco (yield_per) e envia cada lote assim que fica pronto:
+    # memória constante, primeiro byte imediato
+    formato = escolher_formato()
+
+    def linhas():
+        resultado = db.session.execute(consulta.execution_options(yield_per=lote))
+        try:
+            for linha in resultado:
+                yield tuple(linha)
+        finally:
+            resultado.close()
+
+    gerador = gerar_csv if formato == 'csv' else gerar_ndjson
+    return Response(
+        stream_with_context(gerador(colunas, linhas(), lote)),
+        mimetype=FORMATOS[formato],
+        headers={
+            "Content-Disposition": f"attachment;filename={nome_arquivo}.{formato}",
+            "Vary": "Accept",
+        }
+    )
@@ -0,0 +1,94 @@
+import gzip
+import hashlib
+from functools import wraps
+from flask import request, make_response
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele fica só o gzip
+    brotli = None
+
+TAMANHO_MINIMO_COMPRESSAO = 1024
+TIPOS_COMPRIMIVEIS = {'application/json', 'text/html', 'text/csv', 'text/plain', 'application/x-ndjson'}
+SUFIXOS_CODIFICACAO = ('', '-gzip', '-br')
+
+
+def gerar_etag(*partes):
+    return hashlib.sha1("|".join(str(p) for p in partes).encode()).hexdigest()
+
+
+def condicional(validador):
+    # validador(*args, **kwargs) -> (etag, ultima_modificacao | None), calculado sem
+    # serializar nada; se o cliente já tem essa versão, responde 304 sem chamar a view
+    def decorador(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, modificado = validador(*args, **kwargs)
+            if modificado is not None:
+                modificado = modificado.replace(microsecond=0)
+
+            if request.if_none_match:
+                # A mesma ETag pode ter voltado com o sufixo da codificação usada
+                nao_modificado = any(request.if_none_match.contains(etag + s) for s in SUFIXOS_CODIFICACAO)
+            else:
+                nao_modificado = bool(modificado and request.if_modified_since
+                                      and modificado <= request.if_modified_since.replace(tzinfo=None))
+
+            if nao_modificado:
+                resposta = make_response('', 304)
+            else:
+                resposta = make_response(view(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+
+            resposta.set_etag(etag)
+            if modificado is not None:
+                resposta.last_modified = modificado
+            # Sempre revalida, mas um 304 custa praticamente nada
+            resposta.headers['Cache-Control'] = 'no-cache'
+            return resposta
+        return wrapper
+    return decorador
+
+
+def comprimir_resposta(resposta):
+    # after_request: gzip/brotli para corpos grandes de texto/JSON
+    if (resposta.status_code != 200 or resposta.direct_passthrough or resposta.is_streamed
+            or 'Content-Encoding' in resposta.headers
+            or resposta.mimetype not in TIPOS_COMPRIMIVEIS):
+        return resposta
+
+    resposta.vary.add('Accept-Encoding')
+    corpo = resposta.get_data()
+    if len(corpo) < TAMANHO_MINIMO_COMPRESSAO:
+        return resposta
+
+    aceitas = request.accept_encodings
+    if brotli is not None and aceitas['br']:
+        codificacao, comprimir = 'br', lambda dados: brotli.compress(dados, quality=5)
+    elif aceitas['gzip']:
+        codificacao, comprimir = 'gzip', lambda dados: gzip.compress(dados, compresslevel=6)
+    else:
+        return resposta
+
+    etag, fraca = resposta.get_etag()
+    if etag and not fraca:
+        # ETag forte = mesmo corpo: o comprimido vai para o cache das listagens e os
+        # próximos pedidos dessa versão (ex.: /ofertas/todas, /ofertas/painel) não comprimem de novo
+        from services.cache import obter_cache
+        cache = obter_cache()
+        chave = f"comprimido:{etag}:{codificacao}"
+        comprimido = cache.obter(chave)
+        if comprimido is None:
+            comprimido = comprimir(corpo)
+            cache.guardar(chave, comprimido)
+        corpo = comprimido
+    else:
+        corpo = comprimir(corpo)
+
+    resposta.set_data(corpo)
+    resposta.headers['Content-Encoding'] = codificacao
+    # ETag forte é por representação: a versão comprimida ganha sufixo próprio
+    if etag and not fraca:
+        resposta.set_etag(f"{etag}-{codificacao}")
+    return resposta
@@ -0,0 +1,81 @@
+import logging
+import os
+import re
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SQL_LENTA_MS = float(os.getenv("SQL_LENTA_MS", "200"))
+# Mesma forma de SQL repetida mais que isso num request = provável N+1
+SQL_REPETICOES_N1 = int(os.getenv("SQL_REPETICOES_N1", "10"))
+SQL_CABECALHOS = os.getenv("SQL_CABECALHOS") == "1"  # X-DB-* também fora do modo debug
+
+# Listas de parâmetros de tamanho variável (IN expandido, VALUES em lote) viram uma só forma
+_LISTA_PARAMETROS = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|%s|:\w+)\s*\)")
+
+
+def forma(sql):
+    return _LISTA_PARAMETROS.sub("(?)", " ".join(sql.split()))
+
+
+def _rota():
+    if not has_request_context():
+        return "-"
+    return f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+
+
+def _antes(conexao, cursor, sql, parametros, contexto, executemany):
+    conexao.info.setdefault("inicio_sql", []).append(time.perf_counter())
+
+
+def _depois(conexao, cursor, sql, parametros, contexto, executemany):
+    duracao = time.perf_counter() - conexao.info["inicio_sql"].pop()
+    if duracao * 1000 >= SQL_LENTA_MS:
+        logger.warning("SQL lenta (%.1f ms) em %s: %s", duracao * 1000, _rota(), " ".join(sql.split())[:1000])
+
+    estado = g.get("_sql") if has_request_context() else None
+    if estado is not None:
+        estado["consultas"] += 1
+        estado["tempo"] += duracao
+        estado["formas"][forma(sql)] += 1
+
+
+def _erro(contexto):
+    # Comando que falhou não chega ao after_cursor_execute: descarta o início dele
+    inicios = contexto.connection.info.get("inicio_sql") if contexto.connection is not None else None
+    if inicios:
+        inicios.pop()
+
+
+def _iniciar_request():
+    g._sql = {"consultas": 0, "tempo": 0.0, "formas": Counter()}
+
+
+def _finalizar_request(resposta):
+    # Conta o que rodou até aqui; respostas em streaming consultam depois dos cabeçalhos
+    estado = g.pop("_sql", None)
+    if estado is None:
+        return resposta
+    for sql, vezes in estado["formas"].most_common():
+        if vezes <= SQL_REPETICOES_N1:
+            break
+        logger.warning("Possível N+1 em %s: %d execuções de %s", _rota(), vezes, sql[:500])
+    if SQL_CABECALHOS or current_app.debug:
+        resposta.headers["X-DB-Queries"] = str(estado["consultas"])
+        resposta.headers["X-DB-Time"] = f"{estado['tempo'] * 1000:.2f}"
+    return resposta
+
+
+def instalar_instrumentacao(app, engine):
+    # Conta consultas e tempo de SQL por request via eventos do engine: cabeçalhos
+    # X-DB-Queries/X-DB-Time (debug ou SQL_CABECALHOS=1), log de SQL lenta com a rota
+    # e aviso de N+1 quando a mesma forma de SQL se repete demais
+    event.listen(engine, "before_cursor_execute", _antes)
+    event.listen(engine, "after_cursor_execute", _depois)
+    event.listen(engine, "handle_error", _erro)
+    app.before_request(_iniciar_request)
+    app.after_request(_finalizar_request)
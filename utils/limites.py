@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class TokenBucket:
+    # Balde de fichas thread-safe: `taxa` fichas por segundo, até `capacidade` acumuladas
+
+    def __init__(self, taxa, capacidade=None):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade if capacidade is not None else max(self.taxa, 1.0))
+        self._fichas = self.capacidade
+        self._atualizado = time.monotonic()
+        self._bloqueado_ate = 0.0
+        self._lock = threading.Lock()
+
+    def _tentar(self, agora):
+        if agora < self._bloqueado_ate:
+            return self._bloqueado_ate - agora
+        self._fichas = min(self.capacidade, self._fichas + (agora - self._atualizado) * self.taxa)
+        self._atualizado = agora
+        if self._fichas >= 1:
+            self._fichas -= 1
+            return 0.0
+        return (1 - self._fichas) / self.taxa
+
+    def _reservar(self):
+        # Tenta pegar uma ficha; devolve 0 ou os segundos até a próxima
+        with self._lock:
+            return self._tentar(time.monotonic())
+
+    def adquirir(self, bloquear=True):
+        while True:
+            espera = self._reservar()
+            if espera == 0:
+                return True
+            if not bloquear:
+                return False
+            time.sleep(espera)
+
+    def espera(self):
+        # Segundos até haver uma ficha, sem consumir nada
+        with self._lock:
+            agora = time.monotonic()
+            if agora < self._bloqueado_ate:
+                return self._bloqueado_ate - agora
+            fichas = min(self.capacidade, self._fichas + (agora - self._atualizado) * self.taxa)
+            return 0.0 if fichas >= 1 else (1 - fichas) / self.taxa
+
+    def pausar(self, segundos):
+        # Usado quando o servidor pede para esperar (ex.: HTTP 429 com retry_after)
+        with self._lock:
+            agora = time.monotonic()
+            self._bloqueado_ate = max(self._bloqueado_ate, agora + segundos)
+            # Ao fim da pausa há exatamente uma ficha disponível
+            self._fichas = min(1.0, self.capacidade)
+            self._atualizado = self._bloqueado_ate
+
+
+class TokenBucketSQLite(TokenBucket):
+    # Mesmo balde com o estado numa linha de um arquivo SQLite: todos os processos da
+    # máquina (workers do gunicorn, CLI, worker) dividem a mesma cota. Usa o relógio de
+    # parede (time.time), comum a todos, e BEGIN IMMEDIATE para a leitura+escrita atômica
+
+    def __init__(self, caminho, nome, taxa, capacidade=None):
+        super().__init__(taxa, capacidade)
+        self.caminho = caminho
+        self.nome = nome
+        self._local = threading.local()
+        self._conexao().execute(
+            "CREATE TABLE IF NOT EXISTS balde (nome TEXT PRIMARY KEY, fichas REAL NOT NULL, "
+            "atualizado REAL NOT NULL, bloqueado_ate REAL NOT NULL)"
+        )
+
+    def _conexao(self):
+        # Uma conexão por thread e por processo (não atravessa o fork do gunicorn)
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            # isolation_level=None: as transações são abertas explicitamente
+            conn = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _atualizar(self, alterar):
+        # alterar(fichas, atualizado, bloqueado_ate, agora) -> (novo estado, retorno)
+        conn = self._conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            agora = time.time()
+            linha = conn.execute(
+                "SELECT fichas, atualizado, bloqueado_ate FROM balde WHERE nome = ?", (self.nome,)
+            ).fetchone()
+            estado, retorno = alterar(*(linha or (self.capacidade, agora, 0.0)), agora)
+            conn.execute("INSERT OR REPLACE INTO balde (nome, fichas, atualizado, bloqueado_ate) VALUES (?, ?, ?, ?)",
+                         (self.nome, *estado))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return retorno
+
+    def _reservar(self):
+        def alterar(fichas, atualizado, bloqueado_ate, agora):
+            if agora < bloqueado_ate:
+                return (fichas, atualizado, bloqueado_ate), bloqueado_ate - agora
+            fichas = min(self.capacidade, fichas + max(agora - atualizado, 0.0) * self.taxa)
+            if fichas >= 1:
+                return (fichas - 1, agora, bloqueado_ate), 0.0
+            return (fichas, agora, bloqueado_ate), (1 - fichas) / self.taxa
+        return self._atualizar(alterar)
+
+    def espera(self):
+        linha = self._conexao().execute(
+            "SELECT fichas, atualizado, bloqueado_ate FROM balde WHERE nome = ?", (self.nome,)
+        ).fetchone()
+        if linha is None:
+            return 0.0
+        fichas, atualizado, bloqueado_ate = linha
+        agora = time.time()
+        if agora < bloqueado_ate:
+            return bloqueado_ate - agora
+        fichas = min(self.capacidade, fichas + max(agora - atualizado, 0.0) * self.taxa)
+        return 0.0 if fichas >= 1 else (1 - fichas) / self.taxa
+
+    def pausar(self, segundos):
+        def alterar(fichas, atualizado, bloqueado_ate, agora):
+            bloqueado_ate = max(bloqueado_ate, agora + segundos)
+            return (min(1.0, self.capacidade), bloqueado_ate, bloqueado_ate), None
+        self._atualizar(alterar)
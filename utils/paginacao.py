@@ -0,0 +1,31 @@
+import base64
+import json
+from datetime import datetime
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def codificar_cursor(data_criacao, id):
+    # 🔐 Cursor opaco: base64 de [data ISO, id] da última linha da página
+    bruto = json.dumps([data_criacao.isoformat(), id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        data_iso, id = json.loads(bruto)
+        return datetime.fromisoformat(data_iso), int(id)
+    except (ValueError, TypeError):
+        raise CursorInvalido(cursor)
+
+
+def ler_limite(valor):
+    if valor is None:
+        return LIMITE_PADRAO
+    return max(1, min(valor, LIMITE_MAXIMO))
@@ -0,0 +1,84 @@
+from flask.json.provider import DefaultJSONProvider
+from models import Favorito, Oferta
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele o Flask usa o json padrão
+    orjson = None
+
+FORMATO_MINUTO = 'minuto'    # 31/12/2025 23:59
+FORMATO_SEGUNDO = 'segundo'  # 31/12/2025 23:59:59
+
+
+def _formatar_minuto(d):
+    return f"{d.day:02d}/{d.month:02d}/{d.year} {d.hour:02d}:{d.minute:02d}"
+
+
+def _formatar_segundo(d):
+    return f"{d.day:02d}/{d.month:02d}/{d.year} {d.hour:02d}:{d.minute:02d}:{d.second:02d}"
+
+
+FORMATADORES = {FORMATO_MINUTO: _formatar_minuto, FORMATO_SEGUNDO: _formatar_segundo}
+
+
+def serializar_linhas(linhas, chaves, datas=None):
+    # linhas: Rows do Core (tuplas) na mesma ordem de `chaves`; nada de objetos ORM.
+    # datas: {chave: FORMATO_*}; formatação sem strftime e memorizada por valor,
+    # já que muitas linhas compartilham o mesmo instante (importações em lote)
+    resultado = [dict(zip(chaves, linha)) for linha in linhas]
+    for chave, formato in (datas or {}).items():
+        formatar = FORMATADORES[formato]
+        memo = {}
+        for item in resultado:
+            valor = item[chave]
+            if valor is None:
+                continue
+            texto = memo.get(valor)
+            if texto is None:
+                texto = memo[valor] = formatar(valor)
+            item[chave] = texto
+    return resultado
+
+
+def colunas(*atributos):
+    # (colunas para o select, nomes das chaves no JSON)
+    return list(atributos), [a.key for a in atributos]
+
+
+# Projeções usadas pelas listagens: (colunas do select, chaves do JSON)
+OFERTA_LISTAGEM = colunas(
+    Oferta.id, Oferta.titulo, Oferta.descricao, Oferta.preco, Oferta.imagem, Oferta.link_afiliado,
+    Oferta.loja, Oferta.categoria, Oferta.destaque, Oferta.likes, Oferta.data_criacao
+)
+OFERTA_RESUMO = colunas(Oferta.id, Oferta.titulo, Oferta.loja, Oferta.preco, Oferta.categoria)
+OFERTA_DEBUG = colunas(Oferta.id, Oferta.titulo, Oferta.loja, Oferta.preco)
+FAVORITO_OFERTA = (
+    [Oferta.id, Oferta.titulo, Oferta.imagem, Oferta.loja, Oferta.link_afiliado, Oferta.link, Oferta.preco,
+     Favorito.id, Favorito.data_favorito],
+    ['id', 'titulo', 'imagem', 'loja', 'link_afiliado', 'link', 'preco', 'favorito_id', 'data_favorito']
+)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    # Provedor JSON do Flask com orjson; datas continuam no formato HTTP do Flask
+
+    def _opcoes(self):
+        opcoes = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+        return opcoes
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._opcoes()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        opcoes = self._opcoes() | orjson.OPT_APPEND_NEWLINE
+        if self.compact is False or (self.compact is None and self._app.debug):
+            opcoes |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=opcoes), mimetype=self.mimetype
+        )
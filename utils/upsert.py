@@ -0,0 +1,9 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+
+
+def insert_com_conflito(tabela):
+    # INSERT com suporte a ON CONFLICT do dialeto em uso (SQLite ou Postgres)
+    if db.engine.dialect.name == 'postgresql':
+        return postgresql.insert(tabela)
+    return sqlite.insert(tabela)